@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
-import json
+import pathlib
 import sys
 
+sys.path.insert(0, str(pathlib.Path(__file__).parent / "src"))
+
+from abms import codec
+
 aspects_to_compare = [
     'actionability_analysis',
     'social_orientation_analysis', 
@@ -14,11 +18,11 @@ aspects_to_compare = [
 print(f"{'Text Sample':<50} {'Aspect':<30} {'Value':<10}")
 print("-" * 90)
 
-with open(sys.argv[1], 'r') as f:
+with open(sys.argv[1], 'rb') as f:
     for line in f:
-        data = json.loads(line)
-        text_preview = data.get('text', '')[:47] + "..."
-        aspects = data.get('aspects', {})
+        data = codec.decode_tagged(line)
+        text_preview = data.text[:47] + "..."
+        aspects = data.aspects
         
         for aspect in aspects_to_compare:
             if aspect in aspects:
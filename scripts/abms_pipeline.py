@@ -6,16 +6,21 @@ Production pipeline for ABMS processing
 import argparse
 import json
 import subprocess
+import sys
 import time
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from abms import codec
+
 def validate_input(input_file):
     """Validate JSONL input file"""
     line_count = 0
     with open(input_file, 'r') as f:
         for line_num, line in enumerate(f, 1):
             try:
-                data = json.loads(line)
+                data = codec.loads(line)
                 if 'text' not in data:
                     raise ValueError(f"Line {line_num}: Missing 'text' field")
                 line_count += 1
@@ -49,12 +54,11 @@ def generate_summary(output_file):
     aspects_stats = {}
     record_count = 0
     
-    with open(output_file, 'r') as f:
+    with open(output_file, 'rb') as f:
         for line in f:
-            data = json.loads(line)
+            aspects = codec.decode_tagged(line).aspects
             record_count += 1
             
-            aspects = data.get('aspects', {})
             for key, value in aspects.items():
                 if key != 'data_hash' and isinstance(value, (int, float)):
                     if key not in aspects_stats:
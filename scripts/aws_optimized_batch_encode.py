@@ -27,6 +27,11 @@ from Crypto.Random import get_random_bytes
 # Add src to Python path
 sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
 
+# Persistent aspect cache: duplicate texts and re-runs skip the models
+from abms import codec, line_index
+from abms.aspect_cache import AspectCache
+ASPECT_CACHE = AspectCache()
+
 # Import all 30 analysis modules (exactly like publisher_app.py)
 from publisher.analysis_modules import (
     ActionabilityAnalysis,
@@ -171,7 +176,7 @@ def analyze_text_aws_optimized(text, chunk_size=0):
         for module in tqdm(analysis_modules, desc=f"Chunk {chunk_idx+1}/{len(chunks)}", leave=False):
             try:
                 analysis_instance = module(chunk)
-                result = analysis_instance.analyze()
+                result = ASPECT_CACHE.run(analysis_instance, [chunk])[0]
                 analysis_results = aggregate_results(analysis_results, result, categorical_counts)
             except Exception as e:
                 print(f"Warning: {module.__name__} failed on chunk {chunk_idx}: {e}")
@@ -194,12 +199,12 @@ def analyze_text_aws_optimized(text, chunk_size=0):
 
 
 def process_batch_aws_style(input_lines, chunk_size, progress_interval=1000):
-    """Process all lines with AWS-optimized batching."""
-    results = []
+    """Process all lines with AWS-optimized batching, yielding each record
+    as soon as it is done (nothing accumulates in memory)."""
     
     for i, line in enumerate(tqdm(input_lines, desc="Processing documents")):
         try:
-            obj = json.loads(line.strip())
+            obj = codec.loads(line.strip())
             
             if 'text' not in obj or not obj['text'].strip():
                 obj['aspects'] = {}
@@ -213,7 +218,7 @@ def process_batch_aws_style(input_lines, chunk_size, progress_interval=1000):
                 obj['aspect_based_metadata'] = analysis_result['aspect_based_metadata']
                 obj['encryption_key'] = analysis_result['encryption_key']
             
-            results.append(obj)
+            yield obj
             
             # Memory management for very large datasets
             if i % progress_interval == 0 and i > 0:
@@ -229,8 +234,6 @@ def process_batch_aws_style(input_lines, chunk_size, progress_interval=1000):
             print(f"Warning: Error processing line {i+1}: {e}")
             traceback.print_exc()
             continue
-    
-    return results
 
 
 def main():
@@ -252,28 +255,26 @@ def main():
     # Create output directory
     pathlib.Path(args.output).parent.mkdir(parents=True, exist_ok=True)
     
-    # Read all input data (AWS has plenty of RAM!)
-    print(f"📖 Loading {args.input}...")
-    with open(args.input, 'r') as f:
-        input_lines = f.readlines()
-    
-    print(f"📊 Loaded {len(input_lines):,} documents into memory")
+    # Line index instead of readlines(): the count up front, lines read lazily
+    print(f"📖 Indexing {args.input}...")
+    input_lines = line_index.ensure(args.input)
+    print(f"📊 Found {len(input_lines):,} documents")
     
     # Process all documents
     print("⚡ Starting analysis...")
-    results = process_batch_aws_style(input_lines, args.chunk_size, args.progress_interval)
-    
-    # Write results
-    print(f"💾 Writing {len(results):,} results...")
+    # Results are streamed to the output as they are produced
+    written, sample = 0, None
     with open(args.output, 'w') as f:
-        for obj in tqdm(results, desc="Writing output"):
-            f.write(json.dumps(obj) + '\n')
+        for obj in process_batch_aws_style(input_lines, args.chunk_size, args.progress_interval):
+            f.write(codec.dumps(obj) + '\n')
+            written += 1
+            if sample is None:
+                sample = obj
     
-    print(f"✅ Completed! {len(results):,} documents processed")
+    print(f"✅ Completed! {written:,} documents processed")
     
     # Show sample output
-    if results:
-        sample = results[0]
+    if sample is not None:
         aspects = sample.get('aspects', {})
         print(f"\n📈 Sample output:")
         print(f"   Text preview: {sample.get('text', '')[:100]}...")
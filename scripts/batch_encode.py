@@ -21,6 +21,11 @@ import hashlib
 # Add src to Python path
 sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
 
+# Persistent aspect cache: duplicate texts and re-runs skip the models
+from abms import codec
+from abms.aspect_cache import AspectCache
+ASPECT_CACHE = AspectCache()
+
 # Import all analysis modules
 analysis_modules = {}
 module_names = [
@@ -86,7 +91,7 @@ def extract_aspects(text):
     for module_name, analyzer_class in analysis_modules.items():
         try:
             analyzer = analyzer_class(text)
-            result = analyzer.analyze()
+            result = ASPECT_CACHE.run(analyzer, [text])[0]
             results.update(result)
         except Exception as e:
             print(f"Error in {module_name}: {e}")
@@ -113,7 +118,7 @@ def process_file(input_path, output_path, batch_size=1000):
         for line_num, line in enumerate(infile, 1):
             try:
                 # Parse JSON
-                data = json.loads(line.strip())
+                data = codec.loads(line.strip())
                 
                 if 'text' not in data:
                     print(f"Warning: Line {line_num} missing 'text' field, skipping")
@@ -134,7 +139,7 @@ def process_file(input_path, output_path, batch_size=1000):
                 # Write batch if full
                 if len(batch) >= batch_size:
                     for item in batch:
-                        outfile.write(json.dumps(item) + '\n')
+                        outfile.write(codec.dumps(item) + '\n')
                     batch = []
                 
             except json.JSONDecodeError as e:
@@ -149,7 +154,7 @@ def process_file(input_path, output_path, batch_size=1000):
         
         # Write remaining batch
         for item in batch:
-            outfile.write(json.dumps(item) + '\n')
+            outfile.write(codec.dumps(item) + '\n')
     
     print(f"\nProcessing complete!")
     print(f"Processed: {processed} records")
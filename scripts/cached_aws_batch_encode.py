@@ -29,6 +29,11 @@ os.environ['HF_HOME'] = '/tmp/huggingface_cache'
 # Add src to Python path
 sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
 
+# Persistent aspect cache: duplicate texts and re-runs skip the models
+from abms import codec, line_index
+from abms.aspect_cache import AspectCache
+ASPECT_CACHE = AspectCache()
+
 # Get system resources
 TOTAL_RAM_GB = psutil.virtual_memory().total / (1024**3)
 AVAILABLE_RAM_GB = psutil.virtual_memory().available / (1024**3)
@@ -136,7 +141,7 @@ class CachedAnalysisOrchestrator:
             try:
                 # Create instance (fast since models are already loaded)
                 analysis_instance = module_class(text)
-                result = analysis_instance.analyze()
+                result = ASPECT_CACHE.run(analysis_instance, [text])[0]
                 
                 if result:
                     analysis_results = self._aggregate_results(analysis_results, result, categorical_counts)
@@ -193,14 +198,14 @@ class CachedAnalysisOrchestrator:
 
 
 def process_batch_cached(input_lines, orchestrator, progress_interval=1000):
-    """Process all lines with pre-loaded analysis modules."""
-    results = []
+    """Process all lines with pre-loaded analysis modules, yielding each
+    record as soon as it is done (nothing accumulates in memory)."""
     total_successful = 0
     total_failed = 0
     
     for i, line in enumerate(tqdm(input_lines, desc="Processing documents")):
         try:
-            obj = json.loads(line.strip())
+            obj = codec.loads(line.strip())
             
             if 'text' not in obj or not obj['text'].strip():
                 obj['aspects'] = {}
@@ -217,7 +222,7 @@ def process_batch_cached(input_lines, orchestrator, progress_interval=1000):
                 
                 total_successful += 1
             
-            results.append(obj)
+            yield obj
             
             # Memory and progress management
             if i % progress_interval == 0 and i > 0:
@@ -235,7 +240,6 @@ def process_batch_cached(input_lines, orchestrator, progress_interval=1000):
             continue
     
     print(f"📊 Final summary: {total_successful:,} successful, {total_failed:,} failed")
-    return results
 
 
 def main():
@@ -262,36 +266,34 @@ def main():
     # Create output directory
     pathlib.Path(args.output).parent.mkdir(parents=True, exist_ok=True)
     
-    # Read input data
-    print(f"📖 Loading {args.input}...")
-    with open(args.input, 'r') as f:
-        input_lines = f.readlines()
-    
-    print(f"📊 Loaded {len(input_lines):,} documents")
+    # Line index instead of readlines(): the count up front, lines read lazily
+    print(f"📖 Indexing {args.input}...")
+    input_lines = line_index.ensure(args.input)
+    print(f"📊 Found {len(input_lines):,} documents")
     
     # Process all documents
     print("⚡ Starting cached analysis...")
     import time
     start_time = time.time()
     
-    results = process_batch_cached(input_lines, orchestrator, args.progress_interval)
+    # Results are streamed to the output as they are produced
+    written, sample = 0, None
+    with open(args.output, 'w') as f:
+        for obj in process_batch_cached(input_lines, orchestrator, args.progress_interval):
+            f.write(codec.dumps(obj) + '\n')
+            written += 1
+            if sample is None:
+                sample = obj
     
     elapsed_time = time.time() - start_time
-    docs_per_sec = len(results) / elapsed_time if elapsed_time > 0 else 0
-    
-    # Write results
-    print(f"💾 Writing {len(results):,} results...")
-    with open(args.output, 'w') as f:
-        for obj in tqdm(results, desc="Writing output"):
-            f.write(json.dumps(obj) + '\n')
+    docs_per_sec = written / elapsed_time if elapsed_time > 0 else 0
     
     print(f"✅ Completed! Output written to {args.output}")
     print(f"⏱️  Performance: {docs_per_sec:.1f} documents/second")
     print(f"📈 Total time: {elapsed_time:.1f} seconds")
     
     # Show sample output
-    if results:
-        sample = results[0]
+    if sample is not None:
         aspects = sample.get('aspects', {})
         print(f"\n📊 Sample output:")
         print(f"   Text preview: {sample.get('text', '')[:100]}...")
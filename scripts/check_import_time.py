@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check.
+
+Runs `python -X importtime` on the entry points that must start instantly
+and fails when one of them exceeds its budget (cumulative import time, best
+of --repeat runs) or imports a module it must never touch – argument
+parsing and `--help` may not load torch, transformers, spaCy, …
+
+    python scripts/check_import_time.py            # exit 1 on a regression
+    python scripts/check_import_time.py --scale 2  # slow CI machines
+"""
+
+import argparse
+import os
+import pathlib
+import subprocess
+import sys
+
+SRC = pathlib.Path(__file__).resolve().parent.parent / "src"
+
+# module → budget in milliseconds (cumulative, including its imports)
+BUDGETS = {
+    "abms": 20,
+    "abms.cli": 150,
+    "abms.encoder": 300,
+    "abms.publisher.analysis_modules": 50,
+}
+
+# must not be imported by any entry point above, nor by `abms <cmd> --help`
+FORBIDDEN = ("torch", "transformers", "sentence_transformers", "spacy",
+             "huggingface_hub", "tensorflow", "nltk", "textblob", "pyarrow")
+
+HELP_COMMANDS = (["encode", "--help"], ["reencode", "--help"],
+                 ["index", "--help"], ["get", "--help"],
+                 ["trace", "--help"])
+
+
+def importtime(args):
+    """{module: cumulative µs} of one `python -X importtime` run."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, [str(SRC), os.environ.get("PYTHONPATH")])))
+    proc = subprocess.run([sys.executable, "-X", "importtime", *args],
+                          env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise SystemExit(f"{' '.join(args)} failed:\n{proc.stderr[-2000:]}")
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|", 2)
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def forbidden_in(times):
+    return sorted(m for m in times if m.split(".")[0] in FORBIDDEN)
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    p.add_argument("--repeat", type=int, default=3,
+                   help="runs per module; the fastest counts (default: 3)")
+    p.add_argument("--scale", type=float, default=1.0,
+                   help="multiply every budget (default: 1.0)")
+    args = p.parse_args()
+
+    failures = []
+    for module, budget in BUDGETS.items():
+        budget *= args.scale
+        runs = [importtime(["-c", f"import {module}"])
+                for _ in range(max(1, args.repeat))]
+        best = min(run.get(module, 0) for run in runs) / 1000
+        heavy = forbidden_in(runs[0])
+        status = "ok" if best <= budget and not heavy else "FAIL"
+        print(f"{status:4}  {module:40} {best:8.1f} ms  (budget {budget:.0f} ms)")
+        if best > budget:
+            failures.append(f"{module}: {best:.1f} ms > {budget:.0f} ms")
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy[:5])}")
+
+    for cmd in HELP_COMMANDS:
+        heavy = forbidden_in(importtime(["-m", "abms.cli", *cmd]))
+        label = "abms " + " ".join(cmd)
+        print(f"{'ok' if not heavy else 'FAIL':4}  {label}")
+        if heavy:
+            failures.append(f"{label} imports {', '.join(heavy[:5])}")
+
+    if failures:
+        print("\nImport-time budget exceeded:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,11 @@ warnings.filterwarnings('ignore')
 # Add src to Python path
 sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
 
+# Persistent aspect cache: duplicate texts and re-runs skip the models
+from abms import codec
+from abms.aspect_cache import AspectCache
+ASPECT_CACHE = AspectCache()
+
 # Get system resources
 TOTAL_RAM_GB = psutil.virtual_memory().total / (1024**3)
 AVAILABLE_RAM_GB = psutil.virtual_memory().available / (1024**3)
@@ -170,7 +175,7 @@ def analyze_text_robust(text, chunk_size=0, analysis_modules=None):
         for module_class in analysis_modules:
             try:
                 analysis_instance = module_class(chunk)
-                result = analysis_instance.analyze()
+                result = ASPECT_CACHE.run(analysis_instance, [chunk])[0]
                 
                 if result:  # Only aggregate if we got results
                     analysis_results = aggregate_results(analysis_results, result, categorical_counts)
@@ -215,7 +220,7 @@ def process_batch_robust(input_lines, chunk_size, analysis_modules, progress_int
     
     for i, line in enumerate(tqdm(input_lines, desc="Processing documents")):
         try:
-            obj = json.loads(line.strip())
+            obj = codec.loads(line.strip())
             
             if 'text' not in obj or not obj['text'].strip():
                 obj['aspects'] = {}
@@ -296,7 +301,7 @@ def main():
     print(f"💾 Writing {len(results):,} results...")
     with open(args.output, 'w') as f:
         for obj in tqdm(results, desc="Writing output"):
-            f.write(json.dumps(obj) + '\n')
+            f.write(codec.dumps(obj) + '\n')
     
     print(f"✅ Completed! Output written to {args.output}")
     
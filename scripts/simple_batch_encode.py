@@ -4,13 +4,14 @@ Simple batch encoder that directly calls the Streamlit app's backend logic.
 """
 
 import sys
-import json
 import pathlib
 from tqdm import tqdm
 
 # Add src to path
 sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
 
+from abms import codec
+
 def extract_aspects_streamlit_style(text):
     """
     Extract aspects by calling the same logic as the Streamlit app.
@@ -64,13 +65,13 @@ def main():
         
         for line in tqdm(lines, desc="Processing"):
             try:
-                obj = json.loads(line.strip())
+                obj = codec.loads(line.strip())
                 
                 if 'text' in obj:
                     aspects = extract_aspects_streamlit_style(obj['text'])
                     obj['aspects'] = aspects
                     
-                fout.write(json.dumps(obj) + '\n')
+                fout.write(codec.dumps(obj) + '\n')
                 
             except Exception as e:
                 print(f"Error processing line: {e}")
@@ -4,7 +4,6 @@ Verify that batch encoding produces consistent results with the Streamlit UI.
 """
 
 import sys
-import json
 import pathlib
 from tqdm import tqdm
 import numpy as np
@@ -12,6 +11,8 @@ import numpy as np
 # Add src to path  
 sys.path.insert(0, str(pathlib.Path(__file__).parent.parent / "src"))
 
+from abms import codec
+
 def extract_aspects_ui_style(text):
     """Extract aspects using the same method as the UI."""
     try:
@@ -58,7 +59,7 @@ def main():
     
     print("Loading batch results...")
     with open(batch_file, 'r') as f:
-        batch_results = [json.loads(line) for line in f]
+        batch_results = [codec.loads(line) for line in f]
     
     # Test on first 10 samples
     print("Testing consistency on first 10 samples...")
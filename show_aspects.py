@@ -1,20 +1,24 @@
 #!/usr/bin/env python3
-import json
+import pathlib
 import sys
 
+sys.path.insert(0, str(pathlib.Path(__file__).parent / "src"))
+
+from abms import codec
+
 if len(sys.argv) < 2:
     print("Usage: python show_aspects.py output.jsonl")
     sys.exit(1)
 
-with open(sys.argv[1], 'r') as f:
+with open(sys.argv[1], 'rb') as f:
     for line in f:
-        data = json.loads(line)
-        print(f"\nID: {data.get('id', 'unknown')}")
-        print(f"Text: {data.get('text', '')[:100]}...")
+        data = codec.decode_tagged(line)
+        print(f"\nID: {data.id if data.id is not None else 'unknown'}")
+        print(f"Text: {data.text[:100]}...")
         print("\nAspect Scores:")
         print("-" * 50)
         
-        aspects = data.get('aspects', {})
+        aspects = data.aspects
         # Sort aspects for consistent display
         for key in sorted(aspects.keys()):
             if key != 'data_hash':
@@ -1,3 +1,6 @@
 # src/abms/__init__.py
-from .utilities import net_retry as _net_retry   # ← folder name here
-_net_retry.install(wait=120)
+#
+# Kept import-free: `abms --help` and the CLI argument parsing must not pull
+# in torch / transformers.  The HF download retry hook (utilities.net_retry)
+# is installed by the model registry right before the first model loads.
+NET_RETRY_WAIT = 120        # seconds between download attempts when offline
@@ -0,0 +1,296 @@
+# ────────────────────────────────────────────────────────────────────
+#  src/abms/aspect_cache.py
+# ────────────────────────────────────────────────────────────────────
+"""
+Persistent, content-addressed cache of aspect results.
+
+Corpora repeat themselves (duplicate reviews, boilerplate leads, reruns of
+a shard after a crash).  Results are stored in SQLite keyed by
+
+    (data_hash, module, fingerprint)
+
+where `data_hash` is sha256(text) – the same hash the scripts already put
+in their output – and `fingerprint` covers the module's source file, its
+model checkpoints (and their cached hub revision) and hypothesis set, the
+BasePOV base class they inherit batching and sentence handling from, and
+for spaCy-based modules the components they read (declared and resolved),
+their sentence source and the en_core_web_sm version.
+Editing a module or moving it to another checkpoint therefore misses
+automatically; rows of superseded fingerprints are dropped by
+`invalidate_stale` and, like everything else, by LRU eviction once the
+database outgrows `max_bytes`.
+
+    cache = AspectCache()                     # ~/.cache/abms/aspects.sqlite
+    results = cache.run(analyser, texts)      # hits skip the model entirely
+    cache.log()                               # hit / miss counters
+
+Connections are per process, so forked encode workers share the file;
+within a process the encoder's stage threads share one connection
+(calls are serialised by a lock).
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import logging
+import os
+import pathlib
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from . import codec
+
+DEFAULT_PATH = pathlib.Path(os.environ.get(
+    "ABMS_CACHE", pathlib.Path.home() / ".cache" / "abms" / "aspects.sqlite"))
+DEFAULT_MAX_BYTES = 2 << 30          # 2 GiB
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS aspects (
+    data_hash   TEXT NOT NULL,
+    module      TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    result      TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    last_used   REAL NOT NULL,
+    PRIMARY KEY (data_hash, module, fingerprint)
+);
+CREATE INDEX IF NOT EXISTS aspects_lru ON aspects (last_used);
+"""
+
+
+def data_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def module_name(an) -> str:
+    """Cache name of an analyser (instance or class): its module file,
+    e.g. ``genre_analysis``."""
+    cls = an if isinstance(an, type) else type(an)
+    return cls.__module__.rsplit(".", 1)[-1]
+
+
+def _hub_revision(checkpoint: str) -> str:
+    """Snapshot commit of `checkpoint` in the local HF cache ("" if unknown);
+    a local directory contributes its config's mtime instead."""
+    local = pathlib.Path(checkpoint) / "config.json"
+    if local.exists():
+        return str(local.stat().st_mtime_ns)
+    try:
+        from huggingface_hub import try_to_load_from_cache
+        for repo in (checkpoint, f"sentence-transformers/{checkpoint}"):
+            path = try_to_load_from_cache(repo, "config.json")
+            if isinstance(path, str):
+                m = re.search(r"snapshots[\\/]([^\\/]+)", path)
+                return m.group(1) if m else path
+    except Exception:  # noqa: BLE001 – best effort only
+        pass
+    return ""
+
+
+def _spacy_components(cls: type, context) -> str:
+    """The en_core_web_sm components behind `cls`'s results: declared,
+    with dependencies, and the pipeline's version."""
+    declared = frozenset(getattr(cls, "spacy_components", ()))
+    try:
+        from importlib.metadata import version
+        model = version("en_core_web_sm")
+    except Exception:  # noqa: BLE001 – not installed yet
+        model = ""
+    return repr((sorted(declared),
+                 sorted(context.resolve_components(declared)), model))
+
+
+@functools.lru_cache(maxsize=None)
+def fingerprint(cls: type) -> str:
+    """Version of an analyser class: changes with its code, its models or
+    the spaCy components (and sentence source) it reads."""
+    h = hashlib.sha1()
+    try:
+        sources = [inspect.getsourcefile(cls)]
+    except TypeError:                      # defined interactively
+        sources = []
+    from .publisher.analysis_modules import base_pov
+    sources.append(base_pov.__file__)      # inherited batching, sentences
+    if getattr(cls, "nli", None) is not None:
+        from . import nli
+        sources.append(nli.__file__)       # fused scoring rules
+    if getattr(cls, "uses_doc", False):
+        from .publisher.analysis_modules import context
+        sources.append(context.__file__)   # shared parse, segmentation
+        h.update(_spacy_components(cls, context).encode())
+    for src in sources:
+        if src:
+            h.update(pathlib.Path(src).read_bytes())
+    h.update(repr(getattr(cls, "models", ())).encode())
+    h.update(repr(getattr(cls, "nli", None)).encode())
+    for ckpt, _task in getattr(cls, "models", ()):
+        h.update(_hub_revision(ckpt).encode())
+    return h.hexdigest()[:16]
+
+
+def _jsonable(value):
+    item = getattr(value, "item", None)        # numpy scalars
+    if callable(item):
+        return item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class AspectCache:
+    def __init__(self, path: pathlib.Path | str | None = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = pathlib.Path(path) if path else DEFAULT_PATH
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self._conn: sqlite3.Connection | None = None
+        self._pid = None
+        self._lock = threading.RLock()
+        self._size = 0
+
+    # ── connection ───────────────────────────────────────────────────
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            # never reuse a connection inherited through fork()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=60,
+                                         check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._pid = os.getpid()
+            self._size = self._total_size()
+        return self._conn
+
+    def _total_size(self) -> int:
+        row = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM aspects")
+        return row.fetchone()[0]
+
+    def close(self) -> None:
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+    # ── lookups ──────────────────────────────────────────────────────
+    def get_many(self, module: str, fp: str,
+                 hashes: Sequence[str]) -> Dict[str, dict]:
+        """Cached results for `hashes` (misses are absent)."""
+        found: Dict[str, dict] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                marks = ",".join("?" * len(part))
+                rows = self.conn.execute(
+                    f"SELECT data_hash, result FROM aspects WHERE module = ? "
+                    f"AND fingerprint = ? AND data_hash IN ({marks})",
+                    (module, fp, *part))
+                found.update((h, codec.loads(r)) for h, r in rows)
+            if found:
+                with self.conn:
+                    self.conn.executemany(
+                        "UPDATE aspects SET last_used = ? WHERE data_hash = ? "
+                        "AND module = ? AND fingerprint = ?",
+                        [(time.time(), h, module, fp) for h in found])
+        hit = sum(1 for h in hashes if h in found)
+        self.hits += hit
+        self.misses += len(hashes) - hit
+        return found
+
+    def put_many(self, module: str, fp: str,
+                 items: Iterable[Tuple[str, dict]]) -> None:
+        now = time.time()
+        rows = []
+        for h, result in items:
+            # stdlib-compatible: compact would turn NaN scores into null
+            blob = codec.dumps(result, ensure_ascii=False, default=_jsonable)
+            rows.append((h, module, fp, blob, len(blob) + len(h) + 64, now))
+        if not rows:
+            return
+        with self._lock:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO aspects VALUES (?, ?, ?, ?, ?, ?)",
+                    rows)
+            self._size += sum(r[4] for r in rows)
+            if self._size > self.max_bytes:
+                self.evict()
+
+    # ── analyser helpers ─────────────────────────────────────────────
+    def lookup(self, an, hashes: Sequence[str]) -> List[dict | None]:
+        """Per-position cached result of analyser `an`, None on a miss."""
+        found = self.get_many(module_name(an), fingerprint(type(an)), hashes)
+        return [found.get(h) for h in hashes]
+
+    def store(self, an, items: Iterable[Tuple[str, dict]]) -> None:
+        """Cache fresh results of `an`; empty (failed) results are skipped."""
+        self.put_many(module_name(an), fingerprint(type(an)),
+                      ((h, r) for h, r in items if r))
+
+    def run(self, an, texts: Sequence[str], contexts=None) -> List[dict]:
+        """`an.analyze_batch` with the cache in front of it."""
+        hashes = [data_hash(t) for t in texts]
+        results = self.lookup(an, hashes)
+        miss = [i for i, r in enumerate(results) if r is None]
+        if miss:
+            fresh = an.analyze_batch(
+                [texts[i] for i in miss],
+                [contexts[i] for i in miss] if contexts is not None else None)
+            for i, result in zip(miss, fresh):
+                results[i] = result
+            self.store(an, ((hashes[i], results[i]) for i in miss))
+        return results
+
+    # ── maintenance ──────────────────────────────────────────────────
+    def invalidate_stale(self, analysers: Iterable) -> int:
+        """Drop rows of these analysers' modules whose fingerprint is not
+        the current one (old code / old checkpoint)."""
+        removed = 0
+        with self.conn:
+            for an in analysers:
+                cur = self.conn.execute(
+                    "DELETE FROM aspects WHERE module = ? AND fingerprint != ?",
+                    (module_name(an), fingerprint(type(an))))
+                removed += cur.rowcount
+        if removed:
+            self._size = self._total_size()
+            logging.info("Aspect cache: dropped %d stale results", removed)
+        return removed
+
+    def evict(self, target: float = 0.9) -> None:
+        """Remove least-recently used rows until the cache is below
+        `target` × max_bytes."""
+        self._size = self._total_size()        # other processes write too
+        goal = int(self.max_bytes * target)
+        while self._size > goal:
+            with self.conn:
+                rows = self.conn.execute(
+                    "SELECT rowid, size FROM aspects ORDER BY last_used "
+                    "LIMIT 1000").fetchall()
+                if not rows:
+                    break
+                victims = []
+                for rowid, size in rows:
+                    if self._size <= goal:
+                        break
+                    victims.append((rowid,))
+                    self._size -= size
+                self.conn.executemany("DELETE FROM aspects WHERE rowid = ?",
+                                      victims)
+        logging.debug("Aspect cache: evicted down to %.1f MiB",
+                     self._size / (1 << 20))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "bytes": self._size}
+
+    def log(self) -> None:
+        s = self.stats()
+        logging.info("Aspect cache: %d hits, %d misses (%.1f%% hit), "
+                     "%.1f MiB in %s", s["hits"], s["misses"],
+                     100 * s["hit_ratio"], s["bytes"] / (1 << 20), self.path)
@@ -0,0 +1,201 @@
+# ────────────────────────────────────────────────────────────────────
+#  src/abms/batching.py
+# ────────────────────────────────────────────────────────────────────
+"""
+Cross-document micro-batching.
+
+`micro_batches` groups a stream of items into lists of at most
+`max_size`, closing a batch early once `max_wait` seconds have passed
+since its first item (so a slow source – e.g. stdin – never stalls
+documents that already arrived).  Without `max_wait` every batch but the
+last is full, so the grouping depends on the input alone.  The source is consumed on a background
+thread, which also lets upstream work (JSON decoding, spaCy parsing)
+overlap with model inference.
+
+`length_buckets` regroups a look-ahead window of documents by token
+count, so short snippets are not padded up to a long abstract in the same
+batch; `PaddingStats` reports the resulting padding efficiency (real
+tokens / padded tokens).
+
+`BatchStats` keeps per-model counters: batch fill ratio and docs/s.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def micro_batches(items: Iterable[T], max_size: int,
+                  max_wait: float | None = 0.05,
+                  prefetch: int | None = None,
+                  q: "queue.Queue | None" = None,
+                  first: int | None = None) -> Iterator[List[T]]:
+    """Yield lists of ≤ `max_size` items, in input order.  `q` is the queue
+    between the feeder thread and the batches (default: a new one holding
+    `prefetch` items), e.g. an abms.pipeline queue that reports its depth.
+
+    `max_wait` None never closes a batch early.  `first` caps the first
+    batch instead of `max_size`, to line the batches up with those of an
+    earlier part of the same stream."""
+    max_size = max(1, max_size)
+    size = max_size if first is None else max(1, min(first, max_size))
+    if q is None:
+        q = queue.Queue(maxsize=prefetch or 4 * max_size)
+    stop = threading.Event()
+
+    def _put(item) -> bool:
+        # never blocks past the consumer: it may be gone with the queue full
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _feed() -> None:
+        try:
+            for item in items:
+                if not _put(item):
+                    return
+            _put(_END)
+        except BaseException as exc:  # noqa: BLE001 – re-raised in consumer
+            _put(_Failure(exc))
+
+    feeder = threading.Thread(target=_feed, name="abms-batch-feed", daemon=True)
+    feeder.start()
+    try:
+        done = False
+        while not done:
+            item = q.get()
+            if item is _END:
+                break
+            if isinstance(item, _Failure):
+                raise item.exc
+            batch = [item]
+            if max_wait is not None:
+                deadline = time.monotonic() + max_wait
+            while len(batch) < size:
+                if max_wait is None:
+                    item = q.get()
+                else:
+                    timeout = deadline - time.monotonic()
+                    try:
+                        item = (q.get(timeout=timeout) if timeout > 0
+                                else q.get_nowait())
+                    except queue.Empty:
+                        break
+                if item is _END:
+                    done = True
+                    break
+                if isinstance(item, _Failure):
+                    raise item.exc
+                batch.append(item)
+            size = max_size
+            yield batch
+    finally:
+        stop.set()
+
+
+class BatchStats:
+    """Per-model batch counters (fill ratio, throughput)."""
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.batches: Dict[str, int] = {}
+        self.docs: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, key: str, n_docs: int, seconds: float) -> None:
+        self.batches[key] = self.batches.get(key, 0) + 1
+        self.docs[key] = self.docs.get(key, 0) + n_docs
+        self.seconds[key] = self.seconds.get(key, 0.0) + seconds
+
+    def error(self, key: str, n_docs: int = 1) -> None:
+        """Count `n_docs` documents `key` failed on."""
+        self.errors[key] = self.errors.get(key, 0) + n_docs
+
+    def merge(self, other: "BatchStats") -> None:
+        for key in other.batches:
+            self.batches[key] = self.batches.get(key, 0) + other.batches[key]
+            self.docs[key] = self.docs.get(key, 0) + other.docs[key]
+            self.seconds[key] = self.seconds.get(key, 0.0) + other.seconds[key]
+        for key, n in other.errors.items():
+            self.errors[key] = self.errors.get(key, 0) + n
+
+    def fill_ratio(self, key: str) -> float:
+        slots = self.batches.get(key, 0) * self.capacity
+        return self.docs.get(key, 0) / slots if slots else 0.0
+
+    def docs_per_sec(self, key: str) -> float:
+        secs = self.seconds.get(key, 0.0)
+        return self.docs.get(key, 0) / secs if secs else 0.0
+
+    def log(self) -> None:
+        for key in sorted(self.batches):
+            logging.info("%-50s batches %6d  fill %5.1f%%  %8.1f docs/s",
+                         key, self.batches[key], 100 * self.fill_ratio(key),
+                         self.docs_per_sec(key))
+
+
+# ----------------------------------------------------------------------
+# length bucketing
+# ----------------------------------------------------------------------
+def length_buckets(lengths: Sequence[int], batch_size: int) -> List[List[int]]:
+    """Indices of `lengths` grouped into batches of similar length
+    (shortest first), so each batch pads to a close maximum."""
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    step = max(1, batch_size)
+    return [order[i:i + step] for i in range(0, len(order), step)]
+
+
+class PaddingStats:
+    """Real vs. padded tokens of the batches handed to the models.
+
+    `record_baseline` takes the same batches in input order, so the log
+    line shows what bucketing saved."""
+
+    def __init__(self):
+        self.real = self.padded = self.baseline_padded = 0
+
+    @staticmethod
+    def _padded(lengths: Sequence[int]) -> int:
+        return len(lengths) * max(lengths, default=0)
+
+    def record(self, lengths: Sequence[int]) -> None:
+        self.real += sum(lengths)
+        self.padded += self._padded(lengths)
+
+    def record_baseline(self, lengths: Sequence[int]) -> None:
+        self.baseline_padded += self._padded(lengths)
+
+    def merge(self, other: "PaddingStats") -> None:
+        self.real += other.real
+        self.padded += other.padded
+        self.baseline_padded += other.baseline_padded
+
+    @property
+    def efficiency(self) -> float:
+        return self.real / self.padded if self.padded else 1.0
+
+    @property
+    def baseline_efficiency(self) -> float:
+        return self.real / self.baseline_padded if self.baseline_padded else 1.0
+
+    def log(self) -> None:
+        logging.info("Padding efficiency: %.1f%% real tokens "
+                     "(input order would give %.1f%%)",
+                     100 * self.efficiency, 100 * self.baseline_efficiency)
@@ -1,28 +1,325 @@
 import argparse, sys
 from pathlib import Path
-from .encoder import encode_file
+from .aspect_cache import DEFAULT_MAX_BYTES, DEFAULT_PATH, AspectCache
+from .columnar import DEFAULT_COMMIT, is_parquet
+from .streams import is_stdio, strip_compression
+from .writer import DEFAULT_FSYNC
+
+# The engine (.encoder) is imported inside the commands, after argument
+# parsing: `abms … -h` must stay instant.  scripts/check_import_time.py
+# keeps this module within its import-time budget.
+
+
+def _add_engine_args(p):
+    """Options shared by every sub-command that runs the encode engine."""
+    p.add_argument("--nlp-batch-size", type=int, default=256,
+                   help="documents per spaCy nlp.pipe batch (default: 256)")
+    p.add_argument("--nlp-procs", type=int, default=1,
+                   help="spaCy parser processes (default: 1)")
+    p.add_argument("--batch-size", type=int, default=16,
+                   help="documents per transformer micro-batch (default: 16)")
+    p.add_argument("--max-wait", type=float, default=0.05,
+                   help="seconds the look-ahead window may wait to fill "
+                        "when reading stdin (default: 0.05)")
+    p.add_argument("--window", type=int, default=256,
+                   help="look-ahead records bucketed by length (default: 256)")
+    p.add_argument("--workers", type=int, default=1,
+                   help="forked encode processes sharing the loaded models "
+                        "(default: 1)")
+    p.add_argument("--fsync", metavar="every-doc|every-N|every-Ts|on-exit",
+                   help=f"output commit policy (default: {DEFAULT_FSYNC}; "
+                        f"{DEFAULT_COMMIT} for Parquet)")
+    p.add_argument("--cache", action="store_true",
+                   help="reuse aspect results of unchanged texts and modules "
+                        "from a persistent result cache (off by default)")
+    p.add_argument("--cache-path", type=Path, default=DEFAULT_PATH,
+                   metavar="PATH",
+                   help=f"result cache location (default: {DEFAULT_PATH})")
+    p.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES >> 20,
+                   help="evict least-recently used results beyond this size")
+    p.add_argument("--no-cache", action="store_true",
+                   help="always run every module (overrides --cache)")
+    p.add_argument("--compact-json", action="store_true",
+                   help="write compact JSON with the fast encoder (not "
+                        "byte-identical to json.dumps output)")
+    p.add_argument("--trace", type=Path, metavar="FILE",
+                   help="append timing spans per document, module and stage "
+                        "to FILE (see `abms trace summarize`)")
+    p.add_argument("--metrics-file", type=Path, metavar="FILE",
+                   help="rewrite live metrics (docs/s, per-aspect throughput, "
+                        "queues, cache, memory, ETA) to FILE in the "
+                        "Prometheus text format, e.g. for the node_exporter "
+                        "textfile collector")
+    p.add_argument("--metrics-port", type=int, metavar="PORT",
+                   help="serve the same metrics on "
+                        "http://127.0.0.1:PORT/metrics")
+    p.add_argument("--metrics-interval", type=float, default=5.0,
+                   metavar="SECONDS",
+                   help="seconds between metric snapshots (default: 5)")
+    p.add_argument("--rss-budget-mb", type=int, metavar="MB",
+                   help="admission control: shrink documents in flight and "
+                        "batch sizes while resident memory is over MB "
+                        "(split across --workers)")
+    p.add_argument("--memory-target", type=float, metavar="PCT",
+                   help="admission control: … while more than PCT percent "
+                        "of the machine's RAM is in use")
+    p.add_argument("--cpu-target", type=float, metavar="PCT",
+                   help="admission control: … while the machine's CPU load "
+                        "is over PCT percent")
+
+
+def _engine_kwargs(args):
+    cache = None
+    if args.cache and not args.no_cache:
+        cache = AspectCache(args.cache_path, max_bytes=args.cache_max_mb << 20)
+    return dict(nlp_batch_size=args.nlp_batch_size,
+                nlp_n_process=args.nlp_procs,
+                batch_size=args.batch_size,
+                max_wait=args.max_wait,
+                window=args.window,
+                workers=args.workers,
+                fsync=args.fsync,
+                cache=cache,
+                compact_json=args.compact_json,
+                trace_file=args.trace,
+                metrics_file=args.metrics_file,
+                metrics_port=args.metrics_port,
+                metrics_interval=args.metrics_interval,
+                rss_budget=(args.rss_budget_mb << 20
+                            if args.rss_budget_mb is not None else None),
+                cpu_target=(args.cpu_target / 100
+                            if args.cpu_target is not None else None),
+                memory_target=(args.memory_target / 100
+                               if args.memory_target is not None else None))
+
+
+def _aspect_list(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def _add_aspect_args(p, default):
+    p.add_argument("--aspects", type=_aspect_list,
+                   help="comma-separated aspect modules, e.g. "
+                        f"readability_analysis,genre_analysis ({default})")
+    p.add_argument("--exclude", type=_aspect_list,
+                   help="comma-separated aspect modules to leave out")
+
+
+def _check_aspects(p, args):
+    """Reject unknown aspect names before any model loads."""
+    from .encoder import select_aspects
+    try:
+        select_aspects(args.aspects, args.exclude)
+    except ValueError as e:
+        p.error(str(e))
+
+
+def _default_output(src: Path, fmt: str = "jsonl") -> Path:
+    """<input>.tags.jsonl, compressed like the input; stdin → stdout.
+    Parquet: the <input>.tags.parquet directory."""
+    if is_stdio(src):
+        return src
+    base, suffix = strip_compression(src)
+    if fmt == "parquet":
+        return base.with_suffix(".tags.parquet")
+    return base.with_suffix(".tags.jsonl" + suffix)
 
 
 def _cmd_encode(argv):
     p = argparse.ArgumentParser(prog="abms encode",
-                                description="Batch-encode a *.clean.jsonl file")
-    p.add_argument("input",  type=Path)
+                                description="Batch-encode *.clean.jsonl files "
+                                            "(.gz / .zst, or - for stdin)")
+    p.add_argument("input", type=Path, nargs="+")
     p.add_argument("-o", "--output", type=Path,
-                   help="target (.tags.jsonl). Default: <input>.tags.jsonl")
+                   help="target (.tags.jsonl[.gz|.zst], - for stdout). "
+                        "Default: <input>.tags.jsonl, or stdout for stdin")
+    p.add_argument("--format", choices=("jsonl", "parquet"),
+                   help="jsonl or parquet: a dataset directory with one "
+                        "typed column per aspect (default: parquet for an "
+                        "--output ending in .parquet, else jsonl)")
+    p.add_argument("--out-dir", type=Path,
+                   help="corpus run: one atomic part file per input / shard "
+                        "plus manifest.json here (needed for several "
+                        "inputs; finished shards are skipped on restart; "
+                        "not combinable with --fsync)")
+    p.add_argument("--shard-mb", type=int, default=256,
+                   help="split uncompressed inputs larger than this into "
+                        "shards (with --out-dir; default: 256)")
+    p.add_argument("--merge-into", type=Path,
+                   help="with --out-dir: concatenate the parts into this "
+                        "file once every shard is done")
+    _add_aspect_args(p, "default: all")
+    _add_engine_args(p)
     encode_args = p.parse_args(argv)
+    if encode_args.out_dir is None:
+        if len(encode_args.input) > 1:
+            p.error("several inputs need --out-dir")
+        if encode_args.merge_into is not None:
+            p.error("--merge-into needs --out-dir")
+    elif encode_args.output is not None:
+        p.error("--output and --out-dir are mutually exclusive")
+    elif encode_args.fsync is not None:
+        p.error("--fsync does not apply to --out-dir (every part file is "
+                "committed atomically when its shard is done)")
+    if encode_args.format is None:
+        encode_args.format = ("parquet" if encode_args.output is not None
+                              and is_parquet(encode_args.output) else "jsonl")
+    if encode_args.format == "parquet" and is_stdio(
+            encode_args.output or encode_args.input[0]):
+        p.error("--format parquet needs an output directory, not stdout")
+    if encode_args.shard_mb <= 0:
+        p.error("--shard-mb must be positive")
+    _check_aspects(p, encode_args)
 
-    out = encode_args.output or encode_args.input.with_suffix(".tags.jsonl")
-    encode_file(encode_args.input, out)
+    kwargs = _engine_kwargs(encode_args)
+    if encode_args.out_dir is not None:
+        from .corpus import encode_corpus
+        del kwargs["fsync"]
+        manifest = encode_corpus(encode_args.input, encode_args.out_dir,
+                                 shard_bytes=encode_args.shard_mb << 20,
+                                 merge_into=encode_args.merge_into,
+                                 aspects=encode_args.aspects,
+                                 exclude=encode_args.exclude,
+                                 output_format=encode_args.format, **kwargs)
+        failed = manifest.count("failed")
+    else:
+        from .encoder import encode_file
+        src = encode_args.input[0]
+        out = encode_args.output or _default_output(src, encode_args.format)
+        encode_file(src, out, aspects=encode_args.aspects,
+                    exclude=encode_args.exclude,
+                    output_format=encode_args.format, **kwargs)
+        failed = 0
+    if kwargs["cache"] is not None:
+        kwargs["cache"].close()
+    if failed:
+        sys.exit(1)
+
+
+def _cmd_reencode(argv):
+    p = argparse.ArgumentParser(
+        prog="abms reencode",
+        description="Recompute selected (default: stale) aspects of an "
+                    "existing *.tags.jsonl file")
+    p.add_argument("input", type=Path)
+    _add_aspect_args(p, "default: those whose module version changed")
+    p.add_argument("-o", "--output", type=Path,
+                   help="write here instead of rewriting the input in place")
+    _add_engine_args(p)
+    args = p.parse_args(argv)
+    _check_aspects(p, args)
+
+    from .encoder import reencode_file
+    kwargs = _engine_kwargs(args)
+    reencode_file(args.input, args.output, aspects=args.aspects,
+                  exclude=args.exclude, **kwargs)
+    if kwargs["cache"] is not None:
+        kwargs["cache"].close()
+
+
+def _cmd_index(argv):
+    p = argparse.ArgumentParser(
+        prog="abms index",
+        description="Write <file>.idx: the byte offset of every line of an "
+                    "uncompressed JSONL file, for `abms get` and balanced "
+                    "--workers / shard splits")
+    p.add_argument("input", type=Path)
+    p.add_argument("--ids", action="store_true",
+                   help="also index the records' \"id\" field (decodes "
+                        "every record once)")
+    args = p.parse_args(argv)
+    if not args.input.is_file():
+        p.error(f"{args.input}: no such file")
+
+    from .line_index import build
+    try:
+        print(build(args.input, ids=args.ids))
+    except ValueError as e:
+        p.error(str(e))
+
+
+def _cmd_get(argv):
+    p = argparse.ArgumentParser(
+        prog="abms get",
+        description="Print one record of an indexed JSONL file, by line "
+                    "number (0-based; negative counts from the end) or id")
+    p.add_argument("input", type=Path)
+    p.add_argument("line", type=int, nargs="?")
+    p.add_argument("--id", dest="record_id",
+                   help="record id (JSON, e.g. 42, or plain text)")
+    args = p.parse_args(argv)
+    if (args.line is None) == (args.record_id is None):
+        p.error("give a line number or --id")
+
+    from .codec import loads
+    from .line_index import LineIndex
+    try:
+        with LineIndex(args.input) as index:
+            if args.record_id is None:
+                line = args.line
+            else:
+                try:
+                    wanted = [loads(args.record_id), args.record_id]
+                except ValueError:
+                    wanted = [args.record_id]
+                line = next((n for n in map(index.find_id, wanted)
+                             if n is not None), None)
+                if line is None:
+                    p.exit(1, f"abms get: no record with id {args.record_id}\n")
+            sys.stdout.buffer.write(index[line].rstrip(b"\n") + b"\n")
+    except (IndexError, ValueError) as e:
+        p.error(str(e))
+
+
+def _cmd_trace(argv):
+    p = argparse.ArgumentParser(
+        prog="abms trace",
+        description="Inspect a trace written by `abms encode --trace`")
+    sub = p.add_subparsers(dest="action", required=True)
+    s = sub.add_parser("summarize",
+                       help="per stage and module: p50/p95/p99 latency per "
+                            "document and share of the traced time")
+    s.add_argument("trace", type=Path)
+    s.add_argument("--json", action="store_true",
+                   help="print the rows as JSON lines")
+    args = p.parse_args(argv)
+
+    from .trace import format_summary, summarize
+    try:
+        rows = summarize(args.trace)
+    except (OSError, ValueError) as e:
+        p.error(str(e))
+    if args.json:
+        import json
+        for row in rows:
+            print(json.dumps(row))
+    else:
+        print(format_summary(rows))
 
 
 def main() -> None:
     if len(sys.argv) < 2 or sys.argv[1] in {"-h", "--help"}:
-        print("usage: abms encode <in.clean.jsonl> [-o out.tags.jsonl]")
+        print("usage: abms encode [--aspects a,b] [--exclude c] "
+              "<in.clean.jsonl> [-o out.tags.jsonl]\n"
+              "       abms encode <in.clean.jsonl>... --out-dir DIR "
+              "[--merge-into out.tags.jsonl]\n"
+              "       abms reencode [--aspects a,b] <in.tags.jsonl> [-o out]\n"
+              "       abms index [--ids] <file.jsonl>\n"
+              "       abms get <file.jsonl> (N | --id X)\n"
+              "       abms trace summarize <run.trace>")
         sys.exit(0)
 
     cmd, *rest = sys.argv[1:]
     if cmd == "encode":
         _cmd_encode(rest)
+    elif cmd == "reencode":
+        _cmd_reencode(rest)
+    elif cmd == "index":
+        _cmd_index(rest)
+    elif cmd == "get":
+        _cmd_get(rest)
+    elif cmd == "trace":
+        _cmd_trace(rest)
     else:
         sys.stderr.write(f"abms: unknown sub-command '{cmd}'\n")
         sys.exit(1)
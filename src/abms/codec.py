@@ -0,0 +1,170 @@
+# ────────────────────────────────────────────────────────────────────
+#  src/abms/codec.py
+# ────────────────────────────────────────────────────────────────────
+"""
+JSON codec for JSONL records.
+
+With cheap aspect subsets, `json.loads` / `json.dumps` per line is a large
+part of the run time.  Decoding goes through orjson (or msgspec) when one
+is installed and falls back to the stdlib; values, key order and errors
+(`json.JSONDecodeError`) are the same either way.
+
+Encoding is byte-compatible with `json.dumps` by default.  `compact=True`
+trades that for speed: no spaces after separators, non-ASCII written as
+UTF-8, NaN / ±Infinity written as null – equivalent JSON, different bytes.
+
+    obj = codec.loads(line)                          # bytes or str
+    line = codec.dumps(obj, ensure_ascii=False) + "\\n"
+    rec = codec.decode_tagged(line)                  # typed view of a
+    rec.aspects["genre_analysis"]                    # *.tags.jsonl record
+
+``ABMS_JSON=json`` forces the stdlib (e.g. to rule the codec out).
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Union
+
+AspectValue = Union[float, str]
+
+_orjson = _msgspec = None
+if os.environ.get("ABMS_JSON", "").lower() != "json":
+    try:
+        import orjson as _orjson
+    except ImportError:
+        pass
+    try:
+        import msgspec as _msgspec
+    except ImportError:
+        pass
+
+BACKEND = "orjson" if _orjson else "msgspec" if _msgspec else "json"
+
+
+# ── decoding ─────────────────────────────────────────────────────────
+if _orjson is not None:
+    _fast_loads: Callable[[Any], Any] | None = _orjson.loads
+elif _msgspec is not None:
+    _fast_loads = _msgspec.json.Decoder().decode
+else:
+    _fast_loads = None
+
+# orjson reads integers beyond 64 bits as floats instead of failing: input
+# with a run of 19+ digits (rare – long numeric ids) goes to the stdlib.
+# translate + substring search is ~10x cheaper than a regex scan.
+_DIGITS_B = bytes.maketrans(b"123456789", b"000000000")
+_DIGITS_S = str.maketrans("123456789", "000000000")
+_RUN_B, _RUN_S = b"0" * 19, "0" * 19
+
+
+def _long_digits(data: bytes | str) -> bool:
+    if isinstance(data, str):
+        return _RUN_S in data.translate(_DIGITS_S)
+    return _RUN_B in bytes(data).translate(_DIGITS_B)
+
+
+def loads(data: bytes | str) -> Any:
+    """`json.loads`, accelerated.  Input the fast decoder rejects or may
+    misread (NaN literals, integers beyond 64 bits, invalid JSON) is
+    handed to the stdlib, so results and exceptions match it exactly."""
+    if _fast_loads is not None:
+        if _orjson is None or not _long_digits(data):
+            try:
+                return _fast_loads(data)
+            except Exception:                   # noqa: BLE001
+                pass
+    return json.loads(data)
+
+
+# ── encoding ─────────────────────────────────────────────────────────
+if _orjson is not None:
+    _COMPACT_OPTS = _orjson.OPT_SERIALIZE_NUMPY | _orjson.OPT_NON_STR_KEYS
+
+    def _compact(obj: Any, default: Callable | None) -> str:
+        return _orjson.dumps(obj, default=default,
+                             option=_COMPACT_OPTS).decode("utf-8")
+elif _msgspec is not None:
+    def _compact(obj: Any, default: Callable | None) -> str:
+        return _msgspec.json.encode(obj, enc_hook=default).decode("utf-8")
+else:
+    def _compact(obj: Any, default: Callable | None) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"),
+                          default=default)
+
+
+def dumps(obj: Any, *, ensure_ascii: bool = True, compact: bool = False,
+          default: Callable | None = None) -> str:
+    """`json.dumps(obj, ensure_ascii=…, default=…)`, byte for byte.  With
+    `compact` the fast encoder is used instead (see module docstring);
+    `ensure_ascii` is then ignored."""
+    if compact:
+        try:
+            return _compact(obj, default)
+        except (TypeError, ValueError, OverflowError):
+            # e.g. integers beyond 64 bits
+            return json.dumps(obj, ensure_ascii=False, separators=(",", ":"),
+                              default=default)
+    return json.dumps(obj, ensure_ascii=ensure_ascii, default=default)
+
+
+# ── typed records ────────────────────────────────────────────────────
+if _msgspec is not None:
+    class TaggedRecord(_msgspec.Struct):
+        """The fields of a *.tags.jsonl record the tools read; other
+        fields are skipped without being materialised."""
+        id: Any = None
+        text: str = ""
+        aspects: Dict[str, AspectValue] = {}
+
+    _TAGGED = _msgspec.json.Decoder(TaggedRecord)
+
+    def decode_tagged(line: bytes | str) -> TaggedRecord:
+        """Typed view of one *.tags.jsonl line (ValueError if the aspect
+        values are not numbers / strings)."""
+        try:
+            return _TAGGED.decode(line)
+        except _msgspec.ValidationError as e:
+            raise ValueError(f"invalid tagged record: {e}") from None
+        except _msgspec.DecodeError:
+            pass
+        # NaN literals and other stdlib-only input
+        return _tagged_from(loads(line))
+else:
+    @dataclass
+    class TaggedRecord:
+        """The fields of a *.tags.jsonl record the tools read."""
+        id: Any = None
+        text: str = ""
+        aspects: Dict[str, AspectValue] = field(default_factory=dict)
+
+    def decode_tagged(line: bytes | str) -> TaggedRecord:
+        """Typed view of one *.tags.jsonl line (ValueError if the aspect
+        values are not numbers / strings)."""
+        return _tagged_from(loads(line))
+
+
+def _tagged_from(obj: Any) -> TaggedRecord:
+    if not isinstance(obj, dict):
+        raise ValueError(f"invalid tagged record: expected an object, "
+                         f"got {type(obj).__name__}")
+    aspects = obj.get("aspects") or {}
+    if not isinstance(aspects, dict):
+        raise ValueError("invalid tagged record: 'aspects' is not an object")
+    typed: Dict[str, AspectValue] = aspects
+    for key, value in aspects.items():
+        kind = type(value)
+        if kind is float or kind is str:
+            continue
+        if kind is int:                         # 1 → 1.0, as msgspec does
+            if typed is aspects:
+                typed = dict(aspects)
+            typed[key] = float(value)
+            continue
+        raise ValueError(f"invalid tagged record: aspect {key!r} is "
+                         f"{kind.__name__}")
+    text = obj.get("text", "")
+    if not isinstance(text, str):
+        raise ValueError("invalid tagged record: 'text' is not a string")
+    return TaggedRecord(id=obj.get("id"), text=text, aspects=typed)
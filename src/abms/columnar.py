@@ -0,0 +1,290 @@
+# ────────────────────────────────────────────────────────────────────
+#  src/abms/columnar.py
+# ────────────────────────────────────────────────────────────────────
+"""
+Parquet output (``abms encode --format parquet``).
+
+A *.tags.jsonl line repeats every aspect name, and reading one aspect of a
+corpus means parsing all of it.  The Parquet form is a dataset directory
+(``<name>.tags.parquet/``) with one fixed schema:
+
+    id           string               the record's "id", as text
+    text         string
+    data_hash    fixed_size_binary(32) sha256(text)
+    <result key> double               numeric aspects
+    <result key> dictionary<string>   categorical aspects (genre, spatial, …)
+    record       string               the record's other fields, as JSON
+
+Result keys and their types are declared by the modules (BasePOV
+``outputs``).
+
+Rows are buffered and written at each commit as one row group in a new
+part file (``part-000000.parquet`` …), via a ``.tmp`` that is fsynced and
+renamed.  A commit happens per the --fsync policy (`DEFAULT_COMMIT` in
+this mode) or once `row_group_rows` rows are buffered.  Each part's
+key-value metadata holds the input name, input offset and record count
+reached, so a restart resumes after the last part without a sidecar; a
+crash loses the uncommitted rows only.
+
+    pq.read_table("corpus.tags.parquet", columns=["genre"])   # one column
+
+pyarrow is imported on first use.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import numbers
+import os
+import pathlib
+import time
+from typing import Dict, List, Sequence, Tuple
+
+from . import codec, streams
+from .writer import Checkpoint, FsyncPolicy
+
+DEFAULT_COMMIT = "every-60s"
+DEFAULT_ROW_GROUP_ROWS = 65536
+COMPRESSION = "zstd"
+
+_FIXED = ("id", "text", "data_hash")
+_RECORD = "record"
+_SKIP = {*_FIXED, "aspects"}
+_PART = "part-{:06d}.parquet"
+
+
+def _pa():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:                        # pragma: no cover
+        raise RuntimeError("Parquet output needs the 'pyarrow' package"
+                           ) from None
+    return pyarrow, pyarrow.parquet
+
+
+def is_parquet(path: pathlib.Path | str) -> bool:
+    return pathlib.Path(path).suffix.lower() == ".parquet"
+
+
+def check_target(path: pathlib.Path | str) -> None:
+    """ValueError if `path` cannot hold Parquet output."""
+    if streams.is_stdio(path):
+        raise ValueError("Parquet output needs a directory, not stdout")
+    if streams.compression_of(path):
+        raise ValueError(f"{path}: Parquet output is compressed internally; "
+                         "drop the .gz / .zst suffix")
+
+
+# ── schema ───────────────────────────────────────────────────────────
+def schema_for(analysers: Sequence) -> "pyarrow.Schema":
+    """Arrow schema of the records `analysers` produce (see module doc)."""
+    pa, _ = _pa()
+    kinds: Dict[str, str] = {}
+    for an in analysers:
+        for key, kind in type(an).output_types().items():
+            kinds[key] = "category" if kind is str else "float"
+    fields = [pa.field("id", pa.string()), pa.field("text", pa.string()),
+              pa.field("data_hash", pa.binary(32))]
+    fields += [pa.field(key, pa.dictionary(pa.int32(), pa.string())
+                        if kind == "category" else pa.float64())
+               for key, kind in kinds.items()]
+    fields.append(pa.field(_RECORD, pa.string()))
+    return pa.schema(fields,
+                     metadata={"abms.aspects": json.dumps(kinds)})
+
+
+def to_table(records: Sequence[dict], schema) -> "pyarrow.Table":
+    """Columns of `records` (encoded JSONL objects) in `schema`.  Aspect
+    values of the wrong type – e.g. a failed module's – become null."""
+    pa, _ = _pa()
+    keys = [name for name in schema.names
+            if name not in _FIXED and name != _RECORD]
+    numeric = {k for k in keys if pa.types.is_floating(schema.field(k).type)}
+    ids, texts, hashes, rest = [], [], [], []
+    values: Dict[str, list] = {k: [] for k in keys}
+    for obj in records:
+        text = obj.get("text", "")
+        rid = obj.get("id")
+        ids.append(None if rid is None else str(rid))
+        texts.append(text)
+        hashes.append(hashlib.sha256(text.encode("utf-8")).digest())
+        aspects = obj.get("aspects") or {}
+        for key in keys:
+            v = aspects.get(key)
+            if key in numeric:
+                v = _number(key, v)
+            elif v is not None:
+                v = str(v)
+            values[key].append(v)
+        other = {k: v for k, v in obj.items() if k not in _SKIP}
+        rest.append(codec.dumps(other, ensure_ascii=False, compact=True)
+                    if other else None)
+    columns = [ids, texts, hashes, *(values[k] for k in keys), rest]
+    return pa.Table.from_arrays(
+        [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+        schema=schema)
+
+
+_NOT_NUMERIC: set = set()          # (key, type) pairs already reported
+
+
+def _number(key: str, v):
+    """`v` as a float column value: any real number (numpy scalars too);
+    None stays null.  Anything else is written as null and reported once
+    per key and type."""
+    if v is None:
+        return None
+    if isinstance(v, numbers.Real) and not isinstance(v, bool):
+        return float(v)
+    if (key, type(v)) not in _NOT_NUMERIC:
+        _NOT_NUMERIC.add((key, type(v)))
+        logging.warning("Aspect %s: %s value %r is not a number; written as "
+                        "null in the float column", key, type(v).__name__, v)
+    return None
+
+
+# ── dataset writer ───────────────────────────────────────────────────
+def _parts(path: pathlib.Path) -> List[pathlib.Path]:
+    return sorted(path.glob("part-*.parquet"))
+
+
+def resume_point(in_path: pathlib.Path,
+                 out_path: pathlib.Path) -> Tuple[int, int | None]:
+    """(records, input offset) reached by the committed parts of dataset
+    `out_path`; the offset is None when the last part does not record it
+    for `in_path` (the caller counts lines instead)."""
+    _, pq = _pa()
+    parts = _parts(out_path)
+    if not parts:
+        return 0, 0
+    meta = pq.read_metadata(parts[-1]).metadata or {}
+    try:
+        records = int(meta[b"abms.records"])
+        in_offset = int(meta[b"abms.in_offset"])
+        if meta[b"abms.input"].decode() == in_path.name:
+            return records, in_offset
+    except (KeyError, ValueError):
+        records = sum(pq.read_metadata(p).num_rows for p in parts)
+    return records, None
+
+
+class ParquetWriter:
+    """Append records to the Parquet dataset `path`, one part file (one
+    row group) per commit.  Same interface as `JsonlWriter`, except that
+    `write` takes the record dicts instead of JSON lines.
+
+    `checkpoint` is the resume position the dataset is opened at; parts
+    written by an earlier run must have the same schema (ValueError)."""
+
+    def __init__(self, path: pathlib.Path | str, schema,
+                 policy: FsyncPolicy | str = DEFAULT_COMMIT,
+                 checkpoint: Checkpoint | None = None,
+                 row_group_rows: int = DEFAULT_ROW_GROUP_ROWS):
+        _, self._pq = _pa()
+        self.path = pathlib.Path(path)
+        check_target(self.path)
+        self.schema = schema
+        self.policy = (FsyncPolicy.parse(policy) if isinstance(policy, str)
+                       else policy)
+        self.row_group_rows = max(1, row_group_rows)
+        self._state = checkpoint or Checkpoint()
+        self.path.mkdir(parents=True, exist_ok=True)
+        for tmp in self.path.glob("*.tmp"):
+            tmp.unlink()                        # a part torn by a crash
+        parts = _parts(self.path)
+        if parts:
+            have = self._pq.read_schema(parts[-1]).remove_metadata()
+            if not have.equals(schema.remove_metadata()):
+                raise ValueError(
+                    f"{self.path} holds parts with other columns (different "
+                    "aspects); use the same selection or start a new dataset")
+        self._next_part = (int(parts[-1].stem.split("-")[1]) + 1
+                           if parts else 0)
+        self._buffer: List[dict] = []
+        self._last_commit = time.monotonic()
+        self.commits = 0
+
+    @property
+    def records(self) -> int:
+        return self._state.records
+
+    def write(self, records: Sequence[dict],
+              in_offset: int | None = None) -> None:
+        """Buffer records; `in_offset` is the input position just past the
+        records written so far."""
+        self._buffer.extend(records)
+        self._state.records += len(records)
+        if in_offset is not None:
+            self._state.in_offset = in_offset
+        pending = len(self._buffer)
+        if (pending >= self.row_group_rows
+                or self.policy.due(pending,
+                                   time.monotonic() - self._last_commit)):
+            self.commit()
+
+    def commit(self) -> None:
+        if self._buffer:
+            table = to_table(self._buffer, self.schema)
+            meta = dict(self.schema.metadata or {})
+            meta.update({b"abms.input": self._state.input.encode(),
+                         b"abms.in_offset": str(self._state.in_offset).encode(),
+                         b"abms.records": str(self._state.records).encode()})
+            part = self.path / _PART.format(self._next_part)
+            tmp = part.with_name(part.name + ".tmp")
+            with tmp.open("wb") as fh:
+                self._pq.write_table(table.replace_schema_metadata(meta), fh,
+                                     compression=COMPRESSION,
+                                     row_group_size=len(self._buffer))
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, part)
+            self._next_part += 1
+            self._buffer = []
+            self.commits += 1
+        self._last_commit = time.monotonic()
+
+    def close(self) -> None:
+        self.commit()
+
+    def __enter__(self) -> "ParquetWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ── single files (corpus parts) ──────────────────────────────────────
+def write_file(fh, schema, batches, row_group_rows: int = DEFAULT_ROW_GROUP_ROWS
+               ) -> int:
+    """Write the record lists of `batches` to the open binary file `fh` as
+    one Parquet file, in row groups of up to `row_group_rows`.  Returns
+    the number of records."""
+    _, pq = _pa()
+    buffer: List[dict] = []
+    records = 0
+    with pq.ParquetWriter(fh, schema, compression=COMPRESSION) as out:
+        for batch in batches:
+            buffer.extend(batch)
+            records += len(batch)
+            if len(buffer) >= row_group_rows:
+                out.write_table(to_table(buffer, schema))
+                buffer = []
+        if buffer or not records:
+            out.write_table(to_table(buffer, schema))
+    return records
+
+
+def concat_files(parts: Sequence[pathlib.Path], fh) -> None:
+    """Copy the row groups of the Parquet files `parts`, in order, into one
+    file written to `fh`."""
+    _, pq = _pa()
+    if not parts:
+        raise ValueError("nothing to merge")
+    with pq.ParquetWriter(fh, pq.read_schema(parts[0]),
+                          compression=COMPRESSION) as out:
+        for part in parts:
+            pf = pq.ParquetFile(part)
+            for i in range(pf.num_row_groups):
+                out.write_table(pf.read_row_group(i))
@@ -0,0 +1,442 @@
+# ────────────────────────────────────────────────────────────────────
+#  src/abms/corpus.py
+# ────────────────────────────────────────────────────────────────────
+"""
+Corpus runs: many input files – or byte-range shards of a huge one – as
+the work units of one scheduler.
+
+    abms encode data/raw/*.jsonl --out-dir data/tags \\
+                [--shard-mb 256] [--merge-into data/all.tags.jsonl.zst]
+
+Uncompressed inputs larger than `shard_bytes` are cut into line-aligned
+byte ranges; a compressed input is one shard (its line boundaries are
+unknown without decompressing it).  Models load once; shards run largest
+first, in-process or on forked workers sharing the weights, so one big
+file no longer leaves the other cores idle at the end of a run.
+
+Each shard writes ``<out-dir>/<name>[.NNNN].tags.jsonl`` through a
+``.tmp`` file that is fsynced and renamed when complete – a part file
+exists whole or not at all.  ``<out-dir>/manifest.json`` (replaced
+atomically after every shard) records each shard's input range, status,
+record count, size and SHA-256.  A restart skips the shards that are done
+and whose input and module versions are unchanged; the others start over.
+
+With ``--format parquet`` each part is one Parquet file
+(``*.tags.parquet``, see abms.columnar) and the out dir is a dataset.
+
+`merge_parts` checks the checksums and concatenates the parts in input
+order into one file (one frame per part for .gz / .zst targets).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import pathlib
+from dataclasses import asdict, dataclass, field, replace
+from typing import Dict, Iterable, List, Tuple
+
+from tqdm import tqdm
+
+from . import columnar, encoder, streams, trace
+from .aspect_cache import AspectCache, fingerprint
+from .governor import Governor
+from .encoder import (_aspect_class, _byte_ranges, _can_fork, _encode_lines,
+                      _exporting, _load_analysers, _read_range,
+                      _save_versions, _Totals, _worker_pool, select_aspects)
+
+MANIFEST = "manifest.json"
+DEFAULT_SHARD_BYTES = 256 << 20         # 256 MiB
+
+_CHUNK = 1 << 20
+
+
+@dataclass
+class Shard:
+    """One work unit: bytes [start, end) of `input` → part file `part`."""
+    id: str
+    input: str
+    start: int = 0
+    end: int | None = None       # None: to the end of the input
+    input_size: int = 0          # input size / mtime when planned; a
+    input_mtime_ns: int = 0      # change invalidates a finished shard
+    part: str = ""               # output file, relative to the out dir
+    status: str = "pending"      # pending | done | failed
+    records: int = 0
+    bytes: int = 0
+    sha256: str = ""
+    error: str = ""
+
+    @property
+    def size(self) -> int:
+        """Input bytes to encode (compressed size for compressed inputs)."""
+        return (self.end if self.end is not None
+                else self.input_size) - self.start
+
+    def same_work(self, other: "Shard") -> bool:
+        return ((self.id, self.input, self.start, self.end, self.input_size,
+                 self.input_mtime_ns, self.part)
+                == (other.id, other.input, other.start, other.end,
+                    other.input_size, other.input_mtime_ns, other.part))
+
+
+@dataclass
+class Manifest:
+    """State of a corpus run (``<out-dir>/manifest.json``)."""
+    aspects: Dict[str, str] = field(default_factory=dict)  # → fingerprint
+    shards: List[Shard] = field(default_factory=list)
+
+    @staticmethod
+    def path_for(out_dir: pathlib.Path) -> pathlib.Path:
+        return out_dir / MANIFEST
+
+    @classmethod
+    def load(cls, out_dir: pathlib.Path) -> "Manifest | None":
+        try:
+            raw = json.loads(cls.path_for(out_dir).read_text())
+            return cls(aspects=raw["aspects"],
+                       shards=[Shard(**s) for s in raw["shards"]])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, out_dir: pathlib.Path) -> None:
+        """Atomic replace, so the manifest itself is never torn."""
+        path = self.path_for(out_dir)
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("w") as fh:
+            json.dump(asdict(self), fh, indent=1)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+    def count(self, status: str) -> int:
+        return sum(s.status == status for s in self.shards)
+
+
+# ----------------------------------------------------------------------
+# planning
+# ----------------------------------------------------------------------
+def plan_shards(inputs: Iterable[pathlib.Path | str],
+                shard_bytes: int = DEFAULT_SHARD_BYTES,
+                suffix: str = ".tags.jsonl") -> List[Shard]:
+    """Shards of `inputs`, in input order.  Part names come from the input
+    file names (``a.clean.jsonl`` → ``a.clean[.NNNN]<suffix>``), which
+    must therefore be distinct."""
+    shards: List[Shard] = []
+    seen: Dict[str, pathlib.Path] = {}
+    for path in map(pathlib.Path, inputs):
+        if streams.is_stdio(path):
+            raise ValueError("stdin cannot be part of a corpus run")
+        base, _ = streams.strip_compression(path)
+        name = base.with_suffix("").name
+        if name in seen:
+            raise ValueError(f"{seen[name]} and {path} would write the same "
+                             "part files; rename one of them")
+        seen[name] = path
+        st = path.stat()
+        if streams.is_plain_file(path) and st.st_size > shard_bytes:
+            ranges: List[Tuple[int, int | None]] = list(_byte_ranges(
+                path, 0, math.ceil(st.st_size / shard_bytes)))
+        else:
+            ranges = [(0, None)]
+        for i, (start, end) in enumerate(ranges):
+            sid = name if len(ranges) == 1 else f"{name}.{i:04d}"
+            shards.append(Shard(id=sid, input=str(path), start=start,
+                                end=end, input_size=st.st_size,
+                                input_mtime_ns=st.st_mtime_ns,
+                                part=sid + suffix))
+    return shards
+
+
+def _carry_over(planned: List[Shard], old: Manifest | None,
+                versions: Dict[str, str], out_dir: pathlib.Path) -> None:
+    """Mark planned shards done if `old` finished the same work with the
+    same module versions and the part file is still intact (by size)."""
+    if old is None:
+        return
+    if old.aspects != versions:
+        logging.warning("Aspect selection or module versions changed since "
+                        "the last run; re-encoding every shard")
+        return
+    done = {s.id: s for s in old.shards if s.status == "done"}
+    for i, shard in enumerate(planned):
+        prev = done.get(shard.id)
+        if prev is None or not prev.same_work(shard):
+            continue
+        try:
+            intact = (out_dir / prev.part).stat().st_size == prev.bytes
+        except OSError:
+            intact = False
+        if intact:
+            planned[i] = prev
+
+
+# ----------------------------------------------------------------------
+# encoding
+# ----------------------------------------------------------------------
+def _encode_shard(shard: Shard, out_dir: pathlib.Path, analysers: List,
+                  cache: AspectCache | None, opts: dict,
+                  totals: _Totals | None = None,
+                  governor: Governor | None = None) -> Tuple[Shard, _Totals]:
+    """Encode one shard into its part file (atomically), counting into
+    `totals` (default: new ones), under `governor`'s admission control.
+    A failure is logged and returned as a "failed" shard instead of
+    raised."""
+    if totals is None:
+        totals = _Totals(opts["batch_size"])
+    part = out_dir / shard.part
+    tmp = part.with_name(part.name + ".tmp")
+    digest, records = hashlib.sha256(), 0
+    try:
+        with tmp.open("wb") as fh:
+            lines = _read_range(shard.input, shard.start, shard.end)
+            encoded = _encode_lines(lines, analysers, totals, cache,
+                                    start=shard.start, governor=governor,
+                                    **opts)
+            if opts.get("as_records"):
+                records = columnar.write_file(
+                    fh, columnar.schema_for(analysers),
+                    (out for out, _ in encoded))
+            else:
+                for out, _ in encoded:
+                    data = "".join(out).encode("utf-8")
+                    fh.write(data)
+                    digest.update(data)
+                    records += len(out)
+            fh.flush()
+            os.fsync(fh.fileno())
+        if opts.get("as_records"):
+            digest = _file_sha256(tmp)
+        size = tmp.stat().st_size
+        os.replace(tmp, part)
+    except Exception as e:  # noqa: BLE001
+        logging.exception("Shard %s failed (%s)", shard.id, e)
+        tmp.unlink(missing_ok=True)
+        return replace(shard, status="failed", error=repr(e)), totals
+    return replace(shard, status="done", records=records, bytes=size,
+                   sha256=digest.hexdigest(), error=""), totals
+
+
+def _file_sha256(path: pathlib.Path):
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for buf in iter(lambda: fh.read(_CHUNK), b""):
+            digest.update(buf)
+    return digest
+
+
+def _shard_task(task: Tuple[Shard, str, dict]) -> Tuple[Shard, _Totals]:
+    # forked worker: analysers / cache inherited from the parent
+    shard, out_dir, opts = task
+    try:
+        return _encode_shard(shard, pathlib.Path(out_dir),
+                             encoder._WORKER_ANALYSERS, encoder._WORKER_CACHE,
+                             opts, governor=encoder._WORKER_GOVERNOR)
+    finally:
+        trace.flush()                   # workers exit without cleanup
+
+
+def encode_corpus(inputs: Iterable[pathlib.Path | str],
+                  out_dir: pathlib.Path | str,
+                  *,
+                  shard_bytes: int = DEFAULT_SHARD_BYTES,
+                  merge_into: pathlib.Path | str | None = None,
+                  nlp_batch_size: int = 256,
+                  nlp_n_process: int = 1,
+                  batch_size: int = 16,
+                  max_wait: float = 0.05,
+                  window: int = 256,
+                  workers: int = 1,
+                  cache: AspectCache | None = None,
+                  aspects: Iterable[str] | None = None,
+                  exclude: Iterable[str] | None = None,
+                  compact_json: bool = False,
+                  output_format: str = "jsonl",
+                  trace_file: pathlib.Path | str | None = None,
+                  metrics_file: pathlib.Path | str | None = None,
+                  metrics_port: int | None = None,
+                  metrics_interval: float = 5.0,
+                  rss_budget: int | None = None,
+                  cpu_target: float | None = None,
+                  memory_target: float | None = None) -> Manifest:
+    """
+    Encode every shard of `inputs` (see `plan_shards`) into part files in
+    `out_dir` and record them in its manifest.  Shards a previous run
+    finished are skipped.
+
+    With `workers` > 1 the models load once and forked workers take whole
+    shards, largest first; otherwise the shards run in this process.  A
+    failing shard is marked "failed" and the run goes on; a re-run retries
+    it.  With `merge_into` the parts are concatenated into that file once
+    every shard is done (see `merge_parts`).  `output_format` "parquet"
+    writes each part as one Parquet file (``*.tags.parquet``, see
+    abms.columnar) instead of JSONL.
+
+    The engine options mean the same as for `encode_file`.  Returns the
+    manifest.
+    """
+    out_dir = pathlib.Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    names = select_aspects(aspects, exclude)
+    versions = {n: fingerprint(_aspect_class(n)) for n in names}
+
+    parquet = output_format == "parquet"
+    manifest = Manifest(aspects=versions, shards=plan_shards(
+        inputs, shard_bytes, ".tags.parquet" if parquet else ".tags.jsonl"))
+    _carry_over(manifest.shards, Manifest.load(out_dir), versions, out_dir)
+    manifest.save(out_dir)
+    todo = sorted((i for i, s in enumerate(manifest.shards)
+                   if s.status != "done"),
+                  key=lambda i: manifest.shards[i].size, reverse=True)
+    logging.info("%d shards, %d already done, %d to encode",
+                 len(manifest.shards), manifest.count("done"), len(todo))
+
+    if todo:
+        if trace_file is not None:
+            trace.start(trace_file)
+        try:
+            _run_shards(manifest, todo, out_dir, names, cache, workers,
+                        dict(nlp_batch_size=nlp_batch_size,
+                             nlp_n_process=nlp_n_process,
+                             batch_size=batch_size, max_wait=max_wait,
+                             window=max(window, batch_size),
+                             compact=compact_json, as_records=parquet),
+                        (metrics_file, metrics_port, metrics_interval),
+                        Governor(rss_budget, cpu_target,
+                                 memory_target=memory_target))
+        finally:
+            if trace_file is not None:
+                trace.stop()
+
+    failed = manifest.count("failed")
+    logging.info("✓ corpus  %s  (%d/%d shards done, %d failed)",
+                 out_dir, manifest.count("done"), len(manifest.shards),
+                 failed)
+    if merge_into is not None:
+        if failed:
+            logging.error("Not merging into %s: %d shard(s) failed",
+                          merge_into, failed)
+        else:
+            merge_parts(out_dir, merge_into)
+    return manifest
+
+
+def _run_shards(manifest: Manifest, todo: List[int], out_dir: pathlib.Path,
+                names: List[str], cache: AspectCache | None, workers: int,
+                opts: dict, metrics: tuple = (None, None, 5.0),
+                governor: Governor | None = None) -> None:
+    analysers = _load_analysers(names)
+    for an in analysers:
+        an.batch_size = opts["batch_size"]
+    if cache is not None:
+        cache.invalidate_stale(analysers)
+    totals = _Totals(opts["batch_size"])
+    bar = tqdm(total=sum(manifest.shards[i].size for i in todo), unit="B",
+               unit_scale=True, unit_divisor=1024, desc=out_dir.name,
+               dynamic_ncols=True)
+    index = {manifest.shards[i].id: i for i in todo}
+
+    def _finished(shard: Shard, part: _Totals) -> None:
+        manifest.shards[index[shard.id]] = shard
+        manifest.save(out_dir)
+        if part is not totals:
+            totals.merge(part)
+        bar.update(shard.size)
+
+    with _exporting(totals, bar, *metrics, governor):
+        if workers > 1 and _can_fork(analysers):
+            tasks = [(manifest.shards[i], str(out_dir),
+                      dict(opts, nlp_n_process=1)) for i in todo]
+            with _worker_pool(analysers, cache, workers,
+                              f"{len(tasks)} shards", governor) as pool:
+                for shard, part in pool.imap_unordered(_shard_task, tasks):
+                    _finished(shard, part)
+        else:
+            for i in todo:
+                # counted live into the run's totals
+                _finished(*_encode_shard(manifest.shards[i], out_dir,
+                                         analysers, cache, opts, totals,
+                                         governor))
+
+    bar.close()
+    for an in analysers:
+        an.close()
+    totals.log()
+    if governor is not None:
+        governor.log()
+
+
+# ----------------------------------------------------------------------
+# merge
+# ----------------------------------------------------------------------
+def merge_parts(out_dir: pathlib.Path | str,
+                target: pathlib.Path | str) -> int:
+    """Concatenate the part files of `out_dir`, in input order, into
+    `target` (replaced atomically; ``.gz`` / ``.zst`` compressed one frame
+    per part).  Parquet parts go into one ``.parquet`` file, row group by
+    row group.  Every shard must be done and match its checksum.  Returns
+    the number of records."""
+    out_dir, target = pathlib.Path(out_dir), pathlib.Path(target)
+    manifest = Manifest.load(out_dir)
+    if manifest is None:
+        raise ValueError(f"{out_dir} has no readable {MANIFEST}")
+    pending = [s.id for s in manifest.shards if s.status != "done"]
+    if pending:
+        raise ValueError(f"{len(pending)} shard(s) not done yet, e.g. "
+                         f"{pending[:3]}")
+    parquet = any(columnar.is_parquet(s.part) for s in manifest.shards)
+    if parquet != columnar.is_parquet(target):
+        raise ValueError(f"{target}: Parquet parts merge into a .parquet "
+                         "file, JSONL parts into a JSONL one")
+    tmp = target.with_name(target.name + ".tmp")
+    try:
+        with tmp.open("wb") as fh:
+            if parquet:
+                parts = [out_dir / s.part for s in manifest.shards]
+                for part, shard in zip(parts, manifest.shards):
+                    _check_part(part, shard, _file_sha256(part))
+                columnar.concat_files(parts, fh)
+            else:
+                _concat_jsonl(out_dir, manifest.shards, fh,
+                              streams.compression_of(target))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, target)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    _save_versions(target, manifest.aspects)
+    records = sum(s.records for s in manifest.shards)
+    logging.info("Merged %d parts (%d records) into %s",
+                 len(manifest.shards), records, target)
+    return records
+
+
+def _check_part(part: pathlib.Path, shard: Shard, digest) -> None:
+    if digest.hexdigest() != shard.sha256:
+        raise ValueError(f"{part.name} does not match its checksum in the "
+                         f"manifest; delete it and re-run the encode")
+
+
+def _concat_jsonl(out_dir: pathlib.Path, shards: List[Shard], fh,
+                  kind: str | None) -> None:
+    frames = streams.FrameCompressor(fh, kind) if kind else None
+    try:
+        for shard in shards:
+            part = out_dir / shard.part
+            digest = hashlib.sha256()
+            with part.open("rb") as src:
+                for buf in iter(lambda: src.read(_CHUNK), b""):
+                    digest.update(buf)
+                    if frames is not None:
+                        frames.write(buf)
+                    else:
+                        fh.write(buf)
+            _check_part(part, shard, digest)
+            if frames is not None:
+                frames.end_frame()
+    finally:
+        if frames is not None:
+            frames.close()
@@ -1,13 +1,67 @@
 # ────────────────────────────────────────────────────────────────────
 #  src/abms/encoder.py
-#  Complete, self-contained replacement (May-2025 edition)
 # ────────────────────────────────────────────────────────────────────
 """
 Create/extend *.tags.jsonl files with ABMS aspect scores.
 
+A run streams the input through five threaded stages over bounded queues
+(abms.pipeline), in look-ahead windows of records:
+
+    read    raw lines from the input, from the resume offset on
+    parse   JSON decode, then spaCy over the texts (`nlp.pipe`) into one
+            shared AnalysisContext per document
+    nli     length buckets, cache lookups, the fused zero-shot NLI pass
+    models  the other aspect modules per micro-batch, cache stores
+    json    output lines (or record dicts for Parquet)
+
+while the caller's thread writes them in input order.  With admission
+control on (abms.governor), a `Gate` caps the documents between decode
+and json: the read side acquires a slot per record, the json stage
+releases them, and the cap shrinks while memory or CPU is over budget.
+
+Output is committed in groups; each commit records the input offset and
+record count reached (the ``<out>.ckpt`` sidecar, or the Parquet part
+metadata), so a restart seeks to the last commit and carries on – the
+torn tail of a crash is cut off first, nothing is encoded twice.
+
 Features
-• Progress bar with ETA (tqdm)
-• Crash-safe auto-resume (appends; skips docs already processed)
+• Progress bar with ETA (tqdm, by input bytes)
+• Crash-safe auto-resume (appends; skips docs already processed; a torn
+  final line is truncated first); group commit per --fsync policy, with
+  a byte-offset checkpoint sidecar so restarts seek instead of rescanning
+• Models load once per run: one warmed instance per aspect module
+• Zero-shot NLI aspects share one fused forward pass
+• Documents are micro-batched across the transformer aspects
+  (configurable max batch size / max wait), bucketed by length within a
+  look-ahead window; per-model batch fill ratio, docs/s and padding
+  efficiency are logged at the end of the run
+• --workers N: models load once, then N forked workers share them
+  copy-on-write and encode contiguous byte ranges of the input; a bounded
+  reorder buffer keeps the output byte-identical to a serial run
+• Many inputs / shards of a huge one in one run: see abms.corpus
+• `abms index` line offsets (abms.line_index) are used, when current, to
+  split the input and to place resume points without reading it
+• Read, parse (JSON + spaCy), NLI, other models and JSON encoding run as
+  threaded stages over bounded queues (abms.pipeline), overlapping I/O,
+  tokenisation and inference in constant memory; queue depths are shown
+  on the progress bar and logged at the end
+• Opt-in timing spans per document, module and stage (abms.trace,
+  `abms trace summarize` for p50/p95/p99 per aspect)
+• Opt-in live metrics (docs/s, per-aspect throughput and errors, queue
+  depths, cache hit rate, memory, ETA) as a Prometheus textfile or HTTP
+  endpoint (abms.metrics)
+• Opt-in admission control by RSS budget / CPU target (abms.governor):
+  in-flight documents and micro-batch sizes shrink under pressure
+• One spaCy parse per document, shared by every spaCy-based aspect;
+  documents are streamed through nlp.pipe (configurable batch/processes)
+• Opt-in persistent aspect cache (--cache) keyed by (sha256(text),
+  module, module fingerprint): duplicates and re-runs skip model inference
+• Records decoded with orjson / msgspec when installed (abms.codec);
+  output stays byte-compatible with json.dumps unless --compact-json
+• .gz / .zst input and output (compressed on a background thread, one
+  frame per commit, so resume works on compressed output); "-" = stdio
+• --format parquet: typed columns per aspect, one part file per commit
+  (abms.columnar)
 • Works fully offline when the env-vars
       HF_HUB_OFFLINE=1  TRANSFORMERS_OFFLINE=1
   are set and models are present in your HF cache
@@ -15,16 +69,41 @@ Features
 
 from __future__ import annotations
 
+import collections
+import contextlib
+import functools
+import gc
 import importlib
+import itertools
 import json
 import logging
+import multiprocessing
 import os
 import pathlib
-from types import ModuleType
-from typing import Dict, List, Type
+import sys
+import threading
+import time
+from typing import (Callable, Dict, Iterable, Iterator, List, Sequence,
+                    Tuple, Type)
 
 from tqdm import tqdm
 
+from . import codec, columnar, line_index, nli, registry, streams, trace
+from .aspect_cache import AspectCache, data_hash, fingerprint, module_name
+from .batching import (BatchStats, PaddingStats, length_buckets,
+                       micro_batches)
+from .governor import Gate, Governor
+from .pipeline import Pipeline, QueueStats
+from .reorder import ReorderBuffer
+from .writer import (DEFAULT_FSYNC, Checkpoint, FsyncPolicy, JsonlWriter,
+                     last_line, record_sha1, truncate_torn_tail)
+
+from .publisher.analysis_modules.base_pov import BasePOV
+from .publisher.analysis_modules.context import (AnalysisContext,
+                                                 components_for, get_nlp,
+                                                 needs_senter_pass,
+                                                 sent_starts)
+
 # ----------------------------------------------------------------------
 # configure logging (CLI may override)
 # ----------------------------------------------------------------------
@@ -35,29 +114,70 @@ logging.basicConfig(
 )
 
 # ----------------------------------------------------------------------
-# dynamically load every analysis module we ship
+# analysis modules: listed in abms.publisher.analysis_modules.ASPECTS,
+# imported only when selected
+# ----------------------------------------------------------------------
+_PKG = "abms.publisher.analysis_modules"
+
+
+def available_aspects() -> List[str]:
+    """Names of the shipped aspects (module files of
+    abms.publisher.analysis_modules, as registered in its ``ASPECTS``),
+    sorted.  No aspect module is imported."""
+    return sorted(importlib.import_module(_PKG).ASPECTS)
+
+
+def _aspect_class(name: str) -> Type:
+    """The BasePOV subclass of aspect `name`."""
+    return importlib.import_module(_PKG).load_aspect(name)
+
+
+def select_aspects(aspects: Iterable[str] | None = None,
+                   exclude: Iterable[str] | None = None) -> List[str]:
+    """Aspects a run with these `aspects` (default: all) and `exclude`
+    options computes, in output key order.  Unknown names raise
+    ValueError."""
+    known = available_aspects()
+    names = known if aspects is None else list(dict.fromkeys(aspects))
+    dropped = set(exclude or ())
+    unknown = [n for n in [*names, *sorted(dropped)] if n not in known]
+    if unknown:
+        raise ValueError(f"unknown aspect(s) {unknown}; available: {known}")
+    return [n for n in known if n in names and n not in dropped]
+
+
+# ----------------------------------------------------------------------
+# per-output module versions (<out>.versions.json)
 # ----------------------------------------------------------------------
-_ANALYSIS_MODULES: List[Type] = []
+def _versions_path(tags_path: pathlib.Path) -> pathlib.Path:
+    return tags_path.with_name(tags_path.name + ".versions.json")
+
+
+def load_versions(tags_path: pathlib.Path | str) -> Dict[str, str]:
+    """aspect → fingerprint of the module version that produced it."""
+    try:
+        return json.loads(_versions_path(pathlib.Path(tags_path)).read_text())
+    except (OSError, ValueError):
+        return {}
 
 
-def _discover_modules() -> None:
-    """Populate _ANALYSIS_MODULES with every subclass of BasePOV found in
-    abms.publisher.analysis_modules.*"""
-    import pkgutil
+def _save_versions(tags_path: pathlib.Path, versions: Dict[str, str]) -> None:
+    path = _versions_path(tags_path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(versions, indent=1, sort_keys=True))
+    os.replace(tmp, path)
 
-    pkg = importlib.import_module("abms.publisher.analysis_modules")
-    for modinfo in pkgutil.iter_modules(pkg.__path__, pkg.__name__ + "."):
-        m: ModuleType = importlib.import_module(modinfo.name)
-        for obj in m.__dict__.values():
-            if isinstance(obj, type) and getattr(obj, "__base__", None):
-                if obj.__base__.__name__ == "BasePOV":
-                    _ANALYSIS_MODULES.append(obj)
 
+def stale_aspects(tags_path: pathlib.Path | str) -> List[str]:
+    """Aspects of `tags_path` whose recorded version differs from the
+    current module (or that were never recorded)."""
+    versions = load_versions(tags_path)
+    if not versions:
+        logging.warning("No module versions recorded for %s; treating every "
+                        "aspect as stale", pathlib.Path(tags_path).name)
+    return [name for name in available_aspects()
+            if versions.get(name) != fingerprint(_aspect_class(name))]
 
-_discover_modules()
-logging.info("Loaded %d analysis modules: %s",
-             len(_ANALYSIS_MODULES),
-             [cls.__name__ for cls in _ANALYSIS_MODULES])
 
 # ----------------------------------------------------------------------
 # helpers
@@ -65,68 +185,1178 @@ logging.info("Loaded %d analysis modules: %s",
 _CHUNK = 1 << 20  # 1 MiB
 
 
-def _count_lines(fp: pathlib.Path, chunk: int = _CHUNK) -> int:
+def _count_lines(fp: pathlib.Path, chunk: int = _CHUNK, start: int = 0) -> int:
     """Fast line count without loading whole file into RAM."""
     with fp.open("rb") as fh:
+        fh.seek(start)
         return sum(buf.count(b"\n") for buf in iter(lambda: fh.read(chunk), b""))
 
 
-def _analyse(text: str) -> Dict[str, float | str]:
-    """Run every aspect module on the given text."""
-    out: Dict[str, float | str] = {}
-    for Mod in _ANALYSIS_MODULES:
+def _line_offset(fp: pathlib.Path, n_lines: int, start: int = 0) -> int:
+    """Byte offset just past `n_lines` lines of `fp`, counted from `start`
+    (offsets of a compressed input are in its decompressed stream)."""
+    if n_lines == 0:
+        return start                    # never touch stdin needlessly
+    index = line_index.open_index(fp)
+    if index is not None:
+        with index:
+            return index.offsets[min(index.line_at(start) + n_lines,
+                                     len(index))]
+    pos = start
+    with streams.open_input(fp, start) as fh:
+        for _ in range(n_lines):
+            line = fh.readline()
+            if not line:
+                break
+            pos += len(line)
+    return pos
+
+
+def _read_range(path: pathlib.Path | str, start: int,
+                end: int | None = None) -> Iterator[bytes]:
+    """Raw lines of `path` from byte `start` (a line start) up to `end`
+    (default: end of input).  `path` may be compressed or ``-``."""
+    with streams.open_input(path, start) as fh:
+        pos = start
+        while end is None or pos < end:
+            line = fh.readline()
+            if not line:
+                break
+            pos += len(line)
+            yield line
+
+
+def _resume_compressed(in_path: pathlib.Path, out_path: pathlib.Path,
+                       kind: str) -> Checkpoint:
+    """Resume point of a compressed output: the verified checkpoint, or the
+    end of its last complete frame.  Anything after it is cut off."""
+    ckpt = Checkpoint.load(Checkpoint.path_for(out_path))
+    if ckpt is not None and ckpt.verify(in_path, out_path):
+        point = ckpt
+    elif streams.is_stdio(in_path):
+        raise ValueError(f"{out_path} has no valid checkpoint; cannot "
+                         "resume from stdin (remove it to start over)")
+    else:
+        logging.info("No valid checkpoint for %s; decompressing it",
+                     out_path.name)
+        point = Checkpoint(input=in_path.name)
+        for start, end, data in streams.complete_frames(out_path, kind):
+            point.records += data.count(b"\n")
+            point.block_offset, point.out_offset = start, end
+            if data:
+                point.last_sha1 = record_sha1(
+                    data[data.rfind(b"\n", 0, len(data) - 1) + 1:])
+        point.in_offset = _line_offset(in_path, point.records)
+    size = out_path.stat().st_size
+    if size > point.out_offset:
+        logging.warning("Dropping %d bytes after the last complete frame "
+                        "of %s", size - point.out_offset, out_path.name)
+        with out_path.open("r+b") as fh:
+            fh.truncate(point.out_offset)
+    return point
+
+
+def _resume_parquet(in_path: pathlib.Path, out_path: pathlib.Path) -> Checkpoint:
+    """Resume point of a Parquet dataset: recorded in its last part."""
+    records, in_offset = columnar.resume_point(in_path, out_path)
+    if in_offset is None:
+        if streams.is_stdio(in_path):
+            raise ValueError(f"{out_path} was not written from this input; "
+                             "cannot resume from stdin (remove it to start "
+                             "over)")
+        in_offset = _line_offset(in_path, records)
+    if records:
+        logging.info("Resuming: %d records already encoded in %s (input "
+                     "byte %d)", records, out_path.name, in_offset)
+    return Checkpoint(input=in_path.name, in_offset=in_offset,
+                      records=records)
+
+
+def _resume_point(in_path: pathlib.Path, out_path: pathlib.Path,
+                  parquet: bool = False) -> Checkpoint:
+    """Where to continue: the verified checkpoint sidecar plus any records
+    committed after it, or – without a usable sidecar – a full line count."""
+    if streams.is_stdio(out_path) or not out_path.exists():
+        return Checkpoint(input=in_path.name)
+    if parquet:
+        return _resume_parquet(in_path, out_path)
+    kind = streams.compression_of(out_path)
+    if kind is not None:
+        point = _resume_compressed(in_path, out_path, kind)
+        if point.records:
+            logging.info("Resuming: %d records already encoded in %s "
+                         "(input byte %d)", point.records, out_path.name,
+                         point.in_offset)
+        return point
+    truncate_torn_tail(out_path)
+
+    ckpt = Checkpoint.load(Checkpoint.path_for(out_path))
+    if ckpt is not None and ckpt.verify(in_path, out_path):
+        if streams.is_stdio(in_path):
+            # stdin cannot be re-read to place the records written after
+            # the checkpoint: redo them
+            with out_path.open("r+b") as fh:
+                fh.truncate(ckpt.out_offset)
+        extra = _count_lines(out_path, start=ckpt.out_offset)
+        base_in, base_records = ckpt.in_offset, ckpt.records
+    elif streams.is_stdio(in_path) and out_path.stat().st_size:
+        raise ValueError(f"{out_path} has no valid checkpoint; cannot "
+                         "resume from stdin (remove it to start over)")
+    else:
+        if out_path.stat().st_size:
+            logging.info("No valid checkpoint for %s; counting lines",
+                         out_path.name)
+        extra = _count_lines(out_path)
+        base_in = base_records = 0
+
+    point = Checkpoint(input=in_path.name,
+                       in_offset=_line_offset(in_path, extra, start=base_in),
+                       out_offset=out_path.stat().st_size,
+                       records=base_records + extra,
+                       last_sha1=record_sha1(last_line(out_path)))
+    logging.info("Resuming: %d records already encoded in %s (input byte %d)",
+                 point.records, out_path.name, point.in_offset)
+    return point
+
+
+def _load_analysers(aspects: Iterable[str] | None = None,
+                    exclude: Iterable[str] | None = None) -> List:
+    """Instantiate the selected aspect modules (default: all) once and run
+    their one-time setup() (model loading).  Unselected modules are never
+    imported.  Modules that fail to import or set up are dropped."""
+    analysers = []
+    for name in select_aspects(aspects, exclude):
         try:
-            for k, v in Mod(text).analyze().items():
-                out[k] = v
+            Mod = _aspect_class(name)
+            an = Mod()
+            an.setup()
+            analysers.append(an)
         except Exception as e:  # noqa: BLE001
-            logging.exception("Module %s failed; skipping (%s)", Mod.__name__, e)
+            logging.exception("Module %s failed to load; skipping (%s)",
+                              name, e)
+    logging.info("Loaded %d analysis modules: %s", len(analysers),
+                 [type(an).__name__ for an in analysers])
+    if any(an.uses_doc for an in analysers):
+        # only the union of the enabled aspects' spaCy components
+        get_nlp(components_for(analysers))
+    for entry in registry.stats():
+        logging.info("Model %s (%s) shared by %d module(s)",
+                     entry["checkpoint"], entry["task"], entry["refs"])
+    return analysers
+
+
+def _timed(stats: BatchStats | None, key: str, n_docs: int, fn):
+    if stats is None:
+        return fn()
+    t0 = time.perf_counter()
+    result = fn()
+    stats.record(key, n_docs, time.perf_counter() - t0)
+    return result
+
+
+def _run_module(an, texts: List[str], ctxs: List[AnalysisContext],
+                stats: BatchStats | None,
+                aspects: BatchStats | None = None) -> List[dict]:
+    """`an` over a micro-batch; if the batch call fails, fall back to one
+    document at a time so a single bad text only loses its own scores
+    (counted as an error of the module in `aspects`)."""
+    key = an.models[0][0] if an.models else None
+    try:
+        if key is None:
+            return an.analyze_batch(texts, ctxs)
+        return _timed(stats, key, len(texts),
+                      lambda: an.analyze_batch(texts, ctxs))
+    except Exception as e:  # noqa: BLE001
+        if len(texts) == 1:
+            logging.exception("Module %s failed; skipping (%s)",
+                              type(an).__name__, e)
+            if aspects is not None:
+                aspects.error(module_name(an))
+            return [{}]
+        logging.warning("Module %s failed on a batch of %d; retrying one "
+                        "document at a time (%s)", type(an).__name__,
+                        len(texts), e)
+    out = []
+    for text, ctx in zip(texts, ctxs):
+        out.extend(_run_module(an, [text], [ctx], stats, aspects))
     return out
 
 
+class _Batch:
+    """A micro-batch on its way through the inference stages: per analyser
+    the result of every document (cache hits filled in up front) and the
+    positions computed fresh."""
+
+    def __init__(self, ctxs: List[AnalysisContext], analysers: List,
+                 cache: AspectCache | None = None,
+                 offsets: List[int] | None = None,
+                 tokens: List[int] | None = None):
+        self.ctxs = ctxs
+        self.texts = [ctx.text for ctx in ctxs]
+        self.offsets = offsets           # input offsets and word counts of
+        self.tokens = tokens             # the documents, when tracing
+        tracer = trace.current() if cache is not None else None
+        t0 = trace.clock()
+        self.hashes = ([data_hash(t) for t in self.texts]
+                       if cache is not None else [])
+        self.results: Dict[int, List[dict | None]] = {
+            id(an): (cache.lookup(an, self.hashes) if cache is not None
+                     else [None] * len(ctxs))
+            for an in analysers}
+        self.fresh: Dict[int, List[int]] = {id(an): [] for an in analysers}
+        if tracer is not None:
+            tracer.add(trace.CACHE, "lookup", t0,
+                       **self.extent(range(len(ctxs))))
+
+    def extent(self, idx: Sequence[int]) -> dict:
+        """Trace span fields of the documents at positions `idx`."""
+        first = idx[0]
+        if len(idx) == 1:
+            return {"doc": self.offsets[first] if self.offsets else 0,
+                    "batch": len(self.texts),
+                    "chars": len(self.texts[first]),
+                    "tokens": self.tokens[first] if self.tokens else 0}
+        return {"doc": self.offsets[first] if self.offsets else 0,
+                "docs": len(idx), "batch": len(self.texts),
+                "chars": sum(len(self.texts[i]) for i in idx),
+                "tokens": sum(self.tokens[i] for i in idx)
+                if self.tokens else 0}
+
+
+def _nli_pass(batch: _Batch, analysers: List,
+              stats: BatchStats | None = None,
+              aspects: BatchStats | None = None) -> None:
+    """Zero-shot NLI aspects: one fused pass over the documents any of them
+    still needs.  `aspects` gets per module the documents it computed and
+    an even share of the pass's time."""
+    results, texts = batch.results, batch.texts
+    nli_mods = [an for an in analysers if an.nli is not None]
+    need = sorted({i for an in nli_mods
+                   for i, r in enumerate(results[id(an)]) if r is None})
+    if not need:
+        return
+    tracer = trace.current()
+    try:
+        t0 = trace.clock()
+        per_text = _timed(stats, nli_mods[0].models[0][0], len(need),
+                          lambda: nli.fused_results(
+                              nli_mods, [texts[i] for i in need]))
+        if tracer is not None:
+            tracer.add(trace.NLI, "+".join(module_name(an) for an in nli_mods),
+                       t0, **batch.extent(need))
+        for i, row in zip(need, per_text):
+            for an, result in zip(nli_mods, row):
+                if results[id(an)][i] is None:
+                    results[id(an)][i] = result
+                    batch.fresh[id(an)].append(i)
+        if aspects is not None:
+            share = (trace.clock_ns() - t0[0]) / 1e9 / len(nli_mods)
+            for an in nli_mods:
+                aspects.record(module_name(an), len(batch.fresh[id(an)]),
+                               share)
+    except Exception as e:  # noqa: BLE001
+        logging.exception("Fused NLI stage failed; skipping %s (%s)",
+                          [type(an).__name__ for an in nli_mods], e)
+        if aspects is not None:
+            for an in nli_mods:
+                aspects.error(module_name(an), sum(
+                    r is None for r in results[id(an)]))
+
+
+def _module_pass(batch: _Batch, analysers: List,
+                 stats: BatchStats | None = None,
+                 aspects: BatchStats | None = None) -> None:
+    """Every other aspect module over the documents it still needs."""
+    for an in analysers:
+        if an.nli is not None:
+            continue
+        have = batch.results[id(an)]
+        miss = [i for i, r in enumerate(have) if r is None]
+        if miss:
+            t0 = time.perf_counter()
+            if trace.current() is not None:
+                done = _traced_module(an, batch, miss, stats, aspects)
+            else:
+                done = _run_module(an, [batch.texts[i] for i in miss],
+                                   [batch.ctxs[i] for i in miss], stats,
+                                   aspects)
+            if aspects is not None:
+                aspects.record(module_name(an), len(miss),
+                               time.perf_counter() - t0)
+            for i, result in zip(miss, done):
+                have[i] = result
+            batch.fresh[id(an)] = miss
+
+
+def _traced_module(an, batch: _Batch, idx: List[int],
+                   stats: BatchStats | None,
+                   aspects: BatchStats | None = None) -> List[dict]:
+    """`_run_module` over the documents `idx` of `batch`, with trace spans:
+    one per document for modules that analyse one document at a time (the
+    BasePOV loop), one per call for those that batch."""
+    tracer, name = trace.current(), module_name(an)
+    per_doc = (type(an).analyze_batch is BasePOV.analyze_batch
+               and not an.models)
+    out: List[dict] = []
+    for group in ([[i] for i in idx] if per_doc else [idx]):
+        t0 = trace.clock()
+        out.extend(_run_module(an, [batch.texts[i] for i in group],
+                               [batch.ctxs[i] for i in group], stats,
+                               aspects))
+        tracer.add(trace.MODULE, name, t0, **batch.extent(group))
+    return out
+
+
+def _collect(batch: _Batch, analysers: List,
+             cache: AspectCache | None = None) -> List[Dict[str, float | str]]:
+    """Store the fresh results in `cache`; one aspect dict per document."""
+    if cache is not None:
+        tracer = trace.current()
+        t0 = trace.clock()
+        for an in analysers:
+            cache.store(an, ((batch.hashes[i], batch.results[id(an)][i])
+                             for i in batch.fresh[id(an)]))
+        if tracer is not None:
+            tracer.add(trace.CACHE, "store", t0,
+                       **batch.extent(range(len(batch.ctxs))))
+    out: List[Dict[str, float | str]] = [{} for _ in batch.ctxs]
+    for an in analysers:
+        for row, result in zip(out, batch.results[id(an)]):
+            row.update(result or {})
+    return out
+
+
+def _analyse_batch(ctxs: List[AnalysisContext], analysers: List,
+                   stats: BatchStats | None = None,
+                   cache: AspectCache | None = None) -> List[Dict[str, float | str]]:
+    """Run every (already warmed) aspect module over a micro-batch of
+    documents → one aspect dict per document, in input order.  Transformer
+    modules see the whole batch at once; spaCy modules share each
+    document's parse through its context.  With a `cache`, documents whose
+    (data_hash, module, fingerprint) is stored skip that module."""
+    batch = _Batch(ctxs, analysers, cache)
+    _nli_pass(batch, analysers, stats)
+    _module_pass(batch, analysers, stats)
+    return _collect(batch, analysers, cache)
+
+
+def _analyse(text: str, analysers: List,
+             ctx: AnalysisContext | None = None) -> Dict[str, float | str]:
+    """Single-document form of `_analyse_batch`."""
+    ctx = ctx or AnalysisContext(text, components=components_for(analysers))
+    return _analyse_batch([ctx], analysers)[0]
+
+
+def _with_contexts(records: Iterable[dict], analysers: List,
+                   batch_size: int = 256, n_process: int = 1,
+                   offsets: collections.deque | None = None
+                   ) -> Iterator[Tuple[dict, AnalysisContext]]:
+    """Pair every record with its AnalysisContext, in input order.
+
+    When at least one analyser needs a parse, the texts are streamed
+    through `nlp.pipe` so spaCy batches (and optionally forks) across
+    documents instead of parsing them one at a time.  The pipeline holds
+    only the components the analysers declare.
+
+    When tracing, `offsets` holds the input offset of each record not yet
+    paired (the parse spans are keyed by it)."""
+    if not any(an.uses_doc for an in analysers):
+        for obj in records:
+            if offsets is not None:
+                offsets.popleft()
+            yield obj, AnalysisContext(obj.get("text", ""))
+        return
+
+    components = components_for(analysers)
+    senter = needs_senter_pass(analysers)
+    # an unread tee branch would buffer every record: split only as needed
+    recs, for_texts, *for_senter = itertools.tee(records, 3 if senter else 2)
+    tracer = trace.current() if offsets is not None else None
+    upstream = [0, 0]          # time nlp.pipe spent waiting for records
+
+    def _texts() -> Iterator[str]:
+        it = iter(for_texts)
+        while True:
+            t0 = trace.clock()
+            obj = next(it, _NO_RECORD)
+            upstream[0] += trace.clock_ns() - t0[0]
+            upstream[1] += trace.cpu_ns() - t0[1]
+            if obj is _NO_RECORD:
+                return
+            yield obj.get("text", "")
+
+    texts = (_texts() if tracer is not None
+             else (obj.get("text", "") for obj in for_texts))
+    docs = iter(get_nlp(components).pipe(texts, batch_size=batch_size,
+                                         n_process=n_process))
+    # senter boundaries for the modules that pin them, batched the same way
+    segs = (iter(get_nlp({"senter"}).pipe(
+                (obj.get("text", "") for obj in for_senter[0]),
+                batch_size=batch_size, n_process=n_process))
+            if senter else None)
+    starts = None
+    for obj in recs:
+        if tracer is None:
+            doc = next(docs)
+            if segs is not None:
+                starts = sent_starts(next(segs))
+        else:
+            waited = tuple(upstream)
+            t0 = trace.clock()
+            doc = next(docs)
+            if segs is not None:
+                starts = sent_starts(next(segs))
+            # the span starts later by the time spent upstream meanwhile
+            tracer.add(trace.PARSE, "spacy",
+                       (t0[0] + upstream[0] - waited[0],
+                        t0[1] + upstream[1] - waited[1]),
+                       doc=offsets.popleft(), chars=len(doc.text),
+                       tokens=len(doc))
+        yield obj, AnalysisContext(obj.get("text", ""), doc=doc,
+                                   components=components,
+                                   senter_starts=starts)
+
+
+_NO_RECORD = object()
+
+
+def _token_count(text: str) -> int:
+    """Cheap length proxy for bucketing: words in the part of the text the
+    transformer aspects actually see."""
+    return len(nli.premise(text).split())
+
+
+class _Window:
+    """A look-ahead window of (record, context) pairs between the stages:
+    its length buckets (one `_Batch` each) and the input bytes it covers."""
+
+    def __init__(self, pairs: List[Tuple[dict, AnalysisContext]],
+                 n_bytes: int):
+        self.pairs = pairs
+        self.n_bytes = n_bytes
+        self.buckets: List[List[int]] = []
+        self.batches: List[_Batch] = []
+        self.aspects: List[Dict[str, float | str]] = [{} for _ in pairs]
+        self.offsets: List[int] | None = None       # when tracing
+
+
+def _plan(window: _Window, analysers: List, batch_size: int,
+          padding: PaddingStats, cache: AspectCache | None = None) -> None:
+    """Bucket `window` by length into micro-batches (cache lookups done)."""
+    lengths = [_token_count(ctx.text) for _, ctx in window.pairs]
+    offsets, words = window.offsets, None
+    if offsets is not None:
+        words = [ctx.text.count(" ") + 1 for _, ctx in window.pairs]
+    for bucket in length_buckets(lengths, batch_size):
+        padding.record([lengths[i] for i in bucket])
+        window.buckets.append(bucket)
+        window.batches.append(_Batch(
+            [window.pairs[i][1] for i in bucket], analysers, cache,
+            offsets=[offsets[i] for i in bucket] if words is not None else None,
+            tokens=[words[i] for i in bucket] if words is not None else None))
+    for start in range(0, len(lengths), batch_size):
+        padding.record_baseline(lengths[start:start + batch_size])
+
+
+class _Totals:
+    """Counters of one run – or of one worker's share of it."""
+
+    def __init__(self, batch_size: int):
+        self.stats = BatchStats(batch_size)
+        self.aspects = BatchStats(batch_size)       # keyed by module name
+        self.padding = PaddingStats()
+        self.queues: Dict[str, QueueStats] = {}
+        self.docs = self.parses = 0
+        self.cache_hits = self.cache_misses = 0
+        self.admission_wait = 0.0        # seconds producers waited (Gate)
+
+    def merge(self, other: "_Totals") -> None:
+        self.stats.merge(other.stats)
+        self.aspects.merge(other.aspects)
+        self.padding.merge(other.padding)
+        for name, q in other.queues.items():
+            if name in self.queues:
+                self.queues[name].merge(q)
+            else:
+                self.queues[name] = q
+        self.docs += other.docs
+        self.parses += other.parses
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+        self.admission_wait += other.admission_wait
+
+    def depths(self) -> str:
+        """Last seen fill of each stage queue, for the progress bar."""
+        return " ".join(f"{q.name} {q.depth}/{q.capacity}"
+                        for q in self.queues.values())
+
+    def log(self) -> None:
+        self.stats.log()
+        self.padding.log()
+        for q in self.queues.values():
+            q.log()
+        logging.info("spaCy parses: %d for %d docs (%.2f per doc)",
+                     self.parses, self.docs,
+                     self.parses / self.docs if self.docs else 0.0)
+        lookups = self.cache_hits + self.cache_misses
+        if lookups:
+            logging.info("Aspect cache: %d hits, %d misses (%.1f%% hit)",
+                         self.cache_hits, self.cache_misses,
+                         100 * self.cache_hits / lookups)
+        if self.admission_wait:
+            logging.info("Admission control held documents back for %.1f s",
+                         self.admission_wait)
+        for name, n in sorted(self.aspects.errors.items()):
+            logging.warning("Module %s failed on %d document(s)", name, n)
+
+
+def _run_metrics(totals: _Totals, bar,
+                 governor: Governor | None = None) -> Callable:
+    """`collect` callback of an abms.metrics.Exporter for a run counted by
+    `totals`, with byte progress (and ETA) from the progress `bar` and the
+    state of `governor`."""
+    from . import metrics
+
+    started, clock0, first = time.time(), time.monotonic(), bar.n
+    docs_rate = metrics.Rate()
+    progress = {"docs": -1, "at": started}
+
+    def collect(m, final: bool) -> None:
+        docs = totals.docs
+        if docs != progress["docs"]:
+            progress.update(docs=docs, at=time.time())
+        m.add("running", 0 if final else 1,
+              help="1 while the run is in progress")
+        m.add("start_time_seconds", started, help="Unix time the run began")
+        m.add("last_progress_time_seconds", progress["at"],
+              help="Unix time documents were last completed (stalls)")
+        m.add("docs_total", docs, kind="counter",
+              help="documents encoded by this run")
+        m.add("docs_per_second", docs_rate(docs),
+              help="documents per second since the last snapshot")
+
+        aspects = totals.aspects
+        for name in sorted(aspects.docs.keys() | aspects.errors.keys()):
+            label = {"aspect": name}
+            m.add("aspect_docs_total", aspects.docs.get(name, 0), label,
+                  "counter", "documents an aspect module computed "
+                             "(cache hits excluded)")
+            m.add("aspect_seconds_total", aspects.seconds.get(name, 0.0),
+                  label, "counter", "time spent in an aspect module")
+            m.add("aspect_docs_per_second", aspects.docs_per_sec(name),
+                  label, help="documents per second of module time")
+            m.add("aspect_errors_total", aspects.errors.get(name, 0), label,
+                  "counter", "documents an aspect module failed on")
+
+        for q in list(totals.queues.values()):
+            m.add("queue_depth", q.depth, {"queue": q.name},
+                  help="items in a pipeline stage queue")
+            m.add("queue_capacity", q.capacity, {"queue": q.name},
+                  help="capacity of a pipeline stage queue")
+
+        lookups = totals.cache_hits + totals.cache_misses
+        m.add("cache_hits_total", totals.cache_hits, kind="counter",
+              help="aspect cache hits")
+        m.add("cache_misses_total", totals.cache_misses, kind="counter",
+              help="aspect cache misses")
+        m.add("cache_hit_ratio", totals.cache_hits / lookups if lookups else 0,
+              help="aspect cache hit ratio of this run")
+
+        m.add("rss_bytes", metrics.rss(), {"process": "main"},
+              help="resident memory (workers: summed, shared pages "
+                   "counted in each)")
+        workers = metrics.children_rss()
+        if workers:
+            m.add("rss_bytes", workers, {"process": "workers"})
+        for entry in registry.stats():
+            if entry["loaded"]:
+                m.add("model_bytes", entry["bytes"],
+                      {"checkpoint": entry["checkpoint"],
+                       "task": entry["task"]},
+                      help="size of the loaded model weights")
+
+        m.add("admission_wait_seconds_total", totals.admission_wait,
+              kind="counter", help="time documents were held back by "
+                                   "admission control")
+        if governor is not None and governor.active:
+            m.add("governor_scale", governor.scale,
+                  help="share of the nominal in-flight documents and batch "
+                       "size allowed now (1: not throttled)")
+            for cause, n in sorted(dict(governor.events).items()):
+                m.add("governor_throttle_events_total", n, {"cause": cause},
+                      "counter", "throttle steps by cause")
+            m.add("governor_throttled_seconds_total",
+                  governor.seconds_throttled(), kind="counter",
+                  help="time spent throttled")
+
+        done, total = bar.n, bar.total
+        m.add("input_bytes_done", done, kind="counter",
+              help="input bytes encoded (resumed bytes included)")
+        if total:
+            m.add("input_bytes_total", total, help="input size in bytes")
+            elapsed = time.monotonic() - clock0
+            rate = (done - first) / elapsed if elapsed > 0 else 0
+            if rate > 0:
+                m.add("eta_seconds", max(0, total - done) / rate,
+                      help="estimated seconds left at this run's mean rate")
+
+    return collect
+
+
+@contextlib.contextmanager
+def _exporting(totals: _Totals, bar, metrics_file: pathlib.Path | str | None,
+               metrics_port: int | None, metrics_interval: float,
+               governor: Governor | None = None) -> Iterator:
+    """Live metrics of the run for the duration of the block (a no-op
+    without a file or port)."""
+    if metrics_file is None and metrics_port is None:
+        yield
+        return
+    from .metrics import Exporter
+
+    with Exporter(_run_metrics(totals, bar, governor), metrics_file,
+                  metrics_port,
+                  interval=metrics_interval):
+        yield
+
+
+def _encode_lines(lines: Iterable[bytes], analysers: List, totals: _Totals,
+                  cache: AspectCache | None = None, *,
+                  nlp_batch_size: int, nlp_n_process: int, batch_size: int,
+                  max_wait: float | None, window: int, merge: bool = False,
+                  compact: bool = False, as_records: bool = False,
+                  start: int = 0, record: int = 0,
+                  governor: Governor | None = None) -> Iterator[Tuple[List, int]]:
+    """Encode raw JSONL `lines` → (output lines, input bytes consumed) per
+    look-ahead window, in input order.  With `merge` the results update the
+    record's existing "aspects" instead of replacing them; `compact` picks
+    the fast, not byte-compatible, encoder (see abms.codec).  With
+    `as_records` the record dicts are yielded instead of JSON lines
+    (columnar output).
+
+    The work runs as threaded stages over bounded queues (abms.pipeline):
+
+        read    raw lines from `lines`
+        parse   JSON decode + spaCy (`nlp.pipe`), grouped into windows
+        nli     length buckets, cache lookups, the fused NLI pass
+        models  the other aspect modules, cache stores
+        json    output lines
+
+    while the caller's thread writes, so at most a few windows are in
+    flight whatever the size of the input.  Queue depths go to `totals`.
+
+    Windows end at multiples of `window` records (`record` is the number
+    of the first line), so with `max_wait` None any split of the input at
+    such records gets the windows – and micro-batches – of one pass.
+
+    With a tracer active (abms.trace) every stage records spans, keyed by
+    the input offset of the document (`lines` start at offset `start`).
+
+    An active `governor` (abms.governor) caps the documents between decode
+    and json (never below one spaCy batch, or one micro-batch without
+    spaCy) and the micro-batch size, both shrinking under memory / CPU
+    pressure."""
+    sizes: collections.deque = collections.deque()
+    tracer = trace.current()
+    offsets = collections.deque() if tracer is not None else None
+    pos = start                          # input offset reached by nli
+    gate, waited = None, [0.0]
+    if governor is not None and governor.active:
+        floor = (nlp_batch_size * (nlp_n_process + 1)
+                 if any(an.uses_doc for an in analysers) else batch_size)
+        gate = Gate(governor, max(16 * window, floor), floor)
+
+    def _records(raw: Iterable[bytes]) -> Iterator[dict]:
+        if tracer is None:
+            for line in raw:
+                if gate is not None:
+                    gate.acquire()
+                sizes.append(len(line))  # parse thread appends, nli pops
+                yield codec.loads(line)
+            return
+        offset = start
+        for line in raw:
+            if gate is not None:
+                gate.acquire()
+            sizes.append(len(line))
+            offsets.append(offset)
+            t0 = trace.clock()
+            obj = codec.loads(line)
+            tracer.add(trace.DECODE, "json", t0, doc=offset,
+                       chars=len(line))
+            offset += len(line)
+            yield obj
+
+    def _nli_stage(pairs: List) -> _Window:
+        nonlocal pos
+        lengths = [sizes.popleft() for _ in pairs]
+        win = _Window(pairs, sum(lengths))
+        if tracer is not None:
+            win.offsets = list(itertools.accumulate(lengths[:-1], initial=pos))
+        pos += win.n_bytes
+        if cache is not None:
+            hits, misses = cache.hits, cache.misses
+        _plan(win, analysers, governor.batch_size(batch_size)
+              if governor is not None else batch_size, totals.padding, cache)
+        if cache is not None:            # lookups run in this stage only
+            totals.cache_hits += cache.hits - hits
+            totals.cache_misses += cache.misses - misses
+        for batch in win.batches:
+            _nli_pass(batch, analysers, totals.stats, totals.aspects)
+        return win
+
+    def _models_stage(win: _Window) -> _Window:
+        for bucket, batch in zip(win.buckets, win.batches):
+            _module_pass(batch, analysers, totals.stats, totals.aspects)
+            for i, result in zip(bucket, _collect(batch, analysers, cache)):
+                win.aspects[i] = result
+        win.batches = []                 # release the contexts / parses
+        return win
+
+    def _json_stage(win: _Window) -> Tuple[List, int]:
+        t0 = trace.clock()
+        out = []
+        for (obj, ctx), result in zip(win.pairs, win.aspects):
+            if merge:
+                obj.setdefault("aspects", {}).update(result)
+            else:
+                obj["aspects"] = result
+            totals.docs += 1
+            totals.parses += ctx.parse_count
+            out.append(obj if as_records else
+                       codec.dumps(obj, ensure_ascii=False,
+                                   compact=compact) + "\n")
+        if tracer is not None:
+            tracer.add(trace.JSON, "json", t0, doc=win.offsets[0],
+                       docs=len(out), batch=len(out),
+                       chars=0 if as_records else sum(map(len, out)))
+        if gate is not None:
+            gate.release(len(out))
+            totals.admission_wait += gate.waited - waited[0]
+            waited[0] = gate.waited
+        return out, win.n_bytes
+
+    with Pipeline(totals.queues) as pipe, gate or contextlib.nullcontext():
+        read = pipe.stage("read", lines, capacity=4 * window)
+        pairs = _with_contexts(_records(pipe.drain(read)), analysers,
+                               nlp_batch_size, nlp_n_process, offsets)
+        windows = micro_batches(pairs, window, max_wait,
+                                q=pipe.queue("parse", 4 * window),
+                                first=window - record % window)
+        inferred = pipe.stage("nli", windows, _nli_stage)
+        scored = pipe.stage("models", pipe.drain(inferred), _models_stage)
+        encoded = pipe.stage("json", pipe.drain(scored), _json_stage)
+        yield from pipe.drain(encoded)
+
+
+# ----------------------------------------------------------------------
+# multi-process engine
+# ----------------------------------------------------------------------
+# Analysers of the parent, inherited by forked workers: the weights loaded
+# before the fork are shared copy-on-write instead of loaded N times.
+_WORKER_ANALYSERS: List = []
+_WORKER_CACHE: AspectCache | None = None     # reconnects per process
+_WORKER_GOVERNOR: Governor | None = None     # each worker's share
+
+
+def _byte_ranges(fp: pathlib.Path, start: int,
+                 parts: int) -> List[Tuple[int, int]]:
+    """Split [start, EOF) into about `parts` contiguous ranges that begin
+    and end on line boundaries (from the line index when `fp` has a
+    current one)."""
+    index = line_index.open_index(fp)
+    if index is not None:
+        with index:
+            return index.byte_ranges(start, parts, min_bytes=_CHUNK // 16)
+    end = fp.stat().st_size
+    if start >= end:
+        return []
+    step = max(_CHUNK // 16, (end - start) // max(1, parts))
+    bounds = [start]
+    with fp.open("rb") as fh:
+        pos = start + step
+        while pos < end:
+            fh.seek(pos - 1)
+            fh.readline()                  # move on to the next line start
+            pos = fh.tell()
+            if pos >= end:
+                break
+            bounds.append(pos)
+            pos += step
+    bounds.append(end)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _window_ranges(fp: pathlib.Path, start: int, record: int, parts: int,
+                   window: int) -> List[Tuple[int, int, int]]:
+    """`_byte_ranges` with every cut moved on to the next line whose record
+    number (`record` at `start`) is a multiple of `window`, so each range
+    forms the windows a single pass would.  → (start, end, first record)
+    per range; the records are counted on the line index when `fp` has a
+    current one, else in one pass over the file."""
+    ranges = _byte_ranges(fp, start, parts)
+    if not ranges:
+        return []
+    end = ranges[-1][1]
+    bounds = [(start, record)]
+    index = line_index.open_index(fp)
+    if index is not None:
+        with index:
+            base = index.line_at(start) - record
+            for cut, _ in ranges[1:]:
+                rec = -(-(index.line_at(cut) - base) // window) * window
+                if rec + base >= len(index):
+                    break
+                pos = index.offsets[rec + base]
+                if pos > bounds[-1][0]:
+                    bounds.append((pos, rec))
+    else:
+        with fp.open("rb") as fh:
+            fh.seek(start)
+            pos, rec = start, record
+            for cut, _ in ranges[1:]:
+                while pos < cut or rec % window:
+                    line = fh.readline()
+                    if not line:
+                        break
+                    pos, rec = pos + len(line), rec + 1
+                if pos >= end:
+                    break
+                if pos > bounds[-1][0]:
+                    bounds.append((pos, rec))
+    return [(a, b, rec) for (a, rec), (b, _) in zip(bounds,
+                                                   bounds[1:] + [(end, 0)])]
+
+
+def _worker_init(threads: int) -> None:
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    torch = sys.modules.get("torch")        # only if the parent loaded models
+    if torch is not None:
+        torch.set_num_threads(threads)      # no oversubscription across workers
+
+
+def _encode_range(task: Tuple[str, int, int, int, dict]
+                  ) -> Tuple[List, _Totals]:
+    path, start, end, record, opts = task
+    totals = _Totals(opts["batch_size"])
+    out: List = []
+    for lines, _ in _encode_lines(_read_range(path, start, end),
+                                  _WORKER_ANALYSERS, totals, _WORKER_CACHE,
+                                  start=start, record=record,
+                                  governor=_WORKER_GOVERNOR, **opts):
+        out.extend(lines)
+    trace.flush()                       # workers exit without cleanup
+    return out, totals
+
+
+def _can_fork(analysers: List) -> bool:
+    if "fork" not in multiprocessing.get_all_start_methods():
+        logging.warning("--workers needs the 'fork' start method; "
+                        "running single-process")
+        return False
+    if any(an.models for an in analysers) and registry.on_gpu():
+        logging.warning("CUDA models cannot be shared with forked workers; "
+                        "running single-process")
+        return False
+    return True
+
+
+@contextlib.contextmanager
+def _worker_pool(analysers: List, cache: AspectCache | None,
+                 workers: int, what: str,
+                 governor: Governor | None = None) -> Iterator:
+    """A fork pool of `workers` processes that inherit `analysers` (and
+    `cache`) as `_WORKER_ANALYSERS` / `_WORKER_CACHE`, and a share of
+    `governor`'s budget as `_WORKER_GOVERNOR`."""
+    global _WORKER_ANALYSERS, _WORKER_CACHE, _WORKER_GOVERNOR
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    logging.info("Forking %d workers (%d torch threads each) over %s",
+                 workers, threads, what)
+    _WORKER_ANALYSERS, _WORKER_CACHE = analysers, cache
+    if governor is not None and governor.active:
+        _WORKER_GOVERNOR = governor.share(workers)
+    trace.flush()          # or the children inherit the buffered spans
+    gc.collect()
+    gc.freeze()            # keep GC bookkeeping off the shared pages
+    try:
+        with multiprocessing.get_context("fork").Pool(
+                workers, initializer=_worker_init,
+                initargs=(threads,)) as pool:
+            yield pool
+    finally:
+        gc.unfreeze()
+        _WORKER_ANALYSERS, _WORKER_CACHE, _WORKER_GOVERNOR = [], None, None
+
+
+def _write(writer, out: List, in_offset: int, n_bytes: int) -> None:
+    """`writer.write` (commits included) with a trace span."""
+    tracer = trace.current()
+    t0 = trace.clock()
+    writer.write(out, in_offset=in_offset)      # group commit per policy
+    if tracer is not None:
+        tracer.add(trace.WRITE, type(writer).__name__, t0,
+                   doc=in_offset - n_bytes, docs=len(out), batch=len(out),
+                   chars=n_bytes)
+
+
+def _encode_parallel(in_path: pathlib.Path, start: int, record: int,
+                     writer: JsonlWriter, bar,
+                     analysers: List, totals: _Totals, workers: int,
+                     opts: dict, cache: AspectCache | None = None,
+                     governor: Governor | None = None) -> None:
+    """Fan contiguous byte ranges of the input out to `workers` forked
+    processes.  Finished ranges pass through a bounded reorder buffer, so
+    the output is written strictly in input order – byte-identical to the
+    single-process path, whose windows the ranges are cut on (see
+    `_window_ranges`) – and a straggler range stalls dispatch instead of
+    letting results pile up.  `record` is the record number at `start`."""
+    ranges = _window_ranges(in_path, start, record, workers * 32,
+                            opts["window"])
+    tasks = [(str(in_path), a, b, rec, dict(opts, nlp_n_process=1))
+             for a, b, rec in ranges]
+    buf: ReorderBuffer[Tuple[List, _Totals]] = ReorderBuffer(4 * workers)
+
+    with _worker_pool(analysers, cache, workers,
+                      f"{len(tasks)} ranges", governor) as pool:
+
+        def _dispatch() -> None:
+            for seq, task in enumerate(tasks):
+                buf.reserve(seq)
+                if buf.failed:
+                    return
+                pool.apply_async(
+                    _encode_range, (task,),
+                    callback=functools.partial(buf.put, seq),
+                    error_callback=buf.fail)
+
+        feeder = threading.Thread(target=_dispatch, daemon=True,
+                                  name="abms-dispatch")
+        feeder.start()
+        try:
+            for (lines, part), (a, b, _) in zip(buf.drain(len(tasks)),
+                                                ranges):
+                _write(writer, lines, b, b - a)
+                totals.merge(part)
+                bar.update(b - a)
+        except BaseException as e:
+            buf.fail(e)
+            raise
+        feeder.join()
+    logging.info("Reorder buffer: peak %d/%d ranges held, dispatch stalled "
+                 "%.1f s", buf.max_held, buf.capacity, buf.stalled_seconds)
+
+
 # ----------------------------------------------------------------------
 # public API
 # ----------------------------------------------------------------------
 def encode_file(in_path: pathlib.Path | str,
-                out_path: pathlib.Path | str) -> None:
+                out_path: pathlib.Path | str,
+                *,
+                nlp_batch_size: int = 256,
+                nlp_n_process: int = 1,
+                batch_size: int = 16,
+                max_wait: float = 0.05,
+                window: int = 256,
+                workers: int = 1,
+                fsync: str | None = None,
+                cache: AspectCache | None = None,
+                aspects: Iterable[str] | None = None,
+                exclude: Iterable[str] | None = None,
+                merge: bool = False,
+                compact_json: bool = False,
+                output_format: str | None = None,
+                trace_file: pathlib.Path | str | None = None,
+                metrics_file: pathlib.Path | str | None = None,
+                metrics_port: int | None = None,
+                metrics_interval: float = 5.0,
+                rss_budget: int | None = None,
+                cpu_target: float | None = None,
+                memory_target: float | None = None) -> None:
     """
     Read `in_path` (JSONL with a "text" field) and append aspect scores,
     writing/continuing `out_path`.
 
+    `nlp_batch_size` / `nlp_n_process` are handed to spaCy's `nlp.pipe`.
+    The scheduler looks ahead over `window` records (reading stdin, it
+    closes the window early once `max_wait` seconds have passed since its
+    first record arrived), buckets them by length and hands them to the
+    transformer aspects in micro-batches of up to `batch_size`.  The
+    output is still written in input order.
+
+    With `workers` > 1 the models are loaded once here and the process
+    forks; workers share the weights copy-on-write and each encodes
+    contiguous byte ranges of the input, cut between windows.  The
+    micro-batches are thus those of a single process and so is the output,
+    byte for byte – batched models pad per batch, so their scores can move
+    in the last float digits with another grouping.  Outside that
+    guarantee: stdin input (`max_wait`), a governor shrinking
+    `batch_size`, and cache hits (only the misses are batched).
+
+    `fsync` is the durability policy (every-doc, every-N, every-Ts,
+    on-exit; default every-2s, every-60s for Parquet): output is committed
+    in groups, so a crash loses at most one commit interval.
+
+    `cache` (an `AspectCache`) is consulted per document and module before
+    anything runs; hits skip model inference.
+
+    `aspects` restricts the run to those aspect modules (file names such as
+    ``"genre_analysis"``, see `available_aspects`), `exclude` drops
+    modules from it; the others are not even imported, so their models
+    (and the spaCy pipeline / NLI model when none of the selected modules
+    needs them) never load.  With `merge` the input is an existing tags
+    file whose "aspects" are updated in place.  The module versions behind
+    every aspect of `out_path` are recorded in ``<out>.versions.json``.
+
+    Either path may end in ``.gz`` or ``.zst`` (read / written compressed;
+    compression runs on a background thread, one frame per commit) or be
+    ``-`` for stdin / stdout.  `workers` needs an uncompressed input file.
+
+    Output lines are byte-identical to ``json.dumps(record,
+    ensure_ascii=False)``; `compact_json` writes equivalent but compact
+    JSON with the fast encoder instead (see abms.codec).
+
+    `output_format` "parquet" (the default for an `out_path` ending in
+    ``.parquet``) writes a Parquet dataset directory with one typed column
+    per aspect instead, one part file per commit (see abms.columnar).
+
+    `trace_file` appends timing spans per document, module and stage to
+    that file (see abms.trace; ``abms trace summarize`` reads it).
+
+    `metrics_file` / `metrics_port` publish live metrics every
+    `metrics_interval` seconds as a Prometheus textfile / on
+    http://127.0.0.1:PORT/metrics (see abms.metrics).
+
+    `rss_budget` (bytes), `memory_target` (share of the machine's RAM in
+    use, 0–1) and `cpu_target` (busy share of all cores, 0–1) turn on
+    admission control (abms.governor): documents in flight and
+    micro-batch sizes shrink while memory or CPU is over them, and grow
+    back after; throttling and its cause are logged.  With `workers` each
+    worker gets an equal part of the budget left after loading the models.
+
     The function is *idempotent*: re-running it after an interruption
-    continues where it left off.
+    continues where it left off (a torn final line – or frame – is cut off
+    first).  The ``<out>.ckpt`` sidecar written at each commit lets a
+    restart seek straight to the last committed input/output offsets.
+    Output to stdout starts over every time.
     """
     in_path = pathlib.Path(in_path)
     out_path = pathlib.Path(out_path)
+    parquet = (output_format or ("parquet" if columnar.is_parquet(out_path)
+                                 else "jsonl")) == "parquet"
+    if parquet:
+        columnar.check_target(out_path)
 
-    processed = 0
-    if out_path.exists():
-        processed = _count_lines(out_path)
-        logging.info("Resuming: %d lines already encoded in %s",
-                     processed, out_path.name)
+    policy = FsyncPolicy.parse(
+        fsync or (columnar.DEFAULT_COMMIT if parquet else DEFAULT_FSYNC))
+    resume = _resume_point(in_path, out_path, parquet)
 
-    total = _count_lines(in_path)
-    bar = tqdm(total=total,
-               initial=processed,
-               unit="doc",
+    size = streams.input_size(in_path)      # None: compressed or stdin
+    # one warmed instance per selected module
+    analysers = _load_analysers(aspects, exclude)
+    for an in analysers:
+        an.batch_size = batch_size
+    versions = load_versions(in_path) if merge else {}
+    versions.update((module_name(an), fingerprint(type(an))) for an in analysers)
+    if not streams.is_stdio(out_path):
+        _save_versions(out_path, versions)
+    if cache is not None:
+        cache.invalidate_stale(analysers)
+    totals = _Totals(batch_size)
+    governor = Governor(rss_budget, cpu_target, memory_target=memory_target)
+    opts = dict(nlp_batch_size=nlp_batch_size, nlp_n_process=nlp_n_process,
+                batch_size=batch_size,
+                # time flushes only where waiting matters: a live stream
+                max_wait=max_wait if streams.is_stdio(in_path) else None,
+                window=max(window, batch_size), merge=merge,
+                compact=compact_json, as_records=parquet)
+    if parquet:
+        writer = columnar.ParquetWriter(out_path, columnar.schema_for(analysers),
+                                        policy, checkpoint=resume)
+    else:
+        writer = JsonlWriter(out_path, policy, checkpoint=resume)
+    # byte progress (of the decompressed input): no line count up front
+    bar = tqdm(total=size,
+               initial=resume.in_offset,
+               unit="B",
+               unit_scale=True,
+               unit_divisor=1024,
                desc=in_path.name,
                dynamic_ncols=True)
 
-    with in_path.open() as fin, out_path.open("a") as fout:
-        # skip lines we already processed
-        for _ in range(processed):
-            next(fin)
+    if trace_file is not None:
+        trace.start(trace_file)
+    try:
+        with writer, _exporting(totals, bar, metrics_file, metrics_port,
+                                metrics_interval, governor):
+            parallel = workers > 1 and streams.is_plain_file(in_path)
+            if workers > 1 and not parallel:
+                logging.warning("--workers needs an uncompressed input file; "
+                                "running single-process")
+            if parallel and _can_fork(analysers):
+                _encode_parallel(in_path, resume.in_offset, resume.records,
+                                 writer, bar, analysers, totals, workers,
+                                 opts, cache, governor)
+            else:
+                pos = resume.in_offset
+                lines = _read_range(in_path, pos)
+                for out, n_bytes in _encode_lines(lines, analysers, totals,
+                                                  cache, start=pos,
+                                                  record=resume.records,
+                                                  governor=governor, **opts):
+                    pos += n_bytes
+                    _write(writer, out, pos, n_bytes)
+                    bar.set_postfix_str(
+                        " ".join(filter(None, (totals.depths(),
+                                               governor.status()))),
+                        refresh=False)
+                    bar.update(n_bytes)
+    finally:
+        if trace_file is not None:
+            trace.stop()
+
+    bar.close()
+    for an in analysers:
+        an.close()
+    totals.log()
+    governor.log()
+    logging.info("✓ done  %s  (%d docs)", out_path.name, writer.records)
 
-        for line in fin:
-            obj = json.loads(line)
-            text = obj.get("text", "")
-            obj["aspects"] = _analyse(text)
-            fout.write(json.dumps(obj, ensure_ascii=False) + "\n")
 
-            # flush every doc → minimal data loss on crash
-            fout.flush()
-            os.fsync(fout.fileno())
+def reencode_file(tags_path: pathlib.Path | str,
+                  out_path: pathlib.Path | str | None = None,
+                  *,
+                  aspects: Iterable[str] | None = None,
+                  exclude: Iterable[str] | None = None,
+                  **options) -> List[str]:
+    """
+    Recompute `aspects` (default: the stale ones, see `stale_aspects`),
+    minus `exclude`, of an existing *.tags.jsonl file and merge them into
+    each record's "aspects".  Models of the other aspects never load.
 
-            bar.update()
+    Without `out_path` the file is rewritten in place (via a resumable
+    ``<tags>.reencode`` file – ``<tags>.reencode.zst`` etc. for compressed
+    files – that replaces it at the end).  `options` are passed on to
+    `encode_file`.  Returns the aspects recomputed.
+    """
+    tags_path = pathlib.Path(tags_path)
+    in_place = out_path is None or pathlib.Path(out_path) == tags_path
+    if in_place and streams.is_stdio(tags_path):
+        raise ValueError("re-encoding stdin needs an output path")
+    names = select_aspects(
+        aspects if aspects is not None else stale_aspects(tags_path), exclude)
+    if not names:
+        logging.info("%s is up to date; nothing to re-encode", tags_path.name)
+        return []
+    logging.info("Re-encoding %s: %s", tags_path.name, names)
 
-    bar.close()
-    logging.info("✓ done  %s  (%d docs)", out_path.name, total)
+    if in_place:
+        base, suffix = streams.strip_compression(tags_path)
+        target = base.with_name(base.name + ".reencode" + suffix)
+    else:
+        target = pathlib.Path(out_path)
+    encode_file(tags_path, target, aspects=names, merge=True, **options)
+    if in_place:
+        os.replace(_versions_path(target), _versions_path(tags_path))
+        os.replace(target, tags_path)
+        Checkpoint.path_for(target).unlink(missing_ok=True)
+    return names
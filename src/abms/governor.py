@@ -0,0 +1,313 @@
+# ────────────────────────────────────────────────────────────────────
+#  src/abms/governor.py
+# ────────────────────────────────────────────────────────────────────
+"""
+Memory- and CPU-aware admission control, shared by the encoder and the
+publisher app.
+
+A `Governor` compares the process's resident memory with an RSS budget,
+the machine's memory in use with a target share of RAM and its CPU load
+with a target, and turns them into one scale in (0, 1] for the knobs that
+decide how much work is in flight:
+
+    gov = Governor(rss_budget=8 << 30, cpu_target=0.85)
+    gate = Gate(gov, capacity=4096, floor=512)   # documents in flight
+    gate.acquire(n) … gate.release(n)
+    size = gov.batch_size(16)                    # micro-batch cap right now
+
+Readings never block: memory comes from /proc (psutil elsewhere), CPU
+from the /proc/stat counters since the previous reading.  They are taken
+at most once per `interval`, by whichever thread asks first.  Under
+pressure the scale halves (memory) or drops by a quarter (CPU); once
+both are back in range it climbs by a tenth per interval, so the limits
+settle just under the budget instead of swinging between extremes.
+
+Nothing sleeps or spins: a producer over the `Gate` limit waits on a
+condition until documents are released – backpressure for the stages
+upstream – and a smaller batch size applies to the next batch planned.
+Throttling is logged with its reason ("rss 7.9 GiB > budget 7.5 GiB")
+when it starts or changes cause, and again when it lifts; `status` and
+the counters feed the progress bar, the end-of-run log and the live
+metrics (abms.metrics).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Dict
+
+from .metrics import rss
+
+_CUT_MEMORY = 0.5             # scale factor per interval over a memory limit
+_CUT_CPU = 0.75               # … over the CPU target
+_RAISE = 0.1                  # scale added per interval without pressure
+_HOLD = 0.9                   # above this share of a memory limit: no raise
+_MIN_SCALE = 0.01
+_STALL = 30.0                 # seconds a Gate waits before admitting anyway
+
+
+def _size(n: float) -> str:
+    if n >= 1 << 30:
+        return f"{n / (1 << 30):.1f} GiB"
+    return f"{n / (1 << 20):.0f} MiB"
+
+
+def physical_memory() -> int:
+    """Installed RAM in bytes (0 if unknown)."""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        pass
+    try:
+        import psutil
+        return psutil.virtual_memory().total
+    except Exception:  # noqa: BLE001
+        return 0
+
+
+def memory_in_use() -> float:
+    """Share of the machine's RAM in use (total − available), 0–1."""
+    try:
+        info = {}
+        with open("/proc/meminfo", "rb") as fh:
+            for line in fh:
+                key, value = line.split(b":", 1)
+                info[key] = int(value.split()[0])
+        return 1 - info[b"MemAvailable"] / info[b"MemTotal"]
+    except (OSError, KeyError, ValueError, ZeroDivisionError):
+        pass
+    try:
+        import psutil
+        return psutil.virtual_memory().percent / 100
+    except Exception:  # noqa: BLE001
+        return 0.0
+
+
+def private_memory() -> int:
+    """Memory only this process maps (not shared with its parent – for a
+    forked worker: not the inherited model weights); RSS if unknown."""
+    try:
+        with open("/proc/self/smaps_rollup", "rb") as fh:
+            kib = sum(int(line.split()[1]) for line in fh
+                      if line.startswith((b"Private_Clean:",
+                                          b"Private_Dirty:")))
+        return kib << 10
+    except (OSError, IndexError, ValueError):
+        return rss()
+
+
+class _CpuMeter:
+    """Busy share of all cores since the previous call."""
+
+    def __init__(self):
+        self._last = self._read()
+
+    @staticmethod
+    def _read():
+        try:
+            with open("/proc/stat", "rb") as fh:
+                ticks = [int(t) for t in fh.readline().split()[1:]]
+            return sum(ticks), ticks[3] + ticks[4]     # total, idle + iowait
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def __call__(self) -> float:
+        now = self._read()
+        if now is not None and self._last is not None:
+            last, self._last = self._last, now
+            total = now[0] - last[0]
+            return 1 - (now[1] - last[1]) / total if total > 0 else 0.0
+        try:
+            import psutil
+            return psutil.cpu_percent(interval=None) / 100
+        except Exception:  # noqa: BLE001
+            load = os.getloadavg()[0] if hasattr(os, "getloadavg") else 0.0
+            return min(1.0, load / (os.cpu_count() or 1))
+
+
+class Governor:
+    """Scale of in-flight work from an RSS budget (bytes), a memory target
+    (share of the machine's RAM in use, 0–1) and a CPU target (busy share
+    of all cores, 0–1); any may be None.  `private` measures private
+    instead of resident memory (see `share`)."""
+
+    def __init__(self, rss_budget: int | None = None,
+                 cpu_target: float | None = None, interval: float = 1.0,
+                 private: bool = False, memory_target: float | None = None):
+        self.rss_budget = rss_budget
+        self.memory_target = memory_target
+        self.cpu_target = cpu_target
+        self.interval = interval
+        self.private = private
+        self.scale = 1.0
+        self.rss = 0
+        self.memory = 0.0                # share of RAM in use
+        self.cpu = 0.0
+        self.reason = ""                 # why throttled now ("": not)
+        self.events: Dict[str, int] = {}     # throttle steps per cause
+        self.throttled_seconds = 0.0
+        self._since: float | None = None     # start of current throttling
+        self._next = 0.0
+        self._cpu = _CpuMeter()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return (self.rss_budget is not None or self.cpu_target is not None
+                or self.memory_target is not None)
+
+    @property
+    def throttled(self) -> bool:
+        return self.scale < 1.0
+
+    def sample(self) -> float:
+        """Take a reading if the last one is older than `interval` and
+        adjust the scale; returns it.  Cheap when there is nothing due."""
+        if time.monotonic() < self._next or not self.active:
+            return self.scale
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._next:
+                self._next = now + self.interval
+                self.rss = private_memory() if self.private else rss()
+                if self.memory_target is not None:
+                    self.memory = memory_in_use()
+                self.cpu = self._cpu()
+                self._adjust(now)
+        return self.scale
+
+    def _adjust(self, now: float) -> None:
+        budget, memory, target = (self.rss_budget, self.memory_target,
+                                  self.cpu_target)
+        if budget is not None and self.rss > budget:
+            self._cut("rss", _CUT_MEMORY, f"rss {_size(self.rss)} > budget "
+                                          f"{_size(budget)}")
+        elif memory is not None and self.memory > memory:
+            self._cut("memory", _CUT_MEMORY,
+                      f"memory {100 * self.memory:.0f}% > target "
+                      f"{100 * memory:.0f}%")
+        elif target is not None and self.cpu > target:
+            self._cut("cpu", _CUT_CPU, f"cpu {100 * self.cpu:.0f}% > target "
+                                       f"{100 * target:.0f}%")
+        elif self.throttled and (budget is None
+                                 or self.rss <= _HOLD * budget) and (
+                memory is None or self.memory <= _HOLD * memory):
+            self.scale = min(1.0, self.scale + _RAISE)
+            if not self.throttled:
+                spell = now - self._since
+                self.throttled_seconds += spell
+                self._since, self.reason = None, ""
+                logging.info("Throttling lifted after %.1f s", spell)
+
+    def _cut(self, cause: str, factor: float, reason: str) -> None:
+        self.scale = max(_MIN_SCALE, self.scale * factor)
+        self.events[cause] = self.events.get(cause, 0) + 1
+        if self._since is None:
+            self._since = time.monotonic()
+        # warn when throttling starts or changes cause, not every interval
+        new = not self.reason.startswith(cause)
+        self.reason = reason
+        logging.log(logging.WARNING if new else logging.DEBUG,
+                    "Throttling (%s): work in flight scaled to %.0f%%",
+                    reason, 100 * self.scale)
+
+    def batch_size(self, nominal: int) -> int:
+        """Micro-batch size to use now instead of `nominal`."""
+        return max(1, round(nominal * self.sample()))
+
+    def limit(self, capacity: int, floor: int = 1) -> int:
+        """Items allowed in flight now, between `floor` and `capacity`."""
+        floor = min(floor, capacity)
+        return floor + round((capacity - floor) * self.sample())
+
+    def share(self, n: int) -> "Governor":
+        """A governor for each of `n` forked workers: an equal part of the
+        budget left above this process's RSS, held against the worker's
+        private memory (pages still shared with this process – the
+        loaded models – count here once, not in every worker)."""
+        budget = self.rss_budget
+        if budget is not None:
+            used = rss()
+            if used >= budget:
+                logging.warning("RSS budget %s is already used up before "
+                                "forking (%s); workers will run throttled",
+                                _size(budget), _size(used))
+            budget = max(1, (budget - used) // max(1, n))
+        return Governor(budget, self.cpu_target, self.interval, private=True,
+                        memory_target=self.memory_target)
+
+    def status(self) -> str:
+        """Short note for a progress display ("" when not throttled)."""
+        return f"throttled: {self.reason}" if self.throttled else ""
+
+    def seconds_throttled(self) -> float:
+        """Time spent throttled, including the current spell."""
+        since = self._since
+        return self.throttled_seconds + (time.monotonic() - since
+                                         if since is not None else 0.0)
+
+    def log(self) -> None:
+        if self.events:
+            logging.info("Governor: throttled %.1f s (%s), scale now "
+                         "%.0f%%", self.seconds_throttled(),
+                         ", ".join(f"{n}× {cause}" for cause, n
+                                   in sorted(self.events.items())),
+                         100 * self.scale)
+
+
+class Gate:
+    """Admission of at most `governor.limit(capacity, floor)` items in
+    flight.  `acquire` waits – on a condition, woken by `release` – while
+    the limit is reached; one item is always admitted when none is in
+    flight, and after `stall` seconds of waiting the items are admitted
+    anyway (logged), so a stage that buffers more than `floor` items
+    upstream of the release cannot deadlock the pipeline."""
+
+    def __init__(self, governor: Governor, capacity: int, floor: int = 1,
+                 stall: float = _STALL):
+        self.governor = governor
+        self.capacity = capacity
+        self.floor = floor
+        self.stall = stall
+        self.inflight = 0
+        self.waited = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _full(self, n: int) -> bool:
+        return (self.inflight > 0 and not self._closed and self.inflight + n
+                > self.governor.limit(self.capacity, self.floor))
+
+    def acquire(self, n: int = 1) -> None:
+        with self._cond:
+            if self._full(n):
+                t0 = time.monotonic()
+                while self._full(n):
+                    if time.monotonic() - t0 > self.stall:
+                        logging.warning("Admission: nothing released for "
+                                        "%.0f s; admitting %d over the "
+                                        "limit", self.stall, n)
+                        break
+                    # re-checked each interval: the limit may rise
+                    self._cond.wait(self.governor.interval)
+                self.waited += time.monotonic() - t0
+            self.inflight += n
+
+    def release(self, n: int = 1) -> None:
+        with self._cond:
+            self.inflight -= n
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        """Admit everything from now on (the consumer is gone)."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __enter__(self) -> "Gate":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,259 @@
+# ────────────────────────────────────────────────────────────────────
+#  src/abms/line_index.py
+# ────────────────────────────────────────────────────────────────────
+"""
+Memory-mapped line index of a JSONL file (``<file>.idx``).
+
+Counting lines, placing the n-th record or splitting a file into byte
+ranges otherwise means a pass over the file (or `readlines()` into RAM).
+`abms index FILE` writes, once:
+
+    header    magic, line count, source size and mtime, flags
+    offsets   uint64 × (lines + 1)  start of every line, then the file size
+    ids       uint64                number of ids, then (optional, --ids)
+              uint64 × n            sorted 64-bit hashes of the "id" fields
+              uint64 × n            line number of each hash
+
+Line i is two reads of the mapped offsets plus one `pread` of the source;
+a record id is a binary search over the hashes (collisions are resolved
+by reading the record).  An index whose source changed size or mtime is
+stale: `open_index` ignores it and `LineIndex` refuses it.
+
+    abms index corpus.tags.jsonl --ids
+    abms get corpus.tags.jsonl 123456            # record by line number
+    abms get corpus.tags.jsonl --id doc-42       # … by id
+"""
+from __future__ import annotations
+
+import bisect
+import hashlib
+import json
+import logging
+import mmap
+import os
+import pathlib
+import struct
+from typing import Any, Iterator, List, Tuple
+
+from . import codec, streams
+
+MAGIC = b"ABMSIDX1"
+_HEADER = struct.Struct("<8sQQqQ")     # magic, lines, size, mtime_ns, flags
+_HAS_IDS = 1
+_U64 = struct.Struct("<Q")
+_CHUNK = 16 << 20
+
+
+def index_path(path: pathlib.Path | str) -> pathlib.Path:
+    path = pathlib.Path(path)
+    return path.with_name(path.name + ".idx")
+
+
+def id_key(value: Any) -> int:
+    """64-bit hash of a record id – of its JSON text, so 7 and "7" differ."""
+    data = json.dumps(value, ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(),
+                          "little")
+
+
+# ── building ─────────────────────────────────────────────────────────
+def build(path: pathlib.Path | str, ids: bool = False) -> pathlib.Path:
+    """Write the index of `path` (uncompressed JSONL) next to it, replacing
+    an old one atomically.  With `ids` the records are decoded once to
+    index their "id" field.  Returns the index path."""
+    import numpy as np
+
+    src = pathlib.Path(path)
+    if not streams.is_plain_file(src):
+        raise ValueError(f"{src}: only uncompressed files can be indexed")
+    st = src.stat()
+    idx = index_path(src)
+    tmp = idx.with_name(idx.name + ".tmp")
+    lines = 0
+    with src.open("rb") as fh, tmp.open("wb") as out:
+        out.write(_HEADER.pack(MAGIC, 0, 0, 0, 0))      # patched below
+        out.write(_U64.pack(0))
+        pos = last = 0
+        for buf in iter(lambda: fh.read(_CHUNK), b""):
+            ends = np.flatnonzero(np.frombuffer(buf, np.uint8) == 10)
+            ends += pos + 1
+            ends.astype("<u8").tofile(out)
+            lines += len(ends)
+            pos += len(buf)
+            if len(ends):
+                last = int(ends[-1])
+        if pos > last:                  # final line without a newline
+            out.write(_U64.pack(pos))
+            lines += 1
+        if pos != st.st_size:
+            raise ValueError(f"{src} changed while it was being indexed")
+        flags = 0
+        if ids:
+            flags |= _HAS_IDS
+            _write_ids(src, lines, out, np)
+        else:
+            out.write(_U64.pack(0))
+        out.seek(0)
+        out.write(_HEADER.pack(MAGIC, lines, st.st_size, st.st_mtime_ns,
+                               flags))
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp, idx)
+    logging.info("Indexed %d lines of %s%s", lines, src.name,
+                 " (with ids)" if ids else "")
+    return idx
+
+
+def _write_ids(src: pathlib.Path, lines: int, out, np) -> None:
+    keys = np.empty(lines, dtype="<u8")
+    rows = np.empty(lines, dtype="<u8")
+    n = 0
+    with src.open("rb") as fh:
+        for i, line in enumerate(fh):
+            try:
+                rid = codec.loads(line).get("id")
+            except (ValueError, AttributeError):
+                continue                # not a JSON object: no id
+            if rid is not None:
+                keys[n], rows[n] = id_key(rid), i
+                n += 1
+    order = np.argsort(keys[:n], kind="stable")
+    out.write(_U64.pack(n))
+    keys[:n][order].tofile(out)
+    rows[:n][order].tofile(out)
+
+
+# ── lookup ───────────────────────────────────────────────────────────
+class LineIndex:
+    """Random access to the lines of `path` through its index (ValueError
+    if the index is missing, foreign or stale)."""
+
+    def __init__(self, path: pathlib.Path | str):
+        self.path = pathlib.Path(path)
+        self.index = index_path(self.path)
+        try:
+            with self.index.open("rb") as fh:
+                self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise ValueError(f"{self.path.name} has no index; run "
+                             f"`abms index {self.path}`") from e
+        try:
+            magic, n, size, mtime, flags = _HEADER.unpack_from(self._mm)
+            st = self.path.stat()
+            if magic != MAGIC:
+                raise ValueError(f"{self.index} is not an abms line index")
+            if (st.st_size, st.st_mtime_ns) != (size, mtime):
+                raise ValueError(f"{self.index} is stale ({self.path.name} "
+                                 f"changed); run `abms index {self.path}`")
+        except BaseException:
+            self._mm.close()
+            raise
+        self.has_ids = bool(flags & _HAS_IDS)
+        view = memoryview(self._mm)
+        at = _HEADER.size
+        self.offsets = view[at:at + 8 * (n + 1)].cast("Q")
+        at += 8 * (n + 1)
+        (n_ids,) = _U64.unpack_from(self._mm, at)
+        at += 8
+        self._keys = view[at:at + 8 * n_ids].cast("Q")
+        self._rows = view[at + 8 * n_ids:at + 16 * n_ids].cast("Q")
+        self._views = [view, self.offsets, self._keys, self._rows]
+        self._fd = os.open(self.path, os.O_RDONLY)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def span(self, i: int) -> Tuple[int, int]:
+        """Byte range [start, end) of line `i` (negative counts from the
+        end)."""
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(f"line {i} out of range ({n} lines)")
+        return self.offsets[i], self.offsets[i + 1]
+
+    def __getitem__(self, i: int) -> bytes:
+        start, end = self.span(i)
+        return os.pread(self._fd, end - start, start)
+
+    def __iter__(self) -> Iterator[bytes]:
+        with self.path.open("rb") as fh:
+            for _ in range(len(self)):
+                yield fh.readline()
+
+    def line_at(self, offset: int) -> int:
+        """Number of the line containing byte `offset`."""
+        return bisect.bisect_right(self.offsets, offset) - 1
+
+    def find_id(self, value: Any) -> int | None:
+        """Line number of the record whose "id" is `value`, or None."""
+        if not self.has_ids:
+            raise ValueError(f"{self.index} has no ids; rebuild it with "
+                             "`abms index --ids`")
+        key = id_key(value)
+        i = bisect.bisect_left(self._keys, key)
+        while i < len(self._keys) and self._keys[i] == key:
+            row = self._rows[i]
+            rid = codec.loads(self[row]).get("id")
+            if rid == value and type(rid) is type(value):
+                return row
+            i += 1
+        return None
+
+    def byte_ranges(self, start: int, parts: int,
+                    min_bytes: int = 0) -> List[Tuple[int, int]]:
+        """Split [start, EOF) into about `parts` ranges of similar size
+        (at least `min_bytes`) on line boundaries, without reading the
+        source."""
+        end = self.offsets[len(self)]
+        if start >= end:
+            return []
+        step = max(min_bytes, (end - start) // max(1, parts), 1)
+        bounds = [start]
+        target = start + step
+        while target < end:
+            pos = self.offsets[bisect.bisect_left(self.offsets, target)]
+            if pos >= end:
+                break
+            bounds.append(pos)
+            target = pos + step
+        bounds.append(end)
+        return list(zip(bounds, bounds[1:]))
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+            for view in reversed(self._views):
+                view.release()
+            self._mm.close()
+
+    def __enter__(self) -> "LineIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_index(path: pathlib.Path | str) -> LineIndex | None:
+    """The index of `path` if one exists and is current, else None."""
+    if not streams.is_plain_file(path) or not index_path(path).exists():
+        return None
+    try:
+        return LineIndex(path)
+    except ValueError as e:
+        logging.warning("Ignoring line index: %s", e)
+        return None
+
+
+def ensure(path: pathlib.Path | str, ids: bool = False) -> LineIndex:
+    """The index of `path`, (re)built first if missing or stale."""
+    index = open_index(path)
+    if index is None or (ids and not index.has_ids):
+        if index is not None:
+            index.close()
+        build(path, ids=ids)
+        index = LineIndex(path)
+    return index
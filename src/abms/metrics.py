@@ -0,0 +1,216 @@
+# ────────────────────────────────────────────────────────────────────
+#  src/abms/metrics.py
+# ────────────────────────────────────────────────────────────────────
+"""
+Live run metrics in the Prometheus text format.
+
+An encode of a large corpus runs for days; the progress bar and the
+end-of-run log say nothing to a dashboard or an alert while it runs.
+With ``--metrics-file`` / ``--metrics-port`` an `Exporter` thread takes
+a snapshot every few seconds and
+
+    * rewrites a textfile atomically (tmp + rename) – point the
+      node_exporter textfile collector at its directory, or just `cat` it
+    * serves it on http://127.0.0.1:PORT/metrics for a direct scrape
+
+    abms encode big.jsonl --metrics-file /var/lib/node_exporter/abms.prom
+    abms encode big.jsonl --metrics-port 9464
+
+The snapshot comes from a `collect` callback filling a `MetricSet`; the
+encoder supplies it (docs/s, per-aspect throughput and errors, queue
+depths, cache hit rate, RSS, model memory, ETA – see
+abms.encoder._run_metrics).  A last snapshot with ``abms_running 0`` is
+written when the run ends.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import pathlib
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+DEFAULT_INTERVAL = 5.0
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricSet:
+    """Samples of one snapshot, rendered in the text exposition format."""
+
+    def __init__(self, prefix: str = "abms_"):
+        self.prefix = prefix
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._samples: Dict[str, List[Tuple[dict, float]]] = {}
+
+    def add(self, name: str, value: float, labels: dict | None = None,
+            kind: str = "gauge", help: str = "") -> None:
+        """One sample of metric `name` (gauge or counter)."""
+        name = self.prefix + name
+        self._meta.setdefault(name, (kind, help))
+        self._samples.setdefault(name, []).append((labels or {}, value))
+
+    def render(self) -> str:
+        lines = []
+        for name, samples in self._samples.items():
+            kind, help = self._meta[name]
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lab = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{name}{{{lab}}} {_number(value)}" if lab
+                             else f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return (str(value).replace("\\", "\\\\").replace('"', '\\"')
+            .replace("\n", "\\n"))
+
+
+def _number(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# ── process memory ───────────────────────────────────────────────────
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss(pid: int | None = None) -> int:
+    """Resident set size of process `pid` (default: this one) in bytes;
+    0 when it cannot be read."""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * _PAGE
+    except (OSError, IndexError, ValueError):
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except Exception:  # noqa: BLE001 – no psutil, or the process is gone
+        return 0
+
+
+def children_rss() -> int:
+    """Summed RSS of this process's children (forked workers).  Pages
+    they still share with the parent are counted in each of them."""
+    pids = set()
+    try:
+        for task in os.scandir("/proc/self/task"):
+            with open(os.path.join(task.path, "children"), "rb") as fh:
+                pids.update(int(p) for p in fh.read().split())
+    except OSError:
+        try:
+            import psutil
+            pids = {p.pid for p in psutil.Process().children()}
+        except Exception:  # noqa: BLE001
+            return 0
+    return sum(rss(pid) for pid in pids)
+
+
+# ── exporter ─────────────────────────────────────────────────────────
+class Exporter:
+    """Publishes `collect(metrics, final)` every `interval` seconds to
+    `path` and / or an HTTP endpoint on `host:port` (port 0: any free
+    port, see `.port`).  Use as a context manager."""
+
+    def __init__(self, collect: Callable[[MetricSet, bool], None],
+                 path: pathlib.Path | str | None = None,
+                 port: int | None = None, host: str = "127.0.0.1",
+                 interval: float = DEFAULT_INTERVAL):
+        self.collect = collect
+        self.path = pathlib.Path(path) if path is not None else None
+        self.interval = max(0.1, interval)
+        self.text = ""
+        self._stop = threading.Event()
+        self._server = None
+        self.port = None
+        self.publish()
+        if port is not None:
+            self._serve(host, port)
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="abms-metrics")
+        self._thread.start()
+
+    def _serve(self, host: str, port: int) -> None:
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        exporter = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = exporter.text.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass                    # no line per scrape
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True,
+                         name="abms-metrics-http").start()
+        logging.info("Serving metrics on http://%s:%d/metrics", host,
+                     self.port)
+
+    def publish(self, final: bool = False) -> None:
+        """Take a snapshot now and write / serve it."""
+        metrics = MetricSet()
+        try:
+            self.collect(metrics, final)
+        except Exception as e:  # noqa: BLE001 – metrics never stop a run
+            logging.warning("Collecting metrics failed (%s)", e)
+            return
+        self.text = metrics.render()
+        if self.path is not None:
+            tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            try:
+                tmp.write_text(self.text, encoding="utf-8")
+                os.replace(tmp, self.path)
+            except OSError as e:
+                logging.warning("Cannot write metrics to %s (%s)",
+                                self.path, e)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.publish()
+
+    def close(self) -> None:
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self.publish(final=True)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self) -> "Exporter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class Rate:
+    """Per-second rate of a growing counter between two snapshots."""
+
+    def __init__(self):
+        self._last: Tuple[float, float] | None = None
+
+    def __call__(self, value: float, now: float | None = None) -> float:
+        now = time.monotonic() if now is None else now
+        last, self._last = self._last, (now, value)
+        if last is None or now <= last[0]:
+            return 0.0
+        return (value - last[1]) / (now - last[0])
@@ -0,0 +1,173 @@
+# ────────────────────────────────────────────────────────────────────
+#  src/abms/nli.py
+# ────────────────────────────────────────────────────────────────────
+"""
+Fused zero-shot NLI stage.
+
+Genre, reliability, ethical considerations and intentionality each used
+to send the same ``text[:512]`` premise through their own zero-shot
+pipeline call (5 + 1 + 3 + 6 hypotheses, premise tokenised four times).
+Here every premise/hypothesis pair of a document – or of a batch of
+documents – goes into padded tensors and one forward pass, and the logits
+are split back per module with the zero-shot pipeline's own scoring rules:
+
+• several labels, single-label mode → softmax of the entailment logits
+  across the labels
+• one label (or multi_label) → softmax of (contradiction, entailment)
+  for each label on its own
+
+Hypothesis texts are tokenised once per model and cached on the registry
+handle.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+PREMISE_CHARS = 512          # every NLI aspect looks at text[:512]
+MAX_PAIRS = 128              # pairs per forward pass (bounds activations)
+
+
+@dataclass(frozen=True)
+class HypothesisSet:
+    """Candidate labels of one module, as in the zero-shot pipeline."""
+    labels: Tuple[str, ...]
+    template: str = "This example is {}."
+    multi_label: bool = False
+
+
+def premise(text: str) -> str:
+    return text[:PREMISE_CHARS]
+
+
+def _label_ids(config) -> Tuple[int, int]:
+    """(contradiction, entailment) output indices of an MNLI head."""
+    entail = contra = None
+    for label, idx in config.label2id.items():
+        if label.lower().startswith("entail"):
+            entail = idx
+        elif label.lower().startswith("contra"):
+            contra = idx
+    if entail is None:
+        entail = 2                            # MNLI default order
+    return (0 if contra is None else contra), entail
+
+
+def _hypothesis_ids(handle, hset: HypothesisSet) -> List[List[int]]:
+    cache = handle.cache.setdefault("nli_hypotheses", {})
+    ids = []
+    for label in hset.labels:
+        hyp = hset.template.format(label)
+        if hyp not in cache:
+            cache[hyp] = handle.tokenizer(hyp, add_special_tokens=False)["input_ids"]
+        ids.append(cache[hyp])
+    return ids
+
+
+def _pair_layout(handle) -> Tuple[List[int], List[int], List[int]]:
+    """Special tokens around a (premise, hypothesis) pair, learned once from
+    a probe pair: ``prefix + premise + middle + hypothesis + suffix``."""
+    layout = handle.cache.get("nli_pair_layout")
+    if layout is None:
+        tok = handle.tokenizer
+        a = tok("premise", add_special_tokens=False)["input_ids"]
+        b = tok("hypothesis", add_special_tokens=False)["input_ids"]
+        pair = tok("premise", "hypothesis")["input_ids"]
+        i = next(k for k in range(len(pair)) if pair[k:k + len(a)] == a)
+        j = next(k for k in range(i + len(a), len(pair)) if pair[k:k + len(b)] == b)
+        layout = (pair[:i], pair[i + len(a):j], pair[j + len(b):])
+        handle.cache["nli_pair_layout"] = layout
+    return layout
+
+
+def _forward(model, pairs: List[List[int]], pad_id: int, max_pairs: int):
+    """Logits for `pairs`, padded per chunk to the chunk's longest pair."""
+    import torch
+
+    device = next(model.parameters()).device
+    chunks = []
+    for start in range(0, len(pairs), max_pairs):
+        chunk = pairs[start:start + max_pairs]
+        width = max(len(p) for p in chunk)
+        ids = torch.full((len(chunk), width), pad_id, dtype=torch.long)
+        mask = torch.zeros((len(chunk), width), dtype=torch.long)
+        for row, p in enumerate(chunk):
+            ids[row, :len(p)] = torch.tensor(p, dtype=torch.long)
+            mask[row, :len(p)] = 1
+        with torch.inference_mode():
+            out = model(input_ids=ids.to(device), attention_mask=mask.to(device))
+        chunks.append(out.logits.float().cpu())
+    return torch.cat(chunks)
+
+
+def classify(handle, premises: Sequence[str],
+             hsets: Sequence[HypothesisSet],
+             max_pairs: int = MAX_PAIRS) -> List[List[Dict[str, float]]]:
+    """Score every hypothesis set against every premise in one fused pass.
+
+    Returns ``out[i][j]`` = {label: score} for premise i and hypothesis set j.
+    """
+    import torch
+
+    if not premises:
+        return []
+    tok, model = handle.tokenizer, handle.model
+    hyp_ids = [_hypothesis_ids(handle, hs) for hs in hsets]
+    prem_ids = tok(list(premises), add_special_tokens=False)["input_ids"]
+
+    limit = tok.model_max_length if tok.model_max_length < 100_000 else 512
+    prefix, middle, suffix = _pair_layout(handle)
+    special = len(prefix) + len(middle) + len(suffix)
+    pairs = []
+    for p in prem_ids:
+        for ids in hyp_ids:
+            for h in ids:
+                room = max(0, limit - special - len(h))    # truncate premise only
+                pairs.append(prefix + p[:room] + middle + h + suffix)
+
+    logits = _forward(model, pairs, tok.pad_token_id, max_pairs)
+    contra, entail = _label_ids(model.config)
+
+    out, row = [], 0
+    for _ in prem_ids:
+        per_doc = []
+        for hs in hsets:
+            n = len(hs.labels)
+            block = logits[row:row + n]
+            row += n
+            if hs.multi_label or n == 1:
+                probs = torch.softmax(block[:, [contra, entail]], dim=-1)[:, 1]
+            else:
+                probs = torch.softmax(block[:, entail], dim=0)
+            per_doc.append(dict(zip(hs.labels, probs.tolist())))
+        out.append(per_doc)
+    return out
+
+
+def fused_results(analysers, texts: Sequence[str]) -> List[List[dict]]:
+    """Run every NLI analyser (``an.nli`` set) on `texts` with one fused
+    pass per model.  ``out[i][j]`` is analyser j's result dict for text i."""
+    out: List[List[dict]] = [[{} for _ in analysers] for _ in texts]
+    groups: Dict[Tuple[str, str], List[int]] = {}
+    for j, an in enumerate(analysers):
+        groups.setdefault(an.models[0], []).append(j)
+
+    premises = [premise(t) for t in texts]
+    for members in groups.values():
+        handle = analysers[members[0]].nli_handle()
+        scores = classify(handle, premises, [analysers[j].nli for j in members])
+        for i, per_doc in enumerate(scores):
+            for j, label_scores in zip(members, per_doc):
+                out[i][j] = analysers[j].from_nli(label_scores)
+    return out
+
+
+def fused_analyse(analysers, texts: Sequence[str]) -> List[Dict[str, object]]:
+    """Like `fused_results`, merged into one result dict per text."""
+    merged: List[Dict[str, object]] = []
+    for per_text in fused_results(analysers, texts):
+        row: Dict[str, object] = {}
+        for result in per_text:
+            row.update(result)
+        merged.append(row)
+    return merged
@@ -0,0 +1,196 @@
+# ────────────────────────────────────────────────────────────────────
+#  src/abms/pipeline.py
+# ────────────────────────────────────────────────────────────────────
+"""
+Threaded stages connected by bounded queues.
+
+The encoder reads, decodes, parses, runs two kinds of model and encodes
+JSON for every window of records.  Run serially those steps take turns;
+as stages they overlap – file reads, spaCy and tokenisation (mostly in C)
+and torch (which drops the GIL) run while the writer fsyncs.  Each queue
+holds a fixed number of items, so memory is bounded by the queue
+capacities, never by the corpus: a slow stage fills the queue in front of
+it and the stages upstream block.
+
+    pipe = Pipeline()
+    read = pipe.stage("read", blocks(lines), capacity=8)
+    json = pipe.stage("json", pipe.drain(read), encode)
+    for item in pipe.drain(json):           # the caller's thread writes
+        ...
+
+`QueueStats` records per queue its current and peak depth, the mean
+depth seen by the consumer, and how long producers waited on a full
+queue (the stage downstream is the bottleneck) and consumers on an empty
+one (upstream is).  An exception in any stage ends the pipeline and is
+re-raised by `drain` in the consumer.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List
+
+_END = object()
+_POLL = 0.1                  # seconds between stop checks of a blocked thread
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+class QueueStats:
+    """Depth counters of one queue; picklable, so worker processes can send
+    theirs back to be merged."""
+
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = capacity
+        self.depth = self.peak = 0
+        # producer side / consumer side, each written by one thread only
+        self.puts = 0
+        self.put_wait = 0.0
+        self.gets = self.depth_sum = 0
+        self.get_wait = 0.0
+
+    def merge(self, other: "QueueStats") -> None:
+        self.peak = max(self.peak, other.peak)
+        self.puts += other.puts
+        self.put_wait += other.put_wait
+        self.gets += other.gets
+        self.depth_sum += other.depth_sum
+        self.get_wait += other.get_wait
+
+    def log(self) -> None:
+        mean = self.depth_sum / self.gets if self.gets else 0.0
+        logging.info("Queue %-7s peak %d/%d, mean depth %.1f; producer "
+                     "blocked %.1f s, consumer starved %.1f s", self.name,
+                     self.peak, self.capacity, mean, self.put_wait,
+                     self.get_wait)
+
+
+class StageQueue(queue.Queue):
+    """Bounded queue that keeps `QueueStats`."""
+
+    def __init__(self, stats: QueueStats):
+        super().__init__(maxsize=stats.capacity)
+        self.stats = stats
+
+    def put(self, item, block=True, timeout=None) -> None:
+        try:
+            super().put(item, block=False)
+        except queue.Full:
+            if not block:
+                raise
+            t0 = time.perf_counter()
+            try:
+                super().put(item, timeout=timeout)
+            finally:
+                self.stats.put_wait += time.perf_counter() - t0
+        s = self.stats
+        s.puts += 1
+        s.depth = self.qsize()
+        s.peak = max(s.peak, s.depth)
+
+    def get(self, block=True, timeout=None):
+        try:
+            item = super().get(block=False)
+        except queue.Empty:
+            if not block:
+                raise
+            t0 = time.perf_counter()
+            try:
+                item = super().get(timeout=timeout)
+            finally:
+                self.stats.get_wait += time.perf_counter() - t0
+        s = self.stats
+        s.depth = self.qsize()
+        s.gets += 1
+        s.depth_sum += s.depth
+        return item
+
+
+class Pipeline:
+    """Stage threads of one run (see module docstring).  Use as a context
+    manager: leaving it stops every stage, also on error."""
+
+    def __init__(self, stats: Dict[str, QueueStats] | None = None):
+        self.stats = stats if stats is not None else {}
+        self.queues: List[StageQueue] = []
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def queue(self, name: str, capacity: int) -> StageQueue:
+        """A bounded queue reported under `name` (stats accumulate across
+        pipelines sharing the `stats` dict)."""
+        capacity = max(1, capacity)
+        stats = self.stats.get(name)
+        if stats is None or stats.capacity != capacity:
+            stats = self.stats[name] = QueueStats(name, capacity)
+        q = StageQueue(stats)
+        self.queues.append(q)
+        return q
+
+    def _put(self, q: StageQueue, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def stage(self, name: str, items: Iterable,
+              fn: Callable | None = None, capacity: int = 2) -> StageQueue:
+        """Start a thread that puts `fn(item)` (or the item itself) for each
+        of `items` into a new queue of `capacity`, and return that queue."""
+        out = self.queue(name, capacity)
+
+        def _run() -> None:
+            try:
+                for item in items:
+                    if not self._put(out, item if fn is None else fn(item)):
+                        return
+                self._put(out, _END)
+            except BaseException as exc:  # noqa: BLE001 – re-raised by drain
+                self._put(out, _Failure(exc))
+
+        thread = threading.Thread(target=_run, name=f"abms-{name}",
+                                  daemon=True)
+        self._threads.append(thread)
+        thread.start()
+        return out
+
+    def drain(self, q: "queue.Queue") -> Iterator:
+        """Items of `q` until its stage ends; re-raises a stage's error."""
+        while True:
+            try:
+                item = q.get(timeout=_POLL)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+
+    def depths(self) -> str:
+        """Current fill of every queue, e.g. "read 3/8 parse 512/1024"."""
+        return " ".join(f"{q.stats.name} {q.qsize()}/{q.maxsize}"
+                        for q in self.queues)
+
+    def close(self) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=5 * _POLL)
+
+    def __enter__(self) -> "Pipeline":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -1,33 +1,65 @@
 # publisher/analysis_modules/__init__.py
+#
+# Analysis classes are imported on first access (PEP 562), so selecting a
+# few aspects never imports – or initialises – the other modules.
 
-from .actionability_analysis import ActionabilityAnalysis
-from .audience_appropriateness_analysis import AudienceAppropriatenessAnalysis
-from .cognitive_analysis import CognitiveAnalysis
-from .complexity_analysis import ComplexityAnalysis
-from .controversiality_analysis import ControversialityAnalysis
-from .cultural_context_analysis import CulturalContextAnalysis
-from .emotional_polarity_analysis import EmotionalPolarityAnalysis
-from .ethical_considerations_analysis import EthicalConsiderationsAnalysis
-from .formalism_analysis import FormalismAnalysis
-from .genre_analysis import GenreAnalysis
-from .humor_analysis import HumorAnalysis
-from .intentionality_analysis import IntentionalityAnalysis
-from .interactivity_analysis import InteractivityAnalysis
-from .lexical_diversity_analysis import LexicalDiversityAnalysis
-from .modality_analysis import ModalityAnalysis
-from .multimodality_analysis import MultimodalityAnalysis
-from .narrative_style_analysis import NarrativeStyleAnalysis
-from .novelty_analysis import NoveltyAnalysis
-from .objectivity_analysis import ObjectivityAnalysis
-from .persuasiveness_analysis import PersuasivenessAnalysis
-from .quantitative_analysis import QuantitativeAnalysis
-from .qualitative_analysis import QualitativeAnalysis
-from .readability_analysis import ReadabilityAnalysis
-from .reliability_analysis import ReliabilityAnalysis
-from .sentiment_analysis import SentimentAnalysis
-from .social_orientation_analysis import SocialOrientationAnalysis
-from .specificity_analysis import SpecificityAnalysis
-from .spatial_analysis import SpatialAnalysis
-from .syntactic_complexity_analysis import SyntacticComplexityAnalysis
-from .temporal_analysis import TemporalAnalysis
+import importlib
 
+# aspect name (module file) → analysis class; the one list of aspects the
+# app, the encoder (--aspects / --exclude) and re-encoding all read
+ASPECTS = {
+    "actionability_analysis": "ActionabilityAnalysis",
+    "audience_appropriateness_analysis": "AudienceAppropriatenessAnalysis",
+    "cognitive_analysis": "CognitiveAnalysis",
+    "complexity_analysis": "ComplexityAnalysis",
+    "controversiality_analysis": "ControversialityAnalysis",
+    "cultural_context_analysis": "CulturalContextAnalysis",
+    "emotional_polarity_analysis": "EmotionalPolarityAnalysis",
+    "ethical_considerations_analysis": "EthicalConsiderationsAnalysis",
+    "formalism_analysis": "FormalismAnalysis",
+    "genre_analysis": "GenreAnalysis",
+    "humor_analysis": "HumorAnalysis",
+    "intentionality_analysis": "IntentionalityAnalysis",
+    "interactivity_analysis": "InteractivityAnalysis",
+    "lexical_diversity_analysis": "LexicalDiversityAnalysis",
+    "modality_analysis": "ModalityAnalysis",
+    "multimodality_analysis": "MultimodalityAnalysis",
+    "narrative_style_analysis": "NarrativeStyleAnalysis",
+    "novelty_analysis": "NoveltyAnalysis",
+    "objectivity_analysis": "ObjectivityAnalysis",
+    "persuasiveness_analysis": "PersuasivenessAnalysis",
+    "quantitative_analysis": "QuantitativeAnalysis",
+    "qualitative_analysis": "QualitativeAnalysis",
+    "readability_analysis": "ReadabilityAnalysis",
+    "reliability_analysis": "ReliabilityAnalysis",
+    "sentiment_analysis": "SentimentAnalysis",
+    "social_orientation_analysis": "SocialOrientationAnalysis",
+    "specificity_analysis": "SpecificityAnalysis",
+    "spatial_analysis": "SpatialAnalysis",
+    "syntactic_complexity_analysis": "SyntacticComplexityAnalysis",
+    "temporal_analysis": "TemporalAnalysis",
+}
+
+_CLASSES = {cls: mod for mod, cls in ASPECTS.items()}
+
+__all__ = list(_CLASSES)
+
+
+def load_aspect(name):
+    """Analysis class of aspect `name` (e.g. ``"genre_analysis"``)."""
+    if name not in ASPECTS:
+        raise KeyError(f"unknown aspect {name!r}")
+    module = importlib.import_module(f"{__name__}.{name}")
+    return getattr(module, ASPECTS[name])
+
+
+def __getattr__(attr):
+    if attr in _CLASSES:
+        cls = load_aspect(_CLASSES[attr])
+        globals()[attr] = cls
+        return cls
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,26 +1,18 @@
 # publisher/analysis_modules/actionability_analysis.py
 
 from .base_pov import BasePOV
-import spacy
-
-# Load the spaCy model
-try:
-    nlp = spacy.load('en_core_web_sm')
-except OSError:
-    # If the model is not found, download it
-    import subprocess
-    subprocess.run(['python', '-m', 'spacy', 'download', 'en_core_web_sm'])
-    nlp = spacy.load('en_core_web_sm')
 
 class ActionabilityAnalysis(BasePOV):
+    uses_doc = True
+    spacy_components = frozenset({"senter", "tagger", "attribute_ruler"})
 
-    def __init__(self, text):
+    def __init__(self, text=None):
         super().__init__(text)
         
     def analyze(self):
         try:
-            doc = nlp(self.text)
-            sentences = list(doc.sents)
+            doc = self.doc
+            sentences = self.sents
             
             if not sentences:
                 return {'actionability_analysis': 0.0}
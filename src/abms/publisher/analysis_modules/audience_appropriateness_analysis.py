@@ -4,7 +4,9 @@ from .base_pov import BasePOV
 import textstat
 
 class AudienceAppropriatenessAnalysis(BasePOV):
-    def __init__(self, text):
+    outputs = {'audience_appropriateness_analysis': str}
+
+    def __init__(self, text=None):
         super().__init__(text)
 
     def analyze(self):
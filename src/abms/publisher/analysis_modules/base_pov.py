@@ -1,9 +1,140 @@
 # publisher/analysis_modules/base_pov.py
 
+from abms import nli, registry
+
+from .context import AnalysisContext
+
+
 class BasePOV:
-    def __init__(self, text):
+    """
+    Common interface of every aspect analyser.
+
+    Lifecycle
+    • construct once (``Cls()``) and call ``setup()`` once – this is where
+      models, pipelines and lexicons get loaded
+    • call ``analyze_batch(texts)`` for as many documents as needed
+
+    The historical one-shot form ``Cls(text).analyze()`` keeps working.
+
+    Modules that need a spaCy parse set ``uses_doc = True`` and read
+    ``self.doc`` / ``self.sents`` / ``self.sentences`` / ``self.tokens``;
+    the parse is shared through the document's ``AnalysisContext``.
+    ``spacy_components`` lists the en_core_web_sm components the module
+    reads (tokenisation is always available); the engine loads only their
+    union.  Sentences come from the senter if the module lists it, else
+    from the parser, whatever else runs in the same pipeline.
+
+    Hugging Face models are listed in ``models`` as (checkpoint, task)
+    pairs and obtained from the process-wide ``abms.registry``; one copy of
+    each checkpoint is shared by every module that names it.
+
+    Zero-shot NLI modules set ``nli`` to an ``abms.nli.HypothesisSet`` and
+    implement ``from_nli(scores)``; their premise/hypothesis pairs are
+    scored together with the other NLI modules in one fused forward pass.
+
+    Transformer modules override ``analyze_batch`` so a micro-batch of
+    documents goes through their model in one call; ``batch_size`` caps
+    the inputs per forward pass (the engine sets it from its config).
+
+    ``outputs`` maps each result key to its type – ``float`` for scores,
+    ``str`` for categorical labels; it fixes the columns of Parquet output.
+    The default is one float named after the module file.
+    """
+
+    uses_doc = False
+    spacy_components = frozenset()
+    models = ()
+    nli = None
+    batch_size = 32
+    outputs = None
+
+    def __init__(self, text=None):
         self.text = text
+        self.context = None
+        self._handles = []
+
+    @classmethod
+    def output_types(cls):
+        """``{result key: float or str}`` of this module (see ``outputs``)."""
+        if cls.outputs is not None:
+            return dict(cls.outputs)
+        return {cls.__module__.rsplit(".", 1)[-1]: float}
+
+    def setup(self):
+        """One-time initialisation (model loading).  Safe to call twice.
+        The shared spaCy pipeline is warmed by the engine, not here."""
+        for handle in self._acquire_models():
+            if self.nli is not None:
+                handle.model            # the fused stage skips the pipeline
+            else:
+                handle.pipeline
+        return self
+
+    def close(self):
+        """Release the registry handles taken by this instance."""
+        for handle in self._handles:
+            handle.release()
+        self._handles = []
+
+    def _acquire_models(self):
+        if not self._handles and self.models:
+            self._handles = [registry.acquire(ckpt, task)
+                             for ckpt, task in self.models]
+        return self._handles
+
+    def pipeline(self, index=0):
+        """Shared pipeline of ``models[index]`` (loaded on first use)."""
+        return self._acquire_models()[index].pipeline
+
+    # ── fused zero-shot NLI ──────────────────────────────────────────
+    def nli_handle(self):
+        """Registry handle of the NLI model (``models[0]``)."""
+        return self._acquire_models()[0]
+
+    def from_nli(self, scores):
+        """Map ``{label: score}`` for ``self.nli`` to the result dict."""
+        raise NotImplementedError("NLI modules should implement this method.")
 
     def analyze(self):
         raise NotImplementedError("Subclasses should implement this method.")
 
+    def analyze_batch(self, texts, contexts=None):
+        """Analyse ``texts`` → one result dict per text, in input order.
+        ``contexts`` (optional, parallel to ``texts``) carries the shared
+        per-document artefacts."""
+        if self.nli is not None:
+            return nli.fused_analyse([self], texts)
+        results = []
+        for i, text in enumerate(texts):
+            self.text = text
+            self.context = contexts[i] if contexts is not None else None
+            results.append(self.analyze())
+        return results
+
+    # ── shared per-document artefacts ────────────────────────────────
+    def _get_context(self):
+        if self.context is None or self.context.text != self.text:
+            self.context = AnalysisContext(self.text,
+                                           components=self.spacy_components)
+        return self.context
+
+    @property
+    def doc(self):
+        return self._get_context().doc
+
+    @property
+    def sentence_source(self) -> str:
+        """Component whose sentence boundaries this module reads."""
+        return "senter" if "senter" in self.spacy_components else "parser"
+
+    @property
+    def sents(self):
+        return self._get_context().sents(self.sentence_source)
+
+    @property
+    def sentences(self):
+        return self._get_context().sentence_texts(self.sentence_source)
+
+    @property
+    def tokens(self):
+        return self._get_context().tokens
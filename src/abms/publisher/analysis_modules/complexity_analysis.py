@@ -1,17 +1,17 @@
 # publisher/analysis_modules/complexity_analysis.py
 
 from .base_pov import BasePOV
-import spacy
 import textstat
 
-nlp = spacy.load('en_core_web_sm')
-
 class ComplexityAnalysis(BasePOV):
-    def __init__(self, text):
+    uses_doc = True
+    spacy_components = frozenset({"parser"})
+
+    def __init__(self, text=None):
         super().__init__(text)
 
     def analyze(self):
-        doc = nlp(self.text)
+        doc = self.doc
         sentences = list(doc.sents)
         avg_sentence_length = textstat.avg_sentence_length(self.text)
         complex_words = textstat.difficult_words(self.text)
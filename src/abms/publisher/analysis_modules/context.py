@@ -0,0 +1,168 @@
+# publisher/analysis_modules/context.py
+"""
+Per-document analysis context.
+
+Every spaCy-based aspect used to call ``nlp(text)`` on its own – about ten
+full en_core_web_sm parses per document.  An ``AnalysisContext`` parses the
+text once, on first use, and hands the same ``Doc`` (plus its sentence and
+token segmentation) to every module that declares ``uses_doc = True``.
+
+Modules also declare the pipeline components they read
+(``spacy_components``); the engine loads en_core_web_sm with only the
+union of those, so e.g. a lexical-only run never loads the parser or NER.
+
+Sentence boundaries are pinned per module: the shared pipeline runs the
+parser *or* the senter (the parser sets sentence starts itself), so a
+module declaring ``senter`` gets its sentences from ``sents("senter")`` –
+the senter's boundaries mapped onto the shared ``Doc`` – and never the
+parser's, whichever other aspects run alongside.  The engine runs that
+senter-only pass through ``nlp.pipe`` next to the shared one, batch by
+batch, and hands each context its sentence starts; it is segmentation
+only and does not count as a parse.
+"""
+from __future__ import annotations
+
+import functools
+import logging
+from typing import Iterable
+
+# Components shipped with en_core_web_sm, in pipeline order
+PIPELINE_COMPONENTS = ("tok2vec", "tagger", "parser", "senter",
+                       "attribute_ruler", "lemmatizer", "ner")
+
+# component → components whose output it consumes
+_NEEDS = {
+    "tagger": {"tok2vec"},
+    "parser": {"tok2vec"},
+    "attribute_ruler": {"tagger"},        # maps tags → token.pos_
+    "lemmatizer": {"attribute_ruler"},
+}
+
+# what a plain spacy.load() enables (senter ships disabled)
+DEFAULT_COMPONENTS = frozenset(c for c in PIPELINE_COMPONENTS if c != "senter")
+
+
+def resolve_components(required: Iterable[str]) -> frozenset:
+    """Close `required` over component dependencies."""
+    todo, resolved = set(required), set()
+    while todo:
+        comp = todo.pop()
+        if comp not in resolved:
+            resolved.add(comp)
+            todo |= _NEEDS.get(comp, set())
+    if "parser" in resolved:
+        resolved.discard("senter")        # the parser sets sentence starts
+    return frozenset(resolved)
+
+
+def components_for(analysers) -> frozenset:
+    """Union of the components required by the doc-using analysers."""
+    required = set()
+    for an in analysers:
+        if an.uses_doc:
+            required |= an.spacy_components
+    return resolve_components(required)
+
+
+def needs_senter_pass(analysers) -> bool:
+    """True when the shared pipeline runs the parser but some doc-using
+    analyser pins the senter's boundaries – a senter-only pass is due."""
+    return ("parser" in components_for(analysers)
+            and any(an.uses_doc and "senter" in an.spacy_components
+                    for an in analysers))
+
+
+def sent_starts(doc) -> list[int]:
+    """Token indices at which `doc`'s sentences start."""
+    return [t.i for t in doc if t.is_sent_start]
+
+
+@functools.lru_cache(maxsize=None)
+def _load(keep: frozenset):
+    import spacy
+    exclude = [c for c in PIPELINE_COMPONENTS if c not in keep]
+    try:
+        nlp = spacy.load("en_core_web_sm", exclude=exclude)
+    except OSError:
+        # Automatic download the first time – avoids silent zero-scores.
+        from spacy.cli import download
+        download("en_core_web_sm")
+        nlp = spacy.load("en_core_web_sm", exclude=exclude)
+    if "senter" in keep:
+        nlp.enable_pipe("senter")
+    logging.info("[ABMS] spaCy pipeline: %s", nlp.pipe_names or ["tokenizer"])
+    return nlp
+
+
+def get_nlp(components: Iterable[str] | None = None):
+    """en_core_web_sm restricted to `components` (+ their dependencies),
+    loaded once per distinct component set.  None → the default pipeline."""
+    if components is None:
+        return _load(DEFAULT_COMPONENTS)
+    return _load(resolve_components(components))
+
+
+class AnalysisContext:
+    """Shared artefacts of one document.  Parsing happens at most once."""
+
+    def __init__(self, text: str, doc=None, components=None,
+                 senter_starts: list[int] | None = None):
+        self.text = text
+        self.components = components
+        self._doc = doc
+        self._senter_starts = senter_starts
+        self._sents: dict = {}            # source → sentence spans
+        self._sentences: dict = {}        # source → sentence texts
+        self._tokens: list[str] | None = None
+        # a Doc handed in was parsed upstream (e.g. by nlp.pipe) – count it
+        self.parse_count = 0 if doc is None else 1
+
+    @property
+    def doc(self):
+        if self._doc is None:
+            self._doc = get_nlp(self.components)(self.text)
+            self.parse_count += 1
+        return self._doc
+
+    def _has_parser(self) -> bool:
+        comps = (DEFAULT_COMPONENTS if self.components is None
+                 else resolve_components(self.components))
+        return "parser" in comps
+
+    def sents(self, source: str = "parser") -> list:
+        """Sentence spans of `doc` as segmented by `source` ("senter" or
+        "parser").  When the shared pipeline ran the parser, the senter's
+        boundaries come from a senter-only pass over the same text (same
+        tokenizer, so token indices line up) – the engine's batched one
+        when it handed them in, else one for this text alone."""
+        spans = self._sents.get(source)
+        if spans is None:
+            doc = self.doc
+            if source == "senter" and self._has_parser():
+                starts = self._senter_starts
+                if starts is None:
+                    starts = sent_starts(get_nlp({"senter"})(self.text))
+                starts = starts or [0]
+                ends = starts[1:] + [len(doc)]
+                spans = [doc[a:b] for a, b in zip(starts, ends) if a < b]
+            else:
+                spans = list(doc.sents)
+            self._sents[source] = spans
+        return spans
+
+    def sentence_texts(self, source: str = "parser") -> list[str]:
+        texts = self._sentences.get(source)
+        if texts is None:
+            texts = self._sentences[source] = [s.text
+                                               for s in self.sents(source)]
+        return texts
+
+    @property
+    def sentences(self) -> list[str]:
+        return self.sentence_texts("parser")
+
+    @property
+    def tokens(self) -> list[str]:
+        if self._tokens is None:
+            self._tokens = [t.text for t in self.doc]
+        return self._tokens
@@ -1,73 +1,94 @@
 # publisher/analysis_modules/controversiality_analysis.py
 
 from .base_pov import BasePOV
-from transformers import pipeline
-from nltk.tokenize import sent_tokenize
 import numpy as np
 
 class ControversialityAnalysis(BasePOV):
-    def __init__(self, text):
+    uses_doc = True
+    spacy_components = frozenset({"senter"})
+    # Using a sentiment analysis model to detect strong negative sentiments
+    models = (("nlptown/bert-base-multilingual-uncased-sentiment", "sentiment-analysis"),)
+
+    def __init__(self, text=None):
         super().__init__(text)
-        # Using a sentiment analysis model to detect strong negative sentiments
-        self.classifier = pipeline("sentiment-analysis", model="nlptown/bert-base-multilingual-uncased-sentiment")
-        # Ensure NLTK punkt tokenizer is available
-        import nltk
-        nltk.download('punkt', quiet=True)
+
+    @property
+    def classifier(self):
+        return self.pipeline()
 
     def analyze(self):
         try:
-            # Split the text into sentences
-            sentences = sent_tokenize(self.text)
-            
-            if not sentences:
-                return {'controversiality_analysis': 0.0}
-            
-            # Process each sentence individually
-            scores = []
-            for sentence in sentences:
-                # Skip very short sentences
-                if len(sentence.strip()) < 10:
-                    continue
-                    
-                # Truncate sentence if it's too long
-                if len(sentence) > 512:
-                    sentence = sentence[:512]
-                    
-                try:
-                    result = self.classifier(sentence)
-                    label = result[0]['label']
-                    score = int(label.split()[0])  # Extract the sentiment score (e.g., '3 stars')
-                    scores.append(score)
-                except Exception as e:
-                    print(f"Error processing sentence: {e}")
-                    continue
-            
-            # If we couldn't process any sentences, return 0
-            if not scores:
-                return {'controversiality_analysis': 0.0}
-            
-            # Compute controversiality as the standard deviation of sentiment scores
-            if len(scores) > 1:
-                # Standard deviation indicates disagreement/controversy
-                controversiality = np.std(scores) / 2.0  # Normalize (max std dev is 2)
-                
-                # Also consider extreme sentiments as controversial
-                extreme_count = sum(1 for s in scores if s == 1 or s == 5)
-                extreme_ratio = extreme_count / len(scores)
-                
-                # Combine both metrics
-                controversiality = (controversiality * 0.7 + extreme_ratio * 0.3)
-                controversiality = min(controversiality, 1.0)
-                controversiality = round(float(controversiality), 2)
-            else:
-                # Single sentence - check if it's extreme
-                if scores[0] in [1, 5]:
-                    controversiality = 0.5
-                else:
-                    controversiality = 0.0
-                    
-            return {'controversiality_analysis': controversiality}
-            
+            return self.analyze_batch([self.text], [self.context])[0]
         except Exception as e:
             print(f"Error in controversiality analysis: {e}")
             return {'controversiality_analysis': 0.0}
+
+    def analyze_batch(self, texts, contexts=None):
+        # Sentences of every document's shared parse, classified together
+        # in one pipeline call and split back per document afterwards
+        per_doc = []
+        for i, text in enumerate(texts):
+            self.text = text
+            self.context = contexts[i] if contexts is not None else None
+            # Skip very short sentences, truncate long ones
+            per_doc.append([s[:512] for s in self.sentences
+                            if len(s.strip()) >= 10])
+
+        flat = [s for sentences in per_doc for s in sentences]
+        stars = self._classify(flat)
+
+        out, pos = [], 0
+        for sentences in per_doc:
+            scores = [s for s in stars[pos:pos + len(sentences)]
+                      if s is not None]
+            pos += len(sentences)
+            out.append({'controversiality_analysis': self._score(scores)})
+        return out
+
+    def _classify(self, sentences):
+        """Star rating of every sentence, None where it cannot be scored.
+        One batched call; if that fails, one call per sentence, so a bad
+        sentence only loses its own score."""
+        if not sentences:
+            return []
+        try:
+            results = self.classifier(sentences, batch_size=self.batch_size)
+            return [self._stars(r) for r in results]
+        except Exception as e:
+            print(f"Error processing sentence batch, retrying one by one: {e}")
+        stars = []
+        for sentence in sentences:
+            try:
+                stars.append(self._stars(self.classifier(sentence)[0]))
+            except Exception as e:
+                print(f"Error processing sentence: {e}")
+                stars.append(None)
+        return stars
+
+    @staticmethod
+    def _stars(result):
+        # Extract the sentiment score (e.g., '3 stars')
+        return int(result['label'].split()[0])
+
+    @staticmethod
+    def _score(scores):
+        # If we couldn't process any sentences, return 0
+        if not scores:
+            return 0.0
+
+        # Compute controversiality as the standard deviation of sentiment scores
+        if len(scores) > 1:
+            # Standard deviation indicates disagreement/controversy
+            controversiality = np.std(scores) / 2.0  # Normalize (max std dev is 2)
+
+            # Also consider extreme sentiments as controversial
+            extreme_count = sum(1 for s in scores if s == 1 or s == 5)
+            extreme_ratio = extreme_count / len(scores)
+
+            # Combine both metrics
+            controversiality = (controversiality * 0.7 + extreme_ratio * 0.3)
+            controversiality = min(controversiality, 1.0)
+            return round(float(controversiality), 2)
+
+        # Single sentence - check if it's extreme
+        return 0.5 if scores[0] in [1, 5] else 0.0
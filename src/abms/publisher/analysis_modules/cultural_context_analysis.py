@@ -1,19 +1,21 @@
 # Example NER in Cultural Context Analysis
 
 from .base_pov import BasePOV
-import spacy
+
 
 class CulturalContextAnalysis(BasePOV):
-    def __init__(self, text):
+    uses_doc = True
+    spacy_components = frozenset({"ner"})
+    outputs = {'cultural_context_analysis': str}
+
+    def __init__(self, text=None):
         super().__init__(text)
-        self.nlp = spacy.load('en_core_web_sm')
 
     def analyze(self):
-        doc = self.nlp(self.text)
+        doc = self.doc
         cultural_entities = [ent for ent in doc.ents if ent.label_ in ['NORP', 'GPE', 'LOC', 'EVENT']]
         if cultural_entities:
             context = 'Cultural Specific'
         else:
             context = 'General'
         return {'cultural_context_analysis': context}
-
@@ -1,17 +1,21 @@
 # publisher/analysis_modules/emotional_polarity_analysis.py
 
 from .base_pov import BasePOV
-from transformers import pipeline
-
-emotion_pipeline = pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base", return_all_scores=True)
 
 class EmotionalPolarityAnalysis(BasePOV):
-    def __init__(self, text):
+    models = (("j-hartmann/emotion-english-distilroberta-base", "text-classification"),)
+
+    def __init__(self, text=None):
         super().__init__(text)
 
     def analyze(self):
-        results = emotion_pipeline(self.text[:512])
-        emotions = results[0]
-        max_emotion = max(emotions, key=lambda x: x['score'])
-        return {'emotional_polarity_analysis': max_emotion['score']}
+        return self.analyze_batch([self.text])[0]
 
+    def analyze_batch(self, texts, contexts=None):
+        # one pipeline call for the whole micro-batch (padded per batch);
+        # top_k=None → scores for every emotion label
+        results = self.pipeline()([t[:512] for t in texts], top_k=None,
+                                  batch_size=self.batch_size)
+        return [{'emotional_polarity_analysis':
+                 max(emotions, key=lambda x: x['score'])['score']}
+                for emotions in results]
@@ -1,21 +1,22 @@
 # publisher/analysis_modules/ethical_considerations_analysis.py
 
-from .base_pov import BasePOV
-from transformers import pipeline
+from abms.nli import HypothesisSet, fused_analyse
 
-# Initialize the zero-shot-classification pipeline
-ethical_pipeline = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+from .base_pov import BasePOV
 
 class EthicalConsiderationsAnalysis(BasePOV):
-    def __init__(self, text):
+    # zero-shot NLI, fused with the other NLI aspects
+    models = (("facebook/bart-large-mnli", "zero-shot-classification"),)
+    nli = HypothesisSet(("Ethical", "Unethical", "Neutral"))
+    outputs = {'ethical_considerations_analysis': str}
+
+    def __init__(self, text=None):
         super().__init__(text)
 
     def analyze(self):
-        premise = self.text[:512]
-        labels = ["Ethical", "Unethical", "Neutral"]
-        result = ethical_pipeline(premise, candidate_labels=labels)
-        scores = dict(zip(result['labels'], result['scores']))
+        return fused_analyse([self], [self.text])[0]
 
+    def from_nli(self, scores):
         unethical_score = scores.get('Unethical', 0)
 
         # Map the unethical score to 'Low', 'Medium', 'High'
@@ -27,4 +28,3 @@ class EthicalConsiderationsAnalysis(BasePOV):
             level = 'Low'
 
         return {'ethical_considerations_analysis': level}
-
@@ -4,7 +4,7 @@ from .base_pov import BasePOV
 import string
 
 class FormalismAnalysis(BasePOV):
-    def __init__(self, text):
+    def __init__(self, text=None):
         super().__init__(text)
         # Define a set of informal words and phrases
         self.informal_words = set([
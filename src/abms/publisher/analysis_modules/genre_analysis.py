@@ -1,44 +1,27 @@
 # publisher/analysis_modules/genre_analysis.py
 from __future__ import annotations
+from abms.nli import HypothesisSet, fused_analyse
 from .base_pov import BasePOV
-import functools, torch
-from transformers import (
-    pipeline,
-    AutoTokenizer,
-    AutoModelForSequenceClassification,
-)
 
 _MODEL = "facebook/bart-large-mnli"
-_DEVICE = 0 if torch.cuda.is_available() else -1
-
-@functools.lru_cache(maxsize=1)
-def _load():
-    tok = AutoTokenizer.from_pretrained(_MODEL)
-    mdl = AutoModelForSequenceClassification.from_pretrained(_MODEL)
-    return pipeline(
-        "zero-shot-classification",
-        model=mdl,
-        tokenizer=tok,
-        device=_DEVICE,
-    )
 
-_LABELS = [
+_LABELS = (
     "research article",
     "review",
     "editorial",
     "case study",
     "dataset paper",
-]
+)
 
 class GenreAnalysis(BasePOV):
+    models = ((_MODEL, "zero-shot-classification"),)
+    nli = HypothesisSet(_LABELS, template="This document is a {}.")
+    outputs = {"genre": str, "genre_confidence": float}
+
     def analyze(self):
-        pipe = _load()
-        res = pipe(
-            self.text[:512],
-            candidate_labels=_LABELS,
-            hypothesis_template="This document is a {}.",
-            top_k=1,
-        )
-        label = res["labels"][0]
-        score = float(res["scores"][0])
+        return fused_analyse([self], [self.text])[0]
+
+    def from_nli(self, scores):
+        label = max(scores, key=scores.get)
+        score = float(scores[label])
         return {"genre": label, "genre_confidence": round(score, 4)}
@@ -1,17 +1,21 @@
 # publisher/analysis_modules/intentionality_analysis.py
 
-from .base_pov import BasePOV
-from transformers import pipeline
+from abms.nli import HypothesisSet, fused_analyse
 
-intent_pipeline = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+from .base_pov import BasePOV
 
 class IntentionalityAnalysis(BasePOV):
-    def __init__(self, text):
+    # zero-shot NLI, fused with the other NLI aspects
+    models = (("facebook/bart-large-mnli", "zero-shot-classification"),)
+    nli = HypothesisSet(("Informative", "Persuasive", "Narrative", "Descriptive", "Expository", "Instructional"))
+    outputs = {'intentionality_analysis': str}
+
+    def __init__(self, text=None):
         super().__init__(text)
 
     def analyze(self):
-        candidate_intents = ["Informative", "Persuasive", "Narrative", "Descriptive", "Expository", "Instructional"]
-        result = intent_pipeline(self.text[:512], candidate_labels=candidate_intents)
-        intent = result['labels'][0]
-        return {'intentionality_analysis': intent}
+        return fused_analyse([self], [self.text])[0]
 
+    def from_nli(self, scores):
+        intent = max(scores, key=scores.get)
+        return {'intentionality_analysis': intent}
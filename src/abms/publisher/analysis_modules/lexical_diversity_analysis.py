@@ -1,20 +1,19 @@
 # publisher/analysis_modules/lexical_diversity_analysis.py
 
 from .base_pov import BasePOV
-import nltk
-from nltk.tokenize import word_tokenize
 import string
 
 class LexicalDiversityAnalysis(BasePOV):
-    def __init__(self, text):
+    uses_doc = True
+    spacy_components = frozenset()      # tokenisation only
+
+    def __init__(self, text=None):
         super().__init__(text)
-        # Ensure NLTK punkt tokenizer is available
-        nltk.download('punkt', quiet=True)
 
     def analyze(self):
         try:
-            # Tokenize and clean the text
-            tokens = word_tokenize(self.text.lower())
+            # Tokens of the shared per-document parse
+            tokens = [token.lower() for token in self.tokens]
             
             # Remove punctuation and non-alphabetic tokens
             words = [token for token in tokens 
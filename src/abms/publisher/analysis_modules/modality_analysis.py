@@ -3,7 +3,9 @@
 from .base_pov import BasePOV
 
 class ModalityAnalysis(BasePOV):
-    def __init__(self, text):
+    outputs = {'modality_analysis': str}
+
+    def __init__(self, text=None):
         super().__init__(text)
         self.modalities = ['Textual', 'Visual', 'Auditory', 'Multimedia']
         # Keywords associated with each modality
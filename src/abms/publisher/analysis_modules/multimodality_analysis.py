@@ -3,7 +3,9 @@
 from .base_pov import BasePOV
 
 class MultimodalityAnalysis(BasePOV):
-    def __init__(self, text):
+    outputs = {'multimodality_analysis': str}
+
+    def __init__(self, text=None):
         super().__init__(text)
         self.modalities = ['text', 'image', 'audio', 'video', 'interactive']
         # Keywords associated with each modality
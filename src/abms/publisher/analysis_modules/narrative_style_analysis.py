@@ -1,17 +1,18 @@
 # publisher/analysis_modules/narrative_style_analysis.py
 
 from .base_pov import BasePOV
-import spacy
 from collections import Counter
 
-nlp = spacy.load('en_core_web_sm')
-
 class NarrativeStyleAnalysis(BasePOV):
-    def __init__(self, text):
+    uses_doc = True
+    spacy_components = frozenset({"tagger", "attribute_ruler"})
+    outputs = {'narrative_style_analysis': str}
+
+    def __init__(self, text=None):
         super().__init__(text)
 
     def analyze(self):
-        doc = nlp(self.text)
+        doc = self.doc
         pronouns = [token.text.lower() for token in doc if token.pos_ == 'PRON']
         pronoun_counts = Counter(pronouns)
         first_person = sum(pronoun_counts.get(p, 0) for p in ['i', 'we', 'me', 'us', 'my', 'our'])
@@ -1,29 +1,46 @@
 # publisher/analysis_modules/novelty_analysis.py
 
+from abms.registry import SENTENCE_EMBEDDING
+
 from .base_pov import BasePOV
-from sentence_transformers import SentenceTransformer
 import numpy as np
 
 class NoveltyAnalysis(BasePOV):
-    def __init__(self, text):
+    # Use a smaller, more efficient model
+    models = (("paraphrase-MiniLM-L3-v2", SENTENCE_EMBEDDING),)
+
+    def __init__(self, text=None):
         super().__init__(text)
-        # Use a smaller, more efficient model
-        self.model = SentenceTransformer('paraphrase-MiniLM-L3-v2')
         self.reference_embeddings = self.load_reference_embeddings()
 
+    @property
+    def model(self):
+        return self.pipeline()
+
     def load_reference_embeddings(self):
         # Load precomputed embeddings of the reference corpus
         # For demonstration, we use an empty list to save resources
         return []
 
     def analyze(self):
-        # Process text in smaller chunks to save memory
-        sentences = self.text.split('.')
-        embeddings = self.model.encode(sentences, convert_to_numpy=True, show_progress_bar=False)
-        # Compute novelty score efficiently
-        novelty_score = 1.0  # Default score when no reference is available
-        if self.reference_embeddings:
-            distances = np.linalg.norm(self.reference_embeddings - embeddings.mean(axis=0), axis=1)
-            novelty_score = np.mean(distances)
-        return {'novelty_analysis': min(novelty_score, 1.0)}
+        return self.analyze_batch([self.text])[0]
 
+    def analyze_batch(self, texts, contexts=None):
+        # Process text in smaller chunks to save memory; the chunks of the
+        # whole micro-batch are embedded in one encode() call
+        per_doc = [text.split('.') for text in texts]
+        flat = [s for sentences in per_doc for s in sentences]
+        embeddings = self.model.encode(flat, convert_to_numpy=True,
+                                       batch_size=self.batch_size,
+                                       show_progress_bar=False)
+        out, pos = [], 0
+        for sentences in per_doc:
+            doc_embeddings = embeddings[pos:pos + len(sentences)]
+            pos += len(sentences)
+            # Compute novelty score efficiently
+            novelty_score = 1.0  # Default score when no reference is available
+            if self.reference_embeddings:
+                distances = np.linalg.norm(self.reference_embeddings - doc_embeddings.mean(axis=0), axis=1)
+                novelty_score = np.mean(distances)
+            out.append({'novelty_analysis': min(novelty_score, 1.0)})
+        return out
@@ -4,7 +4,7 @@ from .base_pov import BasePOV
 from textblob import TextBlob
 
 class ObjectivityAnalysis(BasePOV):
-    def __init__(self, text):
+    def __init__(self, text=None):
         super().__init__(text)
 
     def analyze(self):
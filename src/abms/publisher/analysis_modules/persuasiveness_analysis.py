@@ -4,7 +4,7 @@ from .base_pov import BasePOV
 import string
 
 class PersuasivenessAnalysis(BasePOV):
-    def __init__(self, text):
+    def __init__(self, text=None):
         super().__init__(text)
         self.persuasive_keywords = set([
             "must", "need", "should", "clearly", "obviously", "therefore",
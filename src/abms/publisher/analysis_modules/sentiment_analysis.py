@@ -1,16 +1,26 @@
 # publisher/analysis_modules/sentiment_analysis.py
 
+import functools
+
 from .base_pov import BasePOV
-from nltk.sentiment import SentimentIntensityAnalyzer
 
-sia = SentimentIntensityAnalyzer()
+
+@functools.lru_cache(maxsize=None)
+def _sia():
+    # built on first use: importing the module must not load VADER
+    from nltk.sentiment import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
 
 class SentimentAnalysis(BasePOV):
-    def __init__(self, text):
+    def __init__(self, text=None):
         super().__init__(text)
 
+    def setup(self):
+        _sia()
+        return super().setup()
+
     def analyze(self):
-        sentiment = sia.polarity_scores(self.text)
+        sentiment = _sia().polarity_scores(self.text)
         sentiment_score = sentiment['compound']
         return {'sentiment_analysis': sentiment_score}
-
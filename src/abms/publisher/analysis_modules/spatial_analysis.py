@@ -1,16 +1,17 @@
 # publisher/analysis_modules/spatial_analysis.py
 
 from .base_pov import BasePOV
-import spacy
-
-nlp = spacy.load('en_core_web_sm')
 
 class SpatialAnalysis(BasePOV):
-    def __init__(self, text):
+    uses_doc = True
+    spacy_components = frozenset({"ner"})
+    outputs = {'spatial_analysis': str}
+
+    def __init__(self, text=None):
         super().__init__(text)
 
     def analyze(self):
-        doc = nlp(self.text)
+        doc = self.doc
         locations = [ent.text for ent in doc.ents if ent.label_ in ['GPE', 'LOC']]
         unique_locations = set(locations)
         if len(unique_locations) > 10:
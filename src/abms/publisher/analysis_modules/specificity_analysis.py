@@ -2,23 +2,17 @@
 
 from .base_pov import BasePOV
 import re
-import spacy
-
-# Load the spaCy model
-try:
-    nlp = spacy.load('en_core_web_sm')
-except OSError:
-    import subprocess
-    subprocess.run(['python', '-m', 'spacy', 'download', 'en_core_web_sm'])
-    nlp = spacy.load('en_core_web_sm')
 
 class SpecificityAnalysis(BasePOV):
-    def __init__(self, text):
+    uses_doc = True
+    spacy_components = frozenset({"ner", "tagger", "attribute_ruler"})
+
+    def __init__(self, text=None):
         super().__init__(text)
 
     def analyze(self):
         try:
-            doc = nlp(self.text)
+            doc = self.doc
             
             # Count various specificity indicators
             specificity_score = 0
@@ -1,16 +1,16 @@
 # publisher/analysis_modules/syntactic_complexity_analysis.py
 
 from .base_pov import BasePOV
-import spacy
-
-nlp = spacy.load('en_core_web_sm')
 
 class SyntacticComplexityAnalysis(BasePOV):
-    def __init__(self, text):
+    uses_doc = True
+    spacy_components = frozenset({"tagger", "attribute_ruler", "parser"})
+
+    def __init__(self, text=None):
         super().__init__(text)
 
     def analyze(self):
-        doc = nlp(self.text)
+        doc = self.doc
         noun_phrases = list(doc.noun_chunks)
         modifier_counts = [len([token for token in np if token.dep_ == 'amod']) for np in noun_phrases]
         avg_modifiers = sum(modifier_counts) / len(modifier_counts) if modifier_counts else 0
@@ -2,20 +2,20 @@
 
 from .base_pov import BasePOV
 import re
-import spacy
 from collections import Counter
 
-nlp = spacy.load('en_core_web_sm')
-
 class TemporalAnalysis(BasePOV):
-    def __init__(self, text):
+    uses_doc = True
+    spacy_components = frozenset({"tagger", "attribute_ruler"})
+
+    def __init__(self, text=None):
         super().__init__(text)
 
     def analyze(self):
         # Extract temporal expressions
         dates = re.findall(r'\b(?:\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4})\b', self.text)
         # Analyze verb tenses
-        doc = nlp(self.text)
+        doc = self.doc
         tenses = [token.tag_ for token in doc if token.pos_ == 'VERB']
         tense_counts = Counter(tenses)
         total_verbs = sum(tense_counts.values())
@@ -1,12 +1,9 @@
 # publisher/data_ingestion.py
 
 import streamlit as st
-import chardet
 import mimetypes
-import pdfminer.high_level
-import docx2txt
-import pytesseract
-from PIL import Image
+
+# format-specific readers are imported on first use of that format
 
 class DataIngestion:
     def get_text(self):
@@ -15,17 +12,22 @@ class DataIngestion:
         if uploaded_file is not None:
             mime_type, _ = mimetypes.guess_type(uploaded_file.name)
             if mime_type == 'text/plain':
+                import chardet
                 raw_text = uploaded_file.read()
                 encoding = chardet.detect(raw_text)['encoding']
                 text = raw_text.decode(encoding)
                 return text
             elif mime_type == 'application/pdf':
+                import pdfminer.high_level
                 text = pdfminer.high_level.extract_text(uploaded_file)
                 return text
             elif mime_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
+                import docx2txt
                 text = docx2txt.process(uploaded_file)
                 return text
             elif mime_type in ['image/png', 'image/jpeg']:
+                import pytesseract
+                from PIL import Image
                 image = Image.open(uploaded_file)
                 text = pytesseract.image_to_string(image)
                 return text
@@ -4,65 +4,35 @@ from aspect_based_metadata_generator import generate_aspect_based_metadata
 import json
 import time
 import threading
-import gc
 import tempfile
 import os
 import queue
-import psutil
 import pickle
 import hashlib
-import pandas as pd
-import plotly.express as px
-
 from PIL import Image
 import wave
-from moviepy.editor import VideoFileClip
-import docx
-
-from analysis_modules import (
-    ActionabilityAnalysis,
-    AudienceAppropriatenessAnalysis,
-    CognitiveAnalysis,
-    ComplexityAnalysis,
-    ControversialityAnalysis,
-    CulturalContextAnalysis,
-    EmotionalPolarityAnalysis,
-    EthicalConsiderationsAnalysis,
-    FormalismAnalysis,
-    GenreAnalysis,
-    HumorAnalysis,
-    IntentionalityAnalysis,
-    InteractivityAnalysis,
-    LexicalDiversityAnalysis,
-    ModalityAnalysis,
-    MultimodalityAnalysis,
-    NarrativeStyleAnalysis,
-    NoveltyAnalysis,
-    ObjectivityAnalysis,
-    PersuasivenessAnalysis,
-    QuantitativeAnalysis,
-    QualitativeAnalysis,
-    ReadabilityAnalysis,
-    ReliabilityAnalysis,
-    SentimentAnalysis,
-    SocialOrientationAnalysis,
-    SpecificityAnalysis,
-    SpatialAnalysis,
-    SyntacticComplexityAnalysis,
-    TemporalAnalysis,
-)
-
-try:
-    from vosk import Model, KaldiRecognizer
-except ImportError:
-    st.error("Vosk library not found. Please install it using `pip install vosk`.")
-    st.stop()
+
+# Heavy, rarely needed dependencies (moviepy, vosk, torch/transformers for
+# BLIP, pandas/plotly for the resource chart, python-docx for reports) are
+# imported where they are used, so the app starts without them.
+from analysis_modules import ASPECTS, load_aspect
+from analysis_modules.context import AnalysisContext, components_for, get_nlp
+from abms import registry
+from abms.aspect_cache import AspectCache
+from abms.governor import Gate, Governor
+
+CHUNK_BATCH = 8     # text chunks analysed per module call (before throttling)
 
 vosk_model = None
 def load_vosk_model():
     global vosk_model
     if vosk_model is not None:
         return vosk_model
+    try:
+        from vosk import Model
+    except ImportError:
+        st.error("Vosk library not found. Please install it using `pip install vosk`.")
+        st.stop()
 
     model_path = "models/vosk-model-small-en-us-0.15"
     if not os.path.exists(model_path):
@@ -94,6 +64,9 @@ def load_blip_model():
     if blip_model is not None and blip_processor is not None:
         return blip_processor, blip_model
     try:
+        from abms import NET_RETRY_WAIT
+        from abms.utilities import net_retry
+        net_retry.install(wait=NET_RETRY_WAIT)
         from transformers import BlipProcessor, BlipForConditionalGeneration
         import torch
         device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
@@ -209,6 +182,7 @@ class DataIngestion:
             converted_tmp_file_path = tmp_file_path + '_converted.wav'
             audio.export(converted_tmp_file_path, format='wav')
 
+            from vosk import KaldiRecognizer
             wf = wave.open(converted_tmp_file_path, "rb")
             rec = KaldiRecognizer(model, wf.getframerate())
             rec.SetWords(True)
@@ -245,6 +219,7 @@ class DataIngestion:
                 tmp_file.write(file.read())
                 tmp_file_path = tmp_file.name
 
+            from moviepy.editor import VideoFileClip
             video = VideoFileClip(tmp_file_path)
             audio_path = tmp_file_path + ".wav"
             video.audio.write_audiofile(audio_path, verbose=False, logger=None)
@@ -256,6 +231,7 @@ class DataIngestion:
             converted_audio_path = tmp_file_path + "_converted.wav"
             audio_segment.export(converted_audio_path, format='wav')
 
+            from vosk import KaldiRecognizer
             wf = wave.open(converted_audio_path, "rb")
             rec = KaldiRecognizer(model, wf.getframerate())
             rec.SetWords(True)
@@ -294,6 +270,7 @@ class DataIngestion:
             blip_processor, blip_model = load_blip_model()
             if blip_model is None or blip_processor is None:
                 return []
+            from moviepy.editor import VideoFileClip
             video = VideoFileClip(video_path)
             duration = int(video.duration)
             image_descriptions = []
@@ -321,6 +298,7 @@ class DataIngestion:
 
     def extract_structured_data_description(self, file):
         try:
+            import pandas as pd
             if file.type == "text/csv":
                 df = pd.read_csv(file)
             else:
@@ -340,6 +318,13 @@ def main():
     if 'analysis_in_progress' not in st.session_state:
         st.session_state.analysis_in_progress = False
 
+    # opt-in, as for `abms encode --cache`; on by default when ABMS_CACHE
+    # names the cache file
+    use_cache = st.sidebar.checkbox(
+        "Reuse cached aspect results", value="ABMS_CACHE" in os.environ,
+        help="Skip the models for text chunks analysed before (stored in "
+             "a local SQLite cache).")
+
     data_ingestion = DataIngestion()
     text, data_type = data_ingestion.get_data()
 
@@ -359,7 +344,8 @@ def main():
 
             result_queue = queue.Queue()
             control_event = threading.Event()
-            analysis_thread = threading.Thread(target=start_analysis, args=(text, data_type, result_queue, control_event))
+            analysers = load_analysers(data_type)
+            analysis_thread = threading.Thread(target=start_analysis, args=(text, data_type, result_queue, control_event, analysers, use_cache))
             analysis_thread.start()
 
             progress_bar = st.progress(0)
@@ -372,10 +358,11 @@ def main():
 
             analysis_start_time = time.time()
             resource_usage_data = []
+            governor, _ = load_governor()
 
             while analysis_thread.is_alive() or not result_queue.empty():
                 try:
-                    message = result_queue.get_nowait()
+                    message = result_queue.get(timeout=0.1)
                     if message['type'] == 'progress':
                         progress_bar.progress(message['progress'])
                         eta_placeholder.text(message['eta_text'])
@@ -405,11 +392,12 @@ def main():
                     break
 
                 current_time = time.time() - analysis_start_time
-                cpu_usage = psutil.cpu_percent(interval=0.1)
-                memory_usage = psutil.virtual_memory().percent
+                governor.sample()  # non-blocking; shared with the analysis
+                cpu_usage = round(100 * governor.cpu, 1)
+                memory_usage = round(100 * governor.memory, 1)
                 resource_usage_data.append({"time": current_time, "cpu": cpu_usage, "memory": memory_usage})
-                resource_placeholder.text(f"CPU Usage: {cpu_usage}% | Memory Usage: {memory_usage}%")
-                time.sleep(0.1)
+                throttle_note = f" | {governor.status()}" if governor.throttled else ""
+                resource_placeholder.text(f"CPU Usage: {cpu_usage}% | Memory Usage: {memory_usage}%{throttle_note}")
 
             analysis_thread.join()
             st.session_state.analysis_in_progress = False
@@ -417,6 +405,8 @@ def main():
             total_analysis_duration = time.time() - analysis_start_time
             st.session_state.total_analysis_duration = total_analysis_duration
             st.write(f"**Analysis completed in {total_analysis_duration:.2f} seconds.**")
+            import pandas as pd
+            import plotly.express as px
             df_resources = pd.DataFrame(resource_usage_data)
             fig = px.line(df_resources, x="time", y=["cpu", "memory"],
                           labels={"time": "Time (s)", "value": "Usage (%)"},
@@ -543,10 +533,13 @@ def main():
     else:
         st.write("Please upload a file or enter text.")
 
-def start_analysis(text, data_type, result_queue, control_event):
+def start_analysis(text, data_type, result_queue, control_event, analysers=None, use_cache=False):
     try:
-        analysis_modules = get_analysis_modules(data_type)
-        number_of_modules = len(analysis_modules)
+        if analysers is None:
+            analysers = new_analysers(data_type)
+        cache = load_aspect_cache() if use_cache else None
+        number_of_modules = len(analysers)
+        components = components_for(analysers)
         chunk_size = 1000
         num_chunks = len(text) // chunk_size + 1
         total_steps = number_of_modules * num_chunks
@@ -562,69 +555,66 @@ def start_analysis(text, data_type, result_queue, control_event):
             progress_file_path = None
 
         step = start_step
+        last_saved_step = step
         start_time = time.time()
-        base_sleep_time = 0.1
-        current_sleep_time = base_sleep_time
-        max_attempts = 5
-
-        def cpu_dummy_work(n=100000):
-            x = 0
-            for i in range(n):
-                x += i
-            return x
+        # Shared with every session: chunks in flight and chunks per call
+        # shrink while memory / CPU are over budget (no sleeping here).
+        governor, gate = load_governor()
 
-        for chunk_index in range(num_chunks):
+        chunk_index = 0
+        while chunk_index < num_chunks:
             if control_event.is_set():
                 break
-            chunk = text[chunk_index * chunk_size : (chunk_index + 1) * chunk_size]
-            if not chunk:
+            n = governor.batch_size(CHUNK_BATCH)
+            chunks = [text[i * chunk_size:(i + 1) * chunk_size]
+                      for i in range(chunk_index, min(chunk_index + n, num_chunks))]
+            chunk_index += n
+            chunks = [chunk for chunk in chunks if chunk]
+            if not chunks:
                 continue
-            for module in analysis_modules:
-                if control_event.is_set():
-                    break
-                try:
-                    analysis_instance = module(chunk)
-                    result = analysis_instance.analyze()
-                    analysis_results = aggregate_results(analysis_results, result, categorical_counts)
-                except Exception as e:
-                    result_queue.put({'type': 'error', 'content': f"Error in module {module.__name__}: {e}"})
-                    control_event.set()
-                    control_event.action = 'error'
-                    break
-                step += 1
-                progress = step / total_steps
-                elapsed_time = time.time() - start_time
-                eta = (elapsed_time / step) * (total_steps - step) if step > 0 else 0
-                eta_text = f"Estimated time remaining: {int(eta)} seconds"
-                status_text = f"Processing module {module.__name__} (Step {step}/{total_steps})"
-                result_queue.put({
-                    'type': 'progress',
-                    'progress': progress,
-                    'eta_text': eta_text,
-                    'status': status_text
-                })
-                if step % 10 == 0:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.pkl') as tmp_file:
-                        pickle.dump((analysis_results, categorical_counts, step), tmp_file)
-                        progress_file_path = tmp_file.name
-                        result_queue.put({'type': 'progress_file', 'path': progress_file_path})
-                gc.collect()
-                for attempt in range(max_attempts):
-                    cpu_usage = psutil.cpu_percent(interval=0.1)
-                    memory_usage = psutil.virtual_memory().percent
-                    if cpu_usage > 70 or memory_usage > 70:
-                        current_sleep_time *= 2
-                        if attempt == max_attempts - 1 and chunk_size > 100:
-                            chunk_size //= 2
-                            num_chunks = len(text) // chunk_size + 1
-                            total_steps = number_of_modules * num_chunks
-                        time.sleep(current_sleep_time)
-                        cpu_dummy_work(20000)
-                    else:
-                        current_sleep_time = base_sleep_time
+            gate.acquire(len(chunks))  # waits while other sessions hold the budget
+            try:
+                # one spaCy parse per chunk, shared by the modules
+                contexts = [AnalysisContext(chunk, components=components) for chunk in chunks]
+                for analyser in analysers:
+                    if control_event.is_set():
                         break
-            del chunk
-            gc.collect()
+                    module = type(analyser)
+                    try:
+                        # cached (chunk hash, module, version) → no model run
+                        if cache is not None:
+                            results = cache.run(analyser, chunks, contexts)
+                        else:
+                            results = analyser.analyze_batch(chunks, contexts)
+                        for result in results:
+                            analysis_results = aggregate_results(analysis_results, result, categorical_counts)
+                    except Exception as e:
+                        result_queue.put({'type': 'error', 'content': f"Error in module {module.__name__}: {e}"})
+                        control_event.set()
+                        control_event.action = 'error'
+                        break
+                    step += len(chunks)
+                    progress = min(1.0, step / total_steps)
+                    elapsed_time = time.time() - start_time
+                    eta = (elapsed_time / step) * (total_steps - step) if step > 0 else 0
+                    eta_text = f"Estimated time remaining: {int(eta)} seconds"
+                    status_text = f"Processing module {module.__name__} (Step {step}/{total_steps})"
+                    if governor.throttled:
+                        status_text += f" – {governor.status()}"
+                    result_queue.put({
+                        'type': 'progress',
+                        'progress': progress,
+                        'eta_text': eta_text,
+                        'status': status_text
+                    })
+                    if step - last_saved_step >= 10:
+                        last_saved_step = step
+                        with tempfile.NamedTemporaryFile(delete=False, suffix='.pkl') as tmp_file:
+                            pickle.dump((analysis_results, categorical_counts, step), tmp_file)
+                            progress_file_path = tmp_file.name
+                            result_queue.put({'type': 'progress_file', 'path': progress_file_path})
+            finally:
+                gate.release(len(chunks))
 
         if not control_event.is_set():
             data_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
@@ -651,39 +641,59 @@ def start_analysis(text, data_type, result_queue, control_event):
     except Exception as e:
         result_queue.put({'type': 'error', 'content': f"An error occurred during analysis: {e}"})
 
+@st.cache_resource(show_spinner="Loading analysis models...")
+def load_models(data_type):
+    """The heavy, read-only parts, loaded once per process and shared by
+    every session: the registry models (one copy of the weights per
+    checkpoint, held by the handles returned) and the spaCy pipeline."""
+    modules = get_analysis_modules(data_type)
+    handles = []
+    for module in modules:
+        for checkpoint, task in module.models:
+            handle = registry.acquire(checkpoint, task)
+            if module.nli is not None:
+                handle.model            # the fused NLI stage skips the pipeline
+            else:
+                handle.pipeline
+            handles.append(handle)
+    if any(module.uses_doc for module in modules):
+        get_nlp(components_for(modules))
+    return handles
+
+def new_analysers(data_type):
+    """Fresh analyser instances over the shared models.  An instance keeps
+    the document it is analysing on ``self`` (``text`` / ``context``), so
+    instances must not be shared between concurrent analyses."""
+    load_models(data_type)
+    return [module().setup() for module in get_analysis_modules(data_type)]
+
+def load_analysers(data_type):
+    """This session's analyser instances (built on first use, kept in
+    ``st.session_state``); the models behind them are shared, see
+    ``load_models``."""
+    key = f"analysers_{data_type}"
+    if key not in st.session_state:
+        st.session_state[key] = new_analysers(data_type)
+    return st.session_state[key]
+
+@st.cache_resource
+def load_governor():
+    """Resource governor and chunk admission: throttles when more than 70%
+    of the machine's RAM is in use or CPU load is over 70%, as before, but
+    by shrinking the work in flight instead of sleeping.  Both are cached
+    resources, so the admission limit is shared by every session: chunks
+    of concurrent analyses queue at the same Gate."""
+    governor = Governor(memory_target=0.7, cpu_target=0.7)
+    return governor, Gate(governor, capacity=4 * CHUNK_BATCH, floor=1)
+
+@st.cache_resource
+def load_aspect_cache():
+    """Persistent aspect result cache shared by every session."""
+    return AspectCache()
+
 def get_analysis_modules(data_type):
-    return [
-        ActionabilityAnalysis,
-        AudienceAppropriatenessAnalysis,
-        CognitiveAnalysis,
-        ComplexityAnalysis,
-        ControversialityAnalysis,
-        CulturalContextAnalysis,
-        EmotionalPolarityAnalysis,
-        EthicalConsiderationsAnalysis,
-        FormalismAnalysis,
-        GenreAnalysis,
-        HumorAnalysis,
-        IntentionalityAnalysis,
-        InteractivityAnalysis,
-        LexicalDiversityAnalysis,
-        ModalityAnalysis,
-        MultimodalityAnalysis,
-        NarrativeStyleAnalysis,
-        NoveltyAnalysis,
-        ObjectivityAnalysis,
-        PersuasivenessAnalysis,
-        QuantitativeAnalysis,
-        QualitativeAnalysis,
-        ReadabilityAnalysis,
-        ReliabilityAnalysis,
-        SentimentAnalysis,
-        SocialOrientationAnalysis,
-        SpecificityAnalysis,
-        SpatialAnalysis,
-        SyntacticComplexityAnalysis,
-        TemporalAnalysis,
-    ]
+    # imported here, on first analysis, not when the page loads
+    return [load_aspect(name) for name in ASPECTS]
 
 def aggregate_results(existing_results, new_results, categorical_counts):
     for key, value in new_results.items():
@@ -0,0 +1,169 @@
+# ────────────────────────────────────────────────────────────────────
+#  src/abms/registry.py
+# ────────────────────────────────────────────────────────────────────
+"""
+Process-wide registry of Hugging Face models.
+
+Handles are keyed by (checkpoint, task), loaded lazily on first use and
+reference-counted.  Several aspects asking for the same checkpoint – e.g.
+genre, reliability, ethics and intentionality all use
+facebook/bart-large-mnli – share one copy of the weights; when the last
+holder releases its handle the weights are dropped.
+
+Usage
+    h = registry.acquire("facebook/bart-large-mnli", "zero-shot-classification")
+    h.pipeline(text, candidate_labels=[...])
+    h.release()
+"""
+from __future__ import annotations
+
+import functools
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+# task served by sentence-transformers instead of a transformers pipeline
+SENTENCE_EMBEDDING = "sentence-embedding"
+
+_LOCK = threading.RLock()
+_HANDLES: Dict[Tuple[str, str], "ModelHandle"] = {}
+
+
+@functools.lru_cache(maxsize=1)
+def _device() -> int:
+    import torch
+    return 0 if torch.cuda.is_available() else -1
+
+
+@functools.lru_cache(maxsize=1)
+def _install_net_retry() -> None:
+    # before transformers / sentence-transformers bind the hub downloaders
+    from . import NET_RETRY_WAIT
+    from .utilities import net_retry
+    net_retry.install(wait=NET_RETRY_WAIT)
+
+
+def on_gpu() -> bool:
+    """True when models are placed on CUDA (they cannot be forked)."""
+    return _device() >= 0
+
+
+class ModelHandle:
+    """Lazily loaded model + tokenizer (+ pipeline) for one (checkpoint, task)."""
+
+    def __init__(self, checkpoint: str, task: str):
+        self.checkpoint = checkpoint
+        self.task = task
+        self.refs = 0
+        self.cache: dict = {}          # derived per-model data (e.g. token ids)
+        self._model = None
+        self._tokenizer = None
+        self._pipeline = None
+        self._lock = threading.RLock()
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.checkpoint, self.task
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._model is not None:
+                return
+            logging.info("[ABMS] loading %s (%s)", self.checkpoint, self.task)
+            _install_net_retry()
+            if self.task == SENTENCE_EMBEDDING:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.checkpoint)
+                return
+            from transformers import (AutoModelForSequenceClassification,
+                                      AutoTokenizer)
+            self._tokenizer = AutoTokenizer.from_pretrained(self.checkpoint)
+            self._model = AutoModelForSequenceClassification.from_pretrained(
+                self.checkpoint)
+            self._model.eval()
+            if _device() >= 0:
+                self._model.to(f"cuda:{_device()}")
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the loaded weights (parameters and buffers), 0 when not
+        loaded."""
+        with self._lock:
+            if self._model is None:
+                return 0
+            if "nbytes" not in self.cache:
+                tensors = [*getattr(self._model, "parameters", list)(),
+                           *getattr(self._model, "buffers", list)()]
+                self.cache["nbytes"] = sum(t.numel() * t.element_size()
+                                           for t in tensors)
+            return self.cache["nbytes"]
+
+    @property
+    def model(self):
+        self._load()
+        return self._model
+
+    @property
+    def tokenizer(self):
+        self._load()
+        return self._tokenizer
+
+    @property
+    def pipeline(self):
+        """transformers pipeline built from the shared objects (for the
+        sentence-embedding task: the SentenceTransformer itself)."""
+        with self._lock:
+            if self._pipeline is None:
+                self._load()
+                if self.task == SENTENCE_EMBEDDING:
+                    self._pipeline = self._model
+                else:
+                    from transformers import pipeline
+                    self._pipeline = pipeline(self.task,
+                                              model=self._model,
+                                              tokenizer=self._tokenizer,
+                                              device=_device())
+            return self._pipeline
+
+    def release(self) -> None:
+        release(self)
+
+    def _unload(self) -> None:
+        with self._lock:
+            self._pipeline = self._model = self._tokenizer = None
+            self.cache.clear()
+
+
+def acquire(checkpoint: str, task: str) -> ModelHandle:
+    """Reference to the shared handle for (checkpoint, task).  Nothing is
+    loaded until the model, tokenizer or pipeline is first touched."""
+    with _LOCK:
+        handle = _HANDLES.get((checkpoint, task))
+        if handle is None:
+            handle = _HANDLES[(checkpoint, task)] = ModelHandle(checkpoint, task)
+        handle.refs += 1
+        return handle
+
+
+def release(handle: ModelHandle) -> None:
+    """Drop one reference; the weights go away with the last one."""
+    with _LOCK:
+        if handle.refs <= 0:
+            return
+        handle.refs -= 1
+        if handle.refs == 0:
+            _HANDLES.pop(handle.key, None)
+            handle._unload()
+            logging.info("[ABMS] unloaded %s (%s)", *handle.key)
+
+
+def stats() -> List[dict]:
+    """One entry per registered handle (for logs / metrics)."""
+    with _LOCK:
+        return [{"checkpoint": h.checkpoint, "task": h.task,
+                 "refs": h.refs, "loaded": h.loaded, "bytes": h.nbytes}
+                for h in _HANDLES.values()]
@@ -0,0 +1,83 @@
+# ────────────────────────────────────────────────────────────────────
+#  src/abms/reorder.py
+# ────────────────────────────────────────────────────────────────────
+"""
+Bounded reorder buffer.
+
+Parallel producers finish out of order; the output file must not – resume
+counts output lines and skips that many input lines, so line k of the
+output has to be input line k.  Producers tag each result with its input
+sequence number; the consumer receives results strictly in sequence.
+
+The buffer holds at most `capacity` sequence numbers ahead of the next one
+to emit.  `reserve(seq)` blocks until `seq` fits, so when one straggler
+holds up the head the producers stop taking new work instead of piling up
+results in memory.
+
+    buf = ReorderBuffer(capacity=8)
+    # producer side
+    buf.reserve(seq); ...; buf.put(seq, result)
+    # consumer side
+    for result in buf.drain(n_items): write(result)
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Generic, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class ReorderBuffer(Generic[T]):
+    def __init__(self, capacity: int, first_seq: int = 0):
+        self.capacity = max(1, capacity)
+        self.next_seq = first_seq
+        self._pending: Dict[int, T] = {}
+        self._error: BaseException | None = None
+        self._cond = threading.Condition()
+        # diagnostics
+        self.max_held = 0
+        self.stalled_seconds = 0.0
+
+    def reserve(self, seq: int) -> None:
+        """Block until `seq` is within `capacity` of the emit head
+        (backpressure for whoever hands out work)."""
+        with self._cond:
+            if seq < self.next_seq + self.capacity:
+                return
+            t0 = time.perf_counter()
+            self._cond.wait_for(lambda: self._error is not None or
+                                seq < self.next_seq + self.capacity)
+            self.stalled_seconds += time.perf_counter() - t0
+
+    def put(self, seq: int, item: T) -> None:
+        with self._cond:
+            if seq < self.next_seq or seq in self._pending:
+                raise ValueError(f"sequence number {seq} already delivered")
+            self._pending[seq] = item
+            self.max_held = max(self.max_held, len(self._pending))
+            self._cond.notify_all()
+
+    @property
+    def failed(self) -> bool:
+        return self._error is not None
+
+    def fail(self, exc: BaseException) -> None:
+        """Abort: `drain` re-raises `exc`, `reserve` stops blocking."""
+        with self._cond:
+            self._error = exc
+            self._cond.notify_all()
+
+    def drain(self, count: int) -> Iterator[T]:
+        """Yield the next `count` results in sequence order."""
+        for _ in range(count):
+            with self._cond:
+                self._cond.wait_for(lambda: self._error is not None or
+                                    self.next_seq in self._pending)
+                if self._error is not None:
+                    raise self._error
+                item = self._pending.pop(self.next_seq)
+                self.next_seq += 1
+                self._cond.notify_all()
+            yield item
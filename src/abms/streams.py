@@ -0,0 +1,238 @@
+# ────────────────────────────────────────────────────────────────────
+#  src/abms/streams.py
+# ────────────────────────────────────────────────────────────────────
+"""
+Compressed and standard-stream JSONL I/O.
+
+Paths ending in ``.gz`` (gzip) or ``.zst`` / ``.zstd`` (Zstandard) are
+read and written transparently; ``-`` is stdin / stdout.  Offsets into a
+compressed input are positions in its *decompressed* stream.
+
+Compressed output is written as a sequence of independent frames (gzip
+members / zstd frames), one per commit – standard tools read such files
+as one stream.  A frame only ever ends on a record boundary, so every
+frame end is a resume point: the checkpoint records the last one, and
+without a checkpoint `complete_frames` finds it by decompressing.
+
+Compression runs on a background thread (`FrameCompressor`); zlib and
+zstd release the GIL, so it overlaps with the analysis.
+"""
+from __future__ import annotations
+
+import gzip
+import io
+import logging
+import os
+import pathlib
+import queue
+import sys
+import threading
+import zlib
+from typing import BinaryIO, Callable, Iterator, Tuple
+
+STDIO = "-"
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+_SUFFIXES = {".gz": "gzip", ".zst": "zstd", ".zstd": "zstd"}
+_CHUNK = 1 << 20
+
+
+def is_stdio(path: pathlib.Path | str) -> bool:
+    return str(path) == STDIO
+
+
+def compression_of(path: pathlib.Path | str) -> str | None:
+    """"gzip", "zstd" or None, by file suffix."""
+    if is_stdio(path):
+        return None
+    return _SUFFIXES.get(pathlib.Path(path).suffix.lower())
+
+
+def is_plain_file(path: pathlib.Path | str) -> bool:
+    """Uncompressed regular file: byte offsets can be seeked to."""
+    return not is_stdio(path) and compression_of(path) is None
+
+
+def strip_compression(path: pathlib.Path) -> Tuple[pathlib.Path, str]:
+    """(`path` without its compression suffix, that suffix or "")."""
+    if compression_of(path):
+        return path.with_suffix(""), path.suffix
+    return path, ""
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:                        # pragma: no cover
+        raise RuntimeError("reading / writing .zst files needs the "
+                           "'zstandard' package") from None
+    return zstandard
+
+
+# ── input ────────────────────────────────────────────────────────────
+def open_input(path: pathlib.Path | str, start: int = 0) -> BinaryIO:
+    """Binary reader of the (decompressed) records of `path`, positioned
+    at decompressed byte `start`."""
+    kind = compression_of(path)
+    if is_stdio(path):
+        fh: BinaryIO = open(sys.stdin.fileno(), "rb", closefd=False)
+    elif kind == "gzip":
+        fh = gzip.open(path, "rb")
+    elif kind == "zstd":
+        raw = open(path, "rb")
+        fh = io.BufferedReader(_zstd().ZstdDecompressor().stream_reader(
+            raw, read_across_frames=True, closefd=True), _CHUNK)
+    else:
+        fh = open(path, "rb")
+        fh.seek(start)
+        return fh
+    _skip(fh, start)
+    return fh
+
+
+def _skip(fh: BinaryIO, n: int) -> None:
+    """Read past `n` bytes (streams that cannot seek)."""
+    while n > 0:
+        got = len(fh.read(min(n, _CHUNK)))
+        if not got:
+            break
+        n -= got
+
+
+def input_size(path: pathlib.Path | str) -> int | None:
+    """Byte length of the input stream if known cheaply (plain files)."""
+    return pathlib.Path(path).stat().st_size if is_plain_file(path) else None
+
+
+# ── compressed output ────────────────────────────────────────────────
+def _compressobj(kind: str):
+    if kind == "gzip":
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return _zstd().ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+
+def _decompressobj(kind: str):
+    if kind == "gzip":
+        return zlib.decompressobj(31)
+    return _zstd().ZstdDecompressor().decompressobj()
+
+
+class FrameCompressor:
+    """Compress data written to `fh` on a background thread, one frame per
+    `end_frame`.  At most `depth` writes are queued (backpressure)."""
+
+    _STOP = object()
+
+    def __init__(self, fh: BinaryIO, kind: str, depth: int = 64):
+        self.fh = fh
+        self.kind = kind
+        self.frame_start = fh.tell()
+        self.error: BaseException | None = None
+        self._queue: queue.Queue = queue.Queue(depth)
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name="abms-compress")
+        self._thread.start()
+
+    def write(self, data: bytes) -> None:
+        self._check()
+        self._queue.put(data)
+
+    def end_frame(self, on_synced: Callable[[int, int], None] | None = None,
+                  ) -> None:
+        """Finish the current frame and fsync; then call
+        ``on_synced(frame_start, frame_end)`` on the compressor thread."""
+        self._check()
+        self._queue.put(on_synced or _noop)
+
+    def close(self) -> None:
+        """Finish the last frame, wait for the thread, re-raise its error."""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self._check()
+
+    def _check(self) -> None:
+        if self.error is not None:
+            raise RuntimeError("compression thread failed") from self.error
+
+    def _run(self) -> None:
+        comp, dirty = _compressobj(self.kind), False
+        while True:
+            item = self._queue.get()
+            if self.error is not None:
+                if item is self._STOP:
+                    return
+                continue                        # drain until STOP
+            try:
+                if isinstance(item, bytes):
+                    self.fh.write(comp.compress(item))
+                    dirty = True
+                    continue
+                if dirty:
+                    self.fh.write(comp.flush())
+                    comp, dirty = _compressobj(self.kind), False
+                self.fh.flush()
+                os.fsync(self.fh.fileno())
+                if item is self._STOP:
+                    return
+                end = self.fh.tell()
+                item(self.frame_start, end)
+                self.frame_start = end
+            except BaseException as e:          # noqa: BLE001
+                logging.exception("Compression of %s failed",
+                                  getattr(self.fh, "name", "output"))
+                self.error = e
+                if item is self._STOP:
+                    return
+
+
+def _noop(start: int, end: int) -> None:
+    pass
+
+
+# ── compressed output: recovery ──────────────────────────────────────
+def complete_frames(path: pathlib.Path,
+                    kind: str) -> Iterator[Tuple[int, int, bytes]]:
+    """(start, end, decompressed data) of each complete frame of `path`, in
+    order.  Stops at the first torn or corrupt frame."""
+    errors = (zlib.error,) if kind == "gzip" else (_zstd().ZstdError,)
+    with path.open("rb") as fh:
+        start = offset = 0
+        dec, parts = _decompressobj(kind), []
+        buf = fh.read(_CHUNK)
+        while buf:
+            try:
+                parts.append(dec.decompress(buf))
+            except errors:
+                return
+            if not dec.eof:
+                offset += len(buf)
+                buf = fh.read(_CHUNK)
+                continue
+            rest = dec.unused_data
+            end = offset + len(buf) - len(rest)
+            yield start, end, b"".join(parts)
+            start = offset = end
+            dec, parts = _decompressobj(kind), []
+            buf = rest or fh.read(_CHUNK)
+
+
+def read_frame(path: pathlib.Path, kind: str, start: int, end: int) -> bytes:
+    """Decompressed data of the frame(s) in bytes [start, end) of `path`;
+    ValueError if that is not a sequence of complete frames."""
+    with path.open("rb") as fh:
+        fh.seek(start)
+        raw = fh.read(end - start)
+    out = []
+    try:
+        while raw:
+            dec = _decompressobj(kind)
+            out.append(dec.decompress(raw))
+            if not dec.eof:
+                raise ValueError("torn frame")
+            raw = dec.unused_data
+    except Exception as e:                      # zlib.error, ZstdError, torn
+        raise ValueError(f"no complete frame at {path.name}:{start}") from e
+    return b"".join(out)
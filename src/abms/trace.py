@@ -0,0 +1,227 @@
+# ────────────────────────────────────────────────────────────────────
+#  src/abms/trace.py
+# ────────────────────────────────────────────────────────────────────
+"""
+Opt-in timing spans of the encoder (``abms encode --trace run.trace``).
+
+A span is one timed step on one document – or on one micro-batch, for
+modules and the fused NLI pass that run a batch per call – at a stage:
+
+    decode   JSON decoding of the input line
+    parse    spaCy (`nlp.pipe`)
+    cache    aspect cache lookup / store of a micro-batch
+    nli      the fused zero-shot NLI pass of a micro-batch
+    module   one aspect module (per document or per micro-batch)
+    json     encoding the output lines of a window
+    write    handing them to the writer (commits included)
+
+with its name (module, ...), the input offset of its (first) document,
+the number of documents and the micro-batch size, wall and CPU time (CPU
+of the calling thread – torch's intra-op threads are not included) and
+the input length in characters and words (spaces + 1).
+
+Spans are buffered as tuples (well under a microsecond each) and appended
+to the trace file in self-describing binary chunks:
+
+    "ABTR", pid, span count, name count      <4sIIH
+    names                                    <H length + UTF-8, each
+    spans                                    <QIIHBxqqII (44 bytes) each
+
+Each chunk goes out in one O_APPEND write, so forked workers share the
+file; a chunk torn by a crash is ignored.  `summarize` reports per stage
+and name the per-document latency percentiles and the share of the
+traced time:
+
+    abms trace summarize run.trace
+"""
+from __future__ import annotations
+
+import os
+import pathlib
+import struct
+import threading
+import time
+from typing import Dict, Iterator, List, Tuple
+
+STAGES = ("decode", "parse", "cache", "nli", "module", "json", "write")
+DECODE, PARSE, CACHE, NLI, MODULE, JSON, WRITE = range(len(STAGES))
+
+MAGIC = b"ABTR"
+_HEAD = struct.Struct("<4sIIH")
+_NAME = struct.Struct("<H")
+_SPAN = struct.Struct("<QIIHBxqqII")
+_FLUSH_SPANS = 8192
+
+clock_ns = time.perf_counter_ns
+cpu_ns = time.thread_time_ns
+
+
+def clock() -> Tuple[int, int]:
+    """Start of a span: (wall, thread CPU) in nanoseconds."""
+    return clock_ns(), cpu_ns()
+
+
+class Tracer:
+    """Buffers spans and appends them to `path` (see module docstring).
+    `add` may be called from any thread."""
+
+    def __init__(self, path: pathlib.Path | str):
+        self.path = pathlib.Path(path)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+                           0o644)
+        self._names: Dict[str, int] = {}
+        self._spans: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def _name_id(self, name: str) -> int:
+        ids = self._names
+        if name not in ids:
+            with self._lock:
+                ids.setdefault(name, len(ids))
+        return ids[name]
+
+    def add(self, stage: int, name: str, t0: Tuple[int, int], doc: int = 0,
+            docs: int = 1, batch: int = 1, chars: int = 0,
+            tokens: int = 0) -> None:
+        """Record a span of `stage` started at `t0` (see `clock`)."""
+        self._spans.append((doc, docs, batch, self._name_id(name), stage,
+                            clock_ns() - t0[0], cpu_ns() - t0[1],
+                            chars, tokens))
+        if len(self._spans) >= _FLUSH_SPANS:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            n = len(self._spans)
+            if not n or self._fd < 0:
+                return
+            spans = self._spans[:n]
+            del self._spans[:n]        # appends made meanwhile stay queued
+            names = sorted(self._names.items(), key=lambda kv: kv[1])
+            parts = [_HEAD.pack(MAGIC, os.getpid(), n, len(names))]
+            for name, _ in names:
+                raw = name.encode("utf-8")
+                parts += [_NAME.pack(len(raw)), raw]
+            parts += [_SPAN.pack(*span) for span in spans]
+            os.write(self._fd, b"".join(parts))
+
+    def close(self) -> None:
+        self.flush()
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+# ── the process-wide tracer ──────────────────────────────────────────
+_CURRENT: Tracer | None = None
+
+
+def start(path: pathlib.Path | str) -> Tracer:
+    """Trace the encoder of this process (and of workers forked later)
+    into `path`."""
+    global _CURRENT
+    stop()
+    _CURRENT = Tracer(path)
+    return _CURRENT
+
+
+def current() -> Tracer | None:
+    return _CURRENT
+
+
+def flush() -> None:
+    """Write out buffered spans – before a fork, and at the end of each
+    task in a worker (workers exit without cleanup)."""
+    if _CURRENT is not None:
+        _CURRENT.flush()
+
+
+def stop() -> None:
+    global _CURRENT
+    if _CURRENT is not None:
+        _CURRENT.close()
+        _CURRENT = None
+
+
+# ── reading ──────────────────────────────────────────────────────────
+def read_chunks(path: pathlib.Path | str) -> Iterator[Tuple[List[str], bytes]]:
+    """(names, packed spans) of every complete chunk of the trace `path`."""
+    with open(path, "rb") as fh:
+        while True:
+            head = fh.read(_HEAD.size)
+            if len(head) < _HEAD.size:
+                return
+            magic, _, n_spans, n_names = _HEAD.unpack(head)
+            if magic != MAGIC:
+                raise ValueError(f"{path}: not an abms trace "
+                                 f"(at byte {fh.tell() - len(head)})")
+            names = []
+            for _ in range(n_names):
+                raw = fh.read(_NAME.size)
+                if len(raw) < _NAME.size:
+                    return
+                name = fh.read(_NAME.unpack(raw)[0])
+                names.append(name.decode("utf-8", "replace"))
+            spans = fh.read(n_spans * _SPAN.size)
+            if len(spans) < n_spans * _SPAN.size:
+                return                  # torn by a crash
+            yield names, spans
+
+
+def summarize(path: pathlib.Path | str) -> List[dict]:
+    """Per (stage, name): documents, spans, mean batch, per-document latency
+    percentiles (ms, weighted by documents), total wall and CPU seconds
+    and share of all traced time, largest share first.  Stages overlap in
+    time (they run on separate threads), so shares are of the summed span
+    time, not of the run's duration."""
+    import numpy as np
+
+    dtype = np.dtype([("doc", "<u8"), ("docs", "<u4"), ("batch", "<u4"),
+                      ("name", "<u2"), ("stage", "u1"), ("pad", "u1"),
+                      ("wall", "<i8"), ("cpu", "<i8"), ("chars", "<u4"),
+                      ("tokens", "<u4")])
+    groups: Dict[Tuple[str, str], list] = {}
+    for names, raw in read_chunks(path):
+        spans = np.frombuffer(raw, dtype=dtype)
+        keys = spans["stage"].astype(np.int64) << 16 | spans["name"]
+        for key in np.unique(keys):
+            stage, name = STAGES[key >> 16], names[key & 0xFFFF]
+            groups.setdefault((stage, name), []).append(spans[keys == key])
+    total = sum(int(s["wall"].sum()) for parts in groups.values()
+                for s in parts) or 1
+    rows = []
+    for (stage, name), parts in groups.items():
+        s = np.concatenate(parts)
+        docs = s["docs"].astype(np.float64)
+        per_doc = s["wall"] / np.maximum(docs, 1)
+        order = np.argsort(per_doc)
+        weights = np.cumsum(np.maximum(docs, 1)[order])
+        wall, cpu = int(s["wall"].sum()), int(s["cpu"].sum())
+
+        def _pct(q: float) -> float:
+            i = np.searchsorted(weights, q * weights[-1])
+            return float(per_doc[order[min(i, len(order) - 1)]]) / 1e6
+
+        rows.append({"stage": stage, "name": name, "docs": int(docs.sum()),
+                     "spans": len(s), "batch": float(s["batch"].mean()),
+                     "p50_ms": _pct(.50), "p95_ms": _pct(.95),
+                     "p99_ms": _pct(.99), "wall_s": wall / 1e9,
+                     "cpu_s": cpu / 1e9, "share": wall / total,
+                     "chars": int(s["chars"].sum()),
+                     "tokens": int(s["tokens"].sum())})
+    rows.sort(key=lambda r: r["wall_s"], reverse=True)
+    return rows
+
+
+def format_summary(rows: List[dict]) -> str:
+    lines = [f"{'stage':<7} {'name':<36} {'docs':>9} {'batch':>6} "
+             f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'total s':>9} "
+             f"{'cpu %':>6} {'share':>6}"]
+    for r in rows:
+        lines.append(
+            f"{r['stage']:<7} {r['name'][:36]:<36} {r['docs']:>9} "
+            f"{r['batch']:>6.1f} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} "
+            f"{r['p99_ms']:>9.3f} {r['wall_s']:>9.2f} "
+            f"{100 * r['cpu_s'] / r['wall_s'] if r['wall_s'] else 0:>6.0f} "
+            f"{100 * r['share']:>5.1f}%")
+    return "\n".join(lines)
@@ -1,15 +1,27 @@
 # src/abms/utilities/net_retry.py  – patch
+#
+# Installed on first model load (see abms.registry), not on `import abms`:
+# huggingface_hub, requests and urllib3 are only imported by install().
 from __future__ import annotations
 import functools, logging, time, socket
-from typing import Callable, Any
+from typing import Callable, Any, Tuple, Type
 
-import huggingface_hub as _hf
-from huggingface_hub import file_download as _fd
-from urllib3.exceptions import NewConnectionError, MaxRetryError, NameResolutionError
-from requests.exceptions import ConnectionError
+
+def _network_errors() -> Tuple[Type[BaseException], ...]:
+    from urllib3.exceptions import NewConnectionError, MaxRetryError, NameResolutionError
+    from requests.exceptions import ConnectionError
+    return (
+        ConnectionError,
+        NewConnectionError,
+        MaxRetryError,
+        NameResolutionError,
+        socket.gaierror,
+    )
 
 
 def _retry_until_online(wait: int = 60) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    errors = _network_errors()
+
     def deco(func: Callable[..., Any]) -> Callable[..., Any]:
         @functools.wraps(func)
         def wrapper(*a, **kw):  # type: ignore[override]
@@ -17,13 +29,7 @@ def _retry_until_online(wait: int = 60) -> Callable[[Callable[..., Any]], Callab
             while True:
                 try:
                     return func(*a, **kw)
-                except (
-                    ConnectionError,
-                    NewConnectionError,
-                    MaxRetryError,
-                    NameResolutionError,
-                    socket.gaierror,
-                ) as exc:
+                except errors as exc:
                     logging.warning(
                         "[ABMS] Internet unreachable while downloading HF asset "
                         f"(attempt {attempt}): {exc}. Sleeping %ss.", wait
@@ -42,8 +48,13 @@ def _patch(obj, name: str, wait: int) -> None:
 def install(wait: int = 60) -> None:
     """
     Wrap *any* hf-hub download entry-points that exist in the installed
-    version.  Safe to call multiple times.
+    version.  Safe to call multiple times.  Call it before transformers /
+    sentence-transformers are imported: they bind the download functions
+    at import time.
     """
+    import huggingface_hub as _hf
+    from huggingface_hub import file_download as _fd
+
     if getattr(_fd, "_abms_retry_installed", False):
         return
 
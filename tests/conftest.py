@@ -0,0 +1,78 @@
+"""Shared fixtures: stand-ins for en_core_web_sm and Hugging Face models,
+so engine tests run without downloading anything."""
+import types
+
+import pytest
+
+
+class StubNLP:
+    """en_core_web_sm restricted to `keep`, faked with a blank English
+    pipeline.  Its "parser" ends sentences at . and ?, its "senter" also
+    at !, so tests can tell whose boundaries a module got.  Counts the
+    documents processed one at a time (`calls`) and through `pipe`."""
+
+    def __init__(self, keep):
+        import spacy
+
+        self.keep = keep
+        self.nlp = spacy.blank("en")
+        if "parser" in keep:
+            punct = [".", "?"]
+        elif "senter" in keep:
+            punct = [".", "?", "!"]
+        else:
+            punct = None
+        if punct:
+            self.nlp.add_pipe("sentencizer", config={"punct_chars": punct})
+        self.pipe_names = sorted(keep)
+        self.calls = self.piped = 0
+        self.batch_sizes = []
+
+    def __call__(self, text):
+        self.calls += 1
+        return self.nlp(text)
+
+    def pipe(self, texts, batch_size=256, n_process=1):
+        self.batch_sizes.append(batch_size)
+        for doc in self.nlp.pipe(texts, batch_size=batch_size):
+            self.piped += 1
+            yield doc
+
+
+@pytest.fixture
+def stub_spacy(monkeypatch):
+    """Replace the en_core_web_sm loader; returns {components: StubNLP}."""
+    from abms.publisher.analysis_modules import context
+
+    loaded = {}
+
+    def load(keep):
+        if keep not in loaded:
+            loaded[keep] = StubNLP(keep)
+        return loaded[keep]
+
+    monkeypatch.setattr(context, "_load", load)
+    return loaded
+
+
+@pytest.fixture
+def stub_models(monkeypatch):
+    """Registry handles that "load" a placeholder instead of downloading
+    weights; returns the list of (checkpoint, task) keys loaded."""
+    from abms import registry
+
+    loads = []
+
+    def _load(handle):
+        if handle._model is None:
+            loads.append(handle.key)
+            handle._model = types.SimpleNamespace(name=handle.checkpoint)
+
+    def pipeline(handle):
+        handle._load()
+        return handle._model
+
+    monkeypatch.setattr(registry, "_HANDLES", {})
+    monkeypatch.setattr(registry.ModelHandle, "_load", _load)
+    monkeypatch.setattr(registry.ModelHandle, "pipeline", property(pipeline))
+    return loads
@@ -0,0 +1,109 @@
+"""Persistent aspect result cache (abms.aspect_cache)."""
+import json
+import shutil
+
+import pytest
+
+from abms.aspect_cache import AspectCache, data_hash, fingerprint, module_name
+from abms.encoder import encode_file
+from abms.publisher.analysis_modules import base_pov
+from abms.publisher.analysis_modules.base_pov import BasePOV
+
+
+class Counting(BasePOV):
+    def __init__(self, text=None):
+        super().__init__(text)
+        self.seen = []
+
+    def analyze_batch(self, texts, contexts=None):
+        self.seen.extend(texts)
+        return [{"length": float(len(t))} if t else {} for t in texts]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    c = AspectCache(tmp_path / "aspects.sqlite")
+    yield c
+    c.close()
+
+
+def test_hits_skip_the_module(cache):
+    an = Counting()
+    assert cache.run(an, ["a", "bb"]) == [{"length": 1.0}, {"length": 2.0}]
+    assert cache.run(an, ["bb", "ccc", "a"]) == [
+        {"length": 2.0}, {"length": 3.0}, {"length": 1.0}]
+    assert an.seen == ["a", "bb", "ccc"]
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 3
+
+
+def test_failed_results_are_not_stored(cache):
+    an = Counting()
+    cache.run(an, [""])
+    cache.run(an, [""])
+    assert an.seen == ["", ""]
+
+
+def test_results_survive_a_new_connection(cache):
+    cache.run(Counting(), ["persist"])
+    again = AspectCache(cache.path)
+    an = Counting()
+    assert again.run(an, ["persist"]) == [{"length": 7.0}]
+    assert an.seen == []
+    again.close()
+
+
+def test_fingerprint_follows_models_and_base_pov(tmp_path, monkeypatch):
+    class A(BasePOV):
+        models = (("m1", "text-classification"),)
+
+    class B(BasePOV):
+        models = (("m2", "text-classification"),)
+
+    assert fingerprint(A) != fingerprint(B)
+    before = fingerprint(A)
+    edited = tmp_path / "base_pov.py"
+    shutil.copy(base_pov.__file__, edited)
+    with edited.open("a") as fh:
+        fh.write("\n# changed\n")
+    monkeypatch.setattr(base_pov, "__file__", str(edited))
+    fingerprint.cache_clear()
+    try:
+        assert fingerprint(A) != before
+    finally:
+        fingerprint.cache_clear()
+
+
+def test_invalidate_stale_drops_old_fingerprints(cache):
+    an = Counting()
+    name, h = module_name(an), data_hash("x")
+    cache.put_many(name, "old-version", [(h, {"length": 9.0})])
+    cache.put_many("other_module", "old-version", [(h, {"length": 9.0})])
+    cache.run(an, ["x"])
+    assert an.seen == ["x"]                       # old rows never hit
+    assert cache.invalidate_stale([an]) == 1
+    assert cache.get_many("other_module", "old-version", [h])
+    assert cache.get_many(name, fingerprint(Counting), [h])
+
+
+def test_lru_eviction_keeps_recent_rows(cache):
+    blob = {"pad": "x" * 400}
+    cache.put_many("m", "f", [(str(i), blob) for i in range(10)])
+    cache.get_many("m", "f", ["0"])               # touch the oldest row
+    cache.max_bytes = 3000
+    cache.put_many("m", "f", [("10", blob)])
+    kept = cache.get_many("m", "f", [str(i) for i in range(11)])
+    assert cache.stats()["bytes"] <= 0.9 * 3000
+    assert "0" in kept and "10" in kept
+    assert "1" not in kept and len(kept) < 11
+
+
+def test_encoder_reuses_cached_results(tmp_path, cache):
+    src = tmp_path / "in.jsonl"
+    src.write_text("".join(json.dumps({"id": i, "text": f"{i % 3} apples"})
+                           + "\n" for i in range(12)))
+    first, second = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+    encode_file(src, first, aspects=["quantitative_analysis"], cache=cache)
+    hits = cache.hits
+    encode_file(src, second, aspects=["quantitative_analysis"], cache=cache)
+    assert cache.hits - hits == 12
+    assert first.read_bytes() == second.read_bytes()
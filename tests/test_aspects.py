@@ -0,0 +1,60 @@
+"""Aspect selection: --aspects / --exclude and lazy module imports."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from abms.encoder import available_aspects, select_aspects
+from abms.publisher.analysis_modules import ASPECTS
+
+
+def test_available_aspects_are_the_registered_ones():
+    assert available_aspects() == sorted(ASPECTS)
+
+
+def test_select_keeps_output_key_order():
+    assert select_aspects(["readability_analysis", "genre_analysis",
+                           "genre_analysis"]) == [
+        "genre_analysis", "readability_analysis"]
+    assert select_aspects() == available_aspects()
+
+
+def test_exclude_drops_from_the_selection():
+    assert select_aspects(exclude=["genre_analysis"]) == [
+        n for n in available_aspects() if n != "genre_analysis"]
+    assert select_aspects(["genre_analysis", "humor_analysis"],
+                          ["humor_analysis"]) == ["genre_analysis"]
+    assert select_aspects([]) == []
+
+
+@pytest.mark.parametrize("aspects, exclude", [(["genre"], None),
+                                              (None, ["nope_analysis"])])
+def test_unknown_names_are_rejected(aspects, exclude):
+    with pytest.raises(ValueError, match="unknown aspect"):
+        select_aspects(aspects, exclude)
+
+
+def test_cli_rejects_unknown_aspects(tmp_path, capsys):
+    from abms.cli import _cmd_encode
+
+    src = tmp_path / "in.jsonl"
+    src.write_text('{"text": "x"}\n')
+    with pytest.raises(SystemExit) as exc:
+        _cmd_encode([str(src), "--aspects", "quantitative_analysis, genre"])
+    assert exc.value.code == 2
+    assert "'genre'" in capsys.readouterr().err
+    assert not (tmp_path / "in.tags.jsonl").exists()
+
+
+def test_unselected_modules_are_never_imported():
+    code = ("import sys\n"
+            "from abms.encoder import _load_analysers\n"
+            "_load_analysers(['quantitative_analysis'])\n"
+            "pkg = 'abms.publisher.analysis_modules.'\n"
+            "print(sorted(m[len(pkg):] for m in sys.modules"
+            " if m.startswith(pkg)))\n")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                         text=True, check=True, env=env).stdout
+    assert eval(out) == ["base_pov", "context", "quantitative_analysis"]
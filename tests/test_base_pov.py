@@ -0,0 +1,83 @@
+"""BasePOV lifecycle: one-time setup, batch analysis, one-shot use."""
+import json
+
+from abms import registry
+from abms.encoder import encode_file
+from abms.publisher.analysis_modules.base_pov import BasePOV
+from abms.publisher.analysis_modules.context import AnalysisContext
+from abms.publisher.analysis_modules.quantitative_analysis import (
+    QuantitativeAnalysis)
+
+
+class Echo(BasePOV):
+    def analyze(self):
+        return {"echo": len(self.text), "same_ctx": self.context.text == self.text}
+
+
+class Modelled(BasePOV):
+    models = (("stub/classifier", "text-classification"),)
+
+
+def test_default_analyze_batch_loops_in_order():
+    texts = ["a", "bbb", "cc"]
+    ctxs = [AnalysisContext(t) for t in texts]
+    assert Echo().analyze_batch(texts, ctxs) == [
+        {"echo": 1, "same_ctx": True}, {"echo": 3, "same_ctx": True},
+        {"echo": 2, "same_ctx": True}]
+
+
+def test_one_shot_form_still_works():
+    an = Echo("four")
+    an.context = AnalysisContext("four")
+    assert an.analyze() == {"echo": 4, "same_ctx": True}
+
+
+def test_setup_loads_once_and_close_releases(stub_models):
+    a, b = Modelled(), Modelled()
+    a.setup().setup()                    # safe to call twice
+    b.setup()
+    assert stub_models == [("stub/classifier", "text-classification")]
+    assert a.pipeline() is b.pipeline()
+    assert [s["refs"] for s in registry.stats()] == [2]
+    a.close()
+    a.close()                            # idempotent
+    assert [s["refs"] for s in registry.stats()] == [1]
+    b.close()
+    assert registry.stats() == []
+
+
+def test_output_types():
+    class Labelled(BasePOV):
+        outputs = {"genre": str, "genre_confidence": float}
+
+    assert Echo.output_types() == {"test_base_pov": float}
+    assert Labelled.output_types() == {"genre": str, "genre_confidence": float}
+
+
+def test_encoder_keeps_one_warmed_instance(tmp_path, monkeypatch):
+    made, setups, batches = [], [], []
+    init, setup = QuantitativeAnalysis.__init__, QuantitativeAnalysis.setup
+    batch = QuantitativeAnalysis.analyze_batch
+
+    def counting_init(self, *a, **kw):
+        made.append(self)
+        init(self, *a, **kw)
+
+    def counting_setup(self):
+        setups.append(self)
+        return setup(self)
+
+    def counting_batch(self, texts, contexts=None):
+        batches.append(len(texts))
+        return batch(self, texts, contexts)
+
+    monkeypatch.setattr(QuantitativeAnalysis, "__init__", counting_init)
+    monkeypatch.setattr(QuantitativeAnalysis, "setup", counting_setup)
+    monkeypatch.setattr(QuantitativeAnalysis, "analyze_batch", counting_batch)
+    src = tmp_path / "in.jsonl"
+    src.write_text("".join(json.dumps({"id": i, "text": f"{i} apples"}) + "\n"
+                           for i in range(40)))
+    encode_file(src, tmp_path / "out.jsonl", aspects=["quantitative_analysis"],
+                batch_size=8)
+    assert len(made) == 1 and setups == made
+    assert sum(batches) == 40 and max(batches) == 8
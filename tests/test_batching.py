@@ -0,0 +1,118 @@
+"""Micro-batching, length buckets and batch counters (abms.batching)."""
+import threading
+import time
+
+import pytest
+
+from abms.batching import (BatchStats, PaddingStats, length_buckets,
+                           micro_batches)
+
+
+# ── micro_batches ────────────────────────────────────────────────────
+def test_batches_keep_input_order_and_size():
+    batches = list(micro_batches(range(23), 5, max_wait=1.0))
+    assert [x for b in batches for x in b] == list(range(23))
+    assert all(len(b) <= 5 for b in batches)
+    assert sum(len(b) == 5 for b in batches) >= 4
+
+
+def test_empty_source_yields_nothing():
+    assert list(micro_batches([], 4)) == []
+
+
+def test_a_slow_source_flushes_after_max_wait():
+    gate = threading.Event()
+
+    def source():
+        yield from (1, 2)
+        gate.wait(5)                     # the rest arrives much later
+        yield 3
+
+    batches = micro_batches(source(), 10, max_wait=0.05)
+    t0 = time.monotonic()
+    assert next(batches) == [1, 2]       # not held back for a full batch
+    assert time.monotonic() - t0 < 2
+    gate.set()
+    assert list(batches) == [[3]]
+
+
+def test_without_max_wait_batches_depend_on_the_input_only():
+    def source():
+        for i in range(7):
+            time.sleep(0.02)
+            yield i
+
+    assert list(micro_batches(source(), 3, max_wait=None)) == [
+        [0, 1, 2], [3, 4, 5], [6]]
+    # aligned with batches of an earlier part of the stream
+    assert list(micro_batches(range(5, 12), 4, max_wait=None, first=3)) == [
+        [5, 6, 7], [8, 9, 10, 11]]
+
+
+def test_source_errors_reach_the_consumer():
+    def source():
+        yield from range(3)
+        raise ValueError("bad record")
+
+    batches = micro_batches(source(), 2, max_wait=1.0)
+    assert next(batches) == [0, 1]
+    with pytest.raises(ValueError, match="bad record"):
+        list(batches)
+
+
+def test_feeder_stops_when_the_consumer_leaves():
+    fed = []
+
+    def source():
+        for i in range(10_000):
+            fed.append(i)
+            yield i
+
+    batches = micro_batches(source(), 2, prefetch=4)
+    assert next(batches) == [0, 1]
+    batches.close()
+    time.sleep(0.3)
+    assert len(fed) < 20                 # bounded by the queue, not the input
+
+
+# ── length buckets / padding ─────────────────────────────────────────
+def test_length_buckets_group_similar_lengths():
+    lengths = [50, 3, 48, 4, 51, 2]
+    buckets = length_buckets(lengths, 3)
+    assert buckets == [[5, 1, 3], [2, 0, 4]]
+    assert sorted(i for b in buckets for i in b) == list(range(6))
+    assert length_buckets([], 4) == []
+    assert length_buckets([1, 2], 0) == [[0], [1]]
+
+
+def test_padding_stats_against_input_order():
+    lengths = [50, 3, 48, 4, 51, 2]
+    stats = PaddingStats()
+    for b in length_buckets(lengths, 3):
+        stats.record([lengths[i] for i in b])
+    for a in range(0, 6, 3):
+        stats.record_baseline(lengths[a:a + 3])
+    assert stats.real == 158
+    assert stats.padded == 3 * 4 + 3 * 51
+    assert stats.baseline_padded == 3 * 50 + 3 * 51
+    assert stats.efficiency == pytest.approx(158 / 165)
+    assert stats.baseline_efficiency == pytest.approx(158 / 303)
+    other = PaddingStats()
+    other.merge(stats)
+    other.merge(stats)
+    assert (other.real, other.padded) == (316, 330)
+    assert PaddingStats().efficiency == 1.0
+
+
+def test_batch_stats_fill_and_merge():
+    stats = BatchStats(capacity=8)
+    stats.record("m", 8, 0.5)
+    stats.record("m", 4, 0.5)
+    stats.error("m", 2)
+    assert stats.fill_ratio("m") == 0.75
+    assert stats.docs_per_sec("m") == 12.0
+    total = BatchStats(capacity=8)
+    total.merge(stats)
+    total.merge(stats)
+    assert (total.batches["m"], total.docs["m"], total.errors["m"]) == (4, 24, 4)
+    assert total.fill_ratio("other") == 0.0
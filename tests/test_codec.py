@@ -0,0 +1,74 @@
+"""abms.codec against the stdlib json module."""
+import json
+import math
+
+import pytest
+
+from abms import codec
+
+RECORDS = [
+    {"id": 7, "text": "plain", "aspects": {"genre_analysis": "news",
+                                           "humor_analysis": 0.125}},
+    {"id": "doc-1", "text": "naïve café – “quotes”   😀", "aspects": {}},
+    {"id": 12345678901234567890123, "text": "big id"},
+    {"nested": [1, 2.5, -0.0, 1e-7, 1e21, True, None, {"k": ["v"]}]},
+    {"ctl": "tab\tnew\nline\\\"q\"\x00"},
+]
+
+
+@pytest.mark.parametrize("obj", RECORDS)
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_dumps_is_byte_identical_to_json(obj, ensure_ascii):
+    assert codec.dumps(obj, ensure_ascii=ensure_ascii) == json.dumps(
+        obj, ensure_ascii=ensure_ascii)
+
+
+@pytest.mark.parametrize("obj", RECORDS)
+def test_compact_dumps_round_trips(obj):
+    line = codec.dumps(obj, compact=True)
+    assert "\n" not in line
+    assert json.loads(line) == obj
+
+
+@pytest.mark.skipif(codec.BACKEND == "json", reason="no fast encoder")
+def test_compact_writes_non_finite_floats_as_null():
+    line = codec.dumps({"a": math.nan, "b": math.inf}, compact=True)
+    assert json.loads(line) == {"a": None, "b": None}
+
+
+def test_default_hook_is_used_both_ways():
+    np = pytest.importorskip("numpy")
+    obj = {"x": np.float32(0.5), "n": np.int64(3)}
+    hook = lambda v: v.item()            # noqa: E731
+    assert codec.dumps(obj, default=hook) == json.dumps(obj, default=hook)
+    assert json.loads(codec.dumps(obj, compact=True, default=hook)) == {
+        "x": 0.5, "n": 3}
+
+
+@pytest.mark.parametrize("line", [
+    b'{"id": 1, "text": "x"}',
+    '{"b": 1, "a": 2}',
+    b'{"id": 123456789012345678901234567890}',
+    b'{"v": NaN, "w": -Infinity}',
+    '"naïve"'.encode("utf-8"),
+])
+def test_loads_matches_json(line):
+    expected = json.loads(line)
+    got = codec.loads(line)
+    assert repr(got) == repr(expected)
+    if isinstance(got, dict):
+        assert list(got) == list(expected)
+
+
+@pytest.mark.parametrize("line", [b'{"id": 1', b"", b"[1,]"])
+def test_loads_raises_json_errors(line):
+    with pytest.raises(json.JSONDecodeError):
+        codec.loads(line)
+
+
+def test_decode_tagged():
+    rec = codec.decode_tagged(b'{"id": "a", "text": "t", "extra": [1], '
+                              b'"aspects": {"x": 1, "y": "s"}}')
+    assert (rec.id, rec.text, rec.aspects) == ("a", "t", {"x": 1.0, "y": "s"})
+    with pytest.raises(ValueError):
+        codec.decode_tagged(b'{"aspects": {"x": [1]}}')
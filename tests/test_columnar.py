@@ -0,0 +1,98 @@
+"""Parquet output (abms.columnar)."""
+import hashlib
+import json
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from abms import columnar                                     # noqa: E402
+from abms.encoder import encode_file                          # noqa: E402
+from abms.publisher.analysis_modules.base_pov import BasePOV  # noqa: E402
+from abms.writer import Checkpoint                            # noqa: E402
+
+
+class Genre(BasePOV):
+    outputs = {"genre": str, "genre_confidence": float}
+
+
+class Score(BasePOV):
+    pass
+
+
+@pytest.fixture
+def schema():
+    return columnar.schema_for([Genre(), Score()])
+
+
+def test_schema_has_one_typed_column_per_result_key(schema):
+    assert schema.names == ["id", "text", "data_hash", "genre",
+                            "genre_confidence", "test_columnar", "record"]
+    assert schema.field("data_hash").type == pa.binary(32)
+    assert pa.types.is_dictionary(schema.field("genre").type)
+    assert schema.field("test_columnar").type == pa.float64()
+    assert json.loads(schema.metadata[b"abms.aspects"]) == {
+        "genre": "category", "genre_confidence": "float",
+        "test_columnar": "float"}
+
+
+def test_to_table(schema, caplog):
+    import numpy as np
+
+    records = [{"id": 7, "text": "hi", "lang": "en",
+                "aspects": {"genre": "news", "genre_confidence": np.float32(.5),
+                            "test_columnar": 2}},
+               {"text": "", "aspects": {"genre_confidence": "n/a"}}]
+    rows = columnar.to_table(records, schema).to_pylist()
+    assert rows[0] == {"id": "7", "text": "hi",
+                       "data_hash": hashlib.sha256(b"hi").digest(),
+                       "genre": "news", "genre_confidence": 0.5,
+                       "test_columnar": 2.0, "record": '{"lang":"en"}'}
+    assert rows[1]["id"] is None and rows[1]["record"] is None
+    assert rows[1]["genre"] is rows[1]["genre_confidence"] is None
+    assert "not a number" in caplog.text
+
+
+def test_writer_commits_parts_and_resumes(tmp_path, schema):
+    out = tmp_path / "x.tags.parquet"
+    rec = {"text": "a", "aspects": {}}
+    with columnar.ParquetWriter(out, schema, "every-2",
+                                checkpoint=Checkpoint(input="in.jsonl")) as w:
+        w.write([rec, rec], in_offset=20)
+        w.write([rec], in_offset=30)              # committed on close
+    assert [p.name for p in sorted(out.iterdir())] == [
+        "part-000000.parquet", "part-000001.parquet"]
+    assert columnar.resume_point(tmp_path / "in.jsonl", out) == (3, 30)
+    # another input: the caller has to count lines
+    assert columnar.resume_point(tmp_path / "other.jsonl", out) == (3, None)
+    assert columnar.resume_point(tmp_path / "in.jsonl",
+                                 tmp_path / "none.parquet") == (0, 0)
+    with pytest.raises(ValueError, match="other columns"):
+        columnar.ParquetWriter(out, columnar.schema_for([Score()]))
+
+
+def test_check_target():
+    with pytest.raises(ValueError):
+        columnar.check_target("-")
+    with pytest.raises(ValueError):
+        columnar.check_target("x.tags.parquet.zst")
+
+
+def test_encode_resumes_a_dataset(tmp_path):
+    src = tmp_path / "in.jsonl"
+    src.write_text("".join(json.dumps({"id": i, "text": f"{i} apples"})
+                           + "\n" for i in range(30)))
+    full, part = tmp_path / "full.tags.parquet", tmp_path / "cut.tags.parquet"
+    kw = dict(aspects=["quantitative_analysis"], window=4, batch_size=4,
+              fsync="every-8")
+    encode_file(src, full, **kw)
+    encode_file(src, part, **kw)
+    parts = sorted(part.glob("part-*.parquet"))
+    assert len(parts) > 2
+    for p in parts[2:]:                           # a crash after two commits
+        p.unlink()
+    encode_file(src, part, **kw)
+    assert pq.read_table(part).equals(pq.read_table(full))
+    assert pq.read_table(full).column("id").to_pylist() == [
+        str(i) for i in range(30)]
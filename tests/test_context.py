@@ -0,0 +1,149 @@
+"""Shared per-document spaCy parse (abms.publisher.analysis_modules.context)."""
+import json
+import logging
+
+from abms import encoder
+from abms.encoder import _analyse_batch, encode_file
+from abms.publisher.analysis_modules.base_pov import BasePOV
+from abms.publisher.analysis_modules.context import (AnalysisContext,
+                                                     components_for,
+                                                     needs_senter_pass,
+                                                     resolve_components)
+from abms.publisher.analysis_modules.controversiality_analysis import (
+    ControversialityAnalysis)
+from abms.publisher.analysis_modules.interactivity_analysis import (
+    InteractivityAnalysis)
+from abms.publisher.analysis_modules.lexical_diversity_analysis import (
+    LexicalDiversityAnalysis)
+
+TEXTS = ["Do you like it? Sign up now. It is great.",
+         "Plain words, plain words, more words.",
+         "Why? Because you can."]
+
+
+# ── one parse per document ───────────────────────────────────────────
+def test_context_parses_lazily_and_once(stub_spacy):
+    ctx = AnalysisContext(TEXTS[0], components={"senter"})
+    assert ctx.parse_count == 0
+    doc = ctx.doc
+    assert ctx.doc is doc and ctx.parse_count == 1
+    assert ctx.sentences == ["Do you like it?", "Sign up now.", "It is great."]
+    assert ctx.tokens[:3] == ["Do", "you", "like"]
+    assert sum(nlp.calls for nlp in stub_spacy.values()) == 1
+
+
+def test_a_doc_handed_in_counts_as_its_parse(stub_spacy):
+    doc = AnalysisContext(TEXTS[0], components={"senter"}).doc
+    ctx = AnalysisContext(TEXTS[0], doc=doc, components={"senter"})
+    assert ctx.doc is doc and ctx.parse_count == 1
+
+
+def test_modules_share_each_documents_parse(stub_spacy):
+    analysers = [InteractivityAnalysis(), LexicalDiversityAnalysis()]
+    components = components_for(analysers)
+    ctxs = [AnalysisContext(t, components=components) for t in TEXTS]
+    rows = _analyse_batch(ctxs, analysers)
+    assert [sorted(r) for r in rows] == [
+        ["interactivity_analysis", "lexical_diversity_analysis"]] * 3
+    assert [ctx.parse_count for ctx in ctxs] == [1, 1, 1]
+    assert stub_spacy[components].calls == 3
+    # the same numbers as modules parsing for themselves
+    for text, row in zip(TEXTS, rows):
+        assert row["interactivity_analysis"] == \
+            InteractivityAnalysis(text).analyze()["interactivity_analysis"]
+
+
+# ── controversiality over the shared sentences ───────────────────────
+class _Sentiment:
+    """Stars by keyword; raises on sentences containing BAD, as the real
+    pipeline does on over-length input."""
+
+    def __call__(self, inputs, batch_size=None):
+        if isinstance(inputs, str):
+            if "BAD" in inputs:
+                raise ValueError("sequence too long")
+            return [{"label": "5 stars" if "love" in inputs else "1 star"}]
+        return [self(s)[0] for s in inputs]
+
+
+class _Controversiality(ControversialityAnalysis):
+    classifier = _Sentiment()
+
+
+def test_one_bad_sentence_only_loses_its_own_score(stub_spacy):
+    texts = ["I love this so much. I hate all of it!",
+             "I love this so much. I hate all of it! BAD sentence, skip it."]
+    ctxs = [AnalysisContext(t, components={"senter"}) for t in texts]
+    good, partial = _Controversiality().analyze_batch(texts, ctxs)
+    assert good == partial
+    assert good["controversiality_analysis"] > 0
+
+
+# ── component selection ──────────────────────────────────────────────
+def test_resolve_components_closes_over_dependencies():
+    assert resolve_components({"lemmatizer"}) == {
+        "lemmatizer", "attribute_ruler", "tagger", "tok2vec"}
+    assert resolve_components({"senter"}) == {"senter"}
+    assert resolve_components(set()) == frozenset()
+    # the parser sets sentence starts, the senter is dropped
+    assert resolve_components({"senter", "parser"}) == {"parser", "tok2vec"}
+
+
+class _SenterProbe(BasePOV):
+    uses_doc = True
+    spacy_components = frozenset({"senter"})
+
+    def analyze(self):
+        return {"senter_sents": float(len(self.sentences))}
+
+
+class _ParserProbe(BasePOV):
+    uses_doc = True
+    spacy_components = frozenset({"parser"})
+
+    def analyze(self):
+        return {"parser_sents": float(len(self.sentences))}
+
+
+class _TokenProbe(BasePOV):
+    def analyze(self):
+        return {"chars": float(len(self.text))}
+
+
+def test_components_for_unions_the_doc_users():
+    analysers = [_SenterProbe(), _ParserProbe(), _TokenProbe()]
+    assert components_for(analysers) == {"parser", "tok2vec"}
+    assert needs_senter_pass(analysers)
+    assert components_for([_SenterProbe()]) == {"senter"}
+    assert not needs_senter_pass([_SenterProbe()])
+    assert not needs_senter_pass([_ParserProbe(), _TokenProbe()])
+
+
+def test_mixed_selection_parses_each_document_once(tmp_path, monkeypatch,
+                                                   stub_spacy, caplog):
+    analysers = [_SenterProbe(), _ParserProbe()]
+    monkeypatch.setattr(encoder, "_load_analysers", lambda *a: analysers)
+    src, out = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    texts = ["Stop! Look. Go?", "One. Two! Three."] * 10
+    src.write_text("".join(json.dumps({"id": i, "text": t}) + "\n"
+                           for i, t in enumerate(texts)))
+    with caplog.at_level(logging.INFO):
+        encode_file(src, out, nlp_batch_size=4, batch_size=8)
+    assert "spaCy parses: 20 for 20 docs (1.00 per doc)" in caplog.text
+    # both passes batched through nlp.pipe, no per-document calls
+    shared, senter = stub_spacy[frozenset({"parser", "tok2vec"})], \
+        stub_spacy[frozenset({"senter"})]
+    assert shared.piped == senter.piped == 20
+    assert shared.calls == senter.calls == 0
+    # each module kept its own boundaries
+    rows = [json.loads(line)["aspects"]
+            for line in out.read_text().splitlines()]
+    assert [r["senter_sents"] for r in rows[:2]] == [3.0, 3.0]
+    assert [r["parser_sents"] for r in rows[:2]] == [2.0, 2.0]
+
+
+def test_senter_boundaries_without_the_engine(stub_spacy):
+    ctx = AnalysisContext("Stop! Look. Go?", components={"parser"})
+    assert ctx.sentence_texts("senter") == ["Stop!", "Look.", "Go?"]
+    assert ctx.sentences == ["Stop! Look.", "Go?"]
+    assert ctx.parse_count == 1
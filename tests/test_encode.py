@@ -0,0 +1,119 @@
+"""End-to-end encodes with a model-free aspect (quantitative_analysis)."""
+import itertools
+import json
+
+import pytest
+
+from abms import encoder, line_index
+from abms.encoder import encode_file
+from abms.publisher.analysis_modules.base_pov import BasePOV
+
+ASPECTS = ["quantitative_analysis"]
+TEXTS = ["We must buy 3 apples and 42 pears.", "No numbers here at all.",
+         "Revenue grew 23.7% to $4.2 million in Q1 2024.", ""]
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    fp = tmp_path / "in.jsonl"
+    with fp.open("w") as fh:
+        for i in range(120):
+            fh.write(json.dumps({"id": i, "text": TEXTS[i % 4] * (i % 5 + 1)})
+                     + "\n")
+    return fp
+
+
+@pytest.fixture
+def small_ranges(monkeypatch):
+    """Byte ranges (worker tasks, shards) down to 512 bytes."""
+    monkeypatch.setattr(encoder, "_CHUNK", 16 * 512)
+
+
+def _encode(src, out, **kw):
+    encode_file(src, out, aspects=ASPECTS, window=16, **kw)
+    return out.read_bytes()
+
+
+def test_workers_match_a_serial_run(corpus, tmp_path, small_ranges, caplog):
+    serial = _encode(corpus, tmp_path / "serial.jsonl")
+    assert serial.count(b"\n") == 120
+    with caplog.at_level("INFO"):
+        forked = _encode(corpus, tmp_path / "forked.jsonl", workers=2)
+    assert "Forking 2 workers" in caplog.text
+    assert "over 1 ranges" not in caplog.text
+    assert forked == serial
+
+
+class _BatchSensitive(BasePOV):
+    """Stands in for a padded transformer: scores depend on the batch."""
+
+    def analyze_batch(self, texts, contexts=None):
+        width = max(map(len, texts)) or 1
+        return [{"batch_sensitive": len(t) / width + len(texts)}
+                for t in texts]
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_window_ranges_cut_between_windows(corpus, small_ranges, indexed):
+    if indexed:
+        line_index.build(corpus)
+    starts = [0] + [len(line) for line in corpus.read_bytes().splitlines(True)]
+    starts = list(itertools.accumulate(starts))
+    ranges = encoder._window_ranges(corpus, starts[5], 5, 8, 16)
+    assert len(ranges) > 1
+    assert ranges[0][:1] == (starts[5],) and ranges[-1][1] == starts[-1]
+    for (a, b, rec), (c, _, _) in zip(ranges, ranges[1:]):
+        assert b == c and rec % 16 in (0, 5)
+        assert a == starts[rec]
+    assert all(rec % 16 == 0 for _, _, rec in ranges[1:])
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_workers_keep_the_serial_batches(corpus, tmp_path, small_ranges,
+                                         monkeypatch, indexed):
+    monkeypatch.setattr(encoder, "_load_analysers",
+                        lambda *a: [_BatchSensitive()])
+    if indexed:
+        line_index.build(corpus)
+
+    def run(name, **kw):
+        out = tmp_path / name
+        encode_file(corpus, out, batch_size=4, **kw)
+        return out.read_bytes()
+
+    serial = run("serial.jsonl", window=16)
+    assert run("forked.jsonl", window=16, workers=2) == serial
+    # the scores do depend on the grouping
+    assert run("other.jsonl", window=8) != serial
+
+
+# ── corpus runs ──────────────────────────────────────────────────────
+def test_sharded_corpus_merges_to_the_serial_output(corpus, tmp_path,
+                                                    small_ranges):
+    from abms.corpus import Manifest, encode_corpus
+
+    serial = _encode(corpus, tmp_path / "serial.jsonl")
+    out_dir, merged = tmp_path / "parts", tmp_path / "merged.jsonl"
+    manifest = encode_corpus([corpus], out_dir, shard_bytes=1024,
+                             merge_into=merged, aspects=ASPECTS, window=16)
+    assert len(manifest.shards) > 1
+    assert {s.status for s in manifest.shards} == {"done"}
+    assert sum(s.records for s in manifest.shards) == 120
+    assert merged.read_bytes() == serial
+
+    parts = {p: p.stat().st_mtime_ns for p in out_dir.glob("*.tags.jsonl")}
+    encode_corpus([corpus], out_dir, shard_bytes=1024, aspects=ASPECTS,
+                  window=16)                   # restart: nothing to redo
+    assert {p: p.stat().st_mtime_ns for p in parts} == parts
+    assert Manifest.load(out_dir).shards == manifest.shards
+
+
+def test_cli_rejects_fsync_with_out_dir(corpus, tmp_path, capsys):
+    from abms.cli import _cmd_encode
+
+    with pytest.raises(SystemExit) as exc:
+        _cmd_encode([str(corpus), "--out-dir", str(tmp_path / "parts"),
+                     "--fsync", "every-doc"])
+    assert exc.value.code == 2
+    assert "--fsync" in capsys.readouterr().err
+    assert not (tmp_path / "parts").exists()
@@ -0,0 +1,171 @@
+"""Admission control (abms.governor) without reading the machine."""
+import logging
+import threading
+
+import pytest
+
+from abms import governor as gov_mod
+from abms.governor import Gate, Governor
+
+
+def _pinned(scale: float) -> Governor:
+    """An inactive governor (no readings) held at `scale`."""
+    gov = Governor(interval=0.01)
+    gov.scale = scale
+    return gov
+
+
+def _acquire_in_thread(gate: Gate, n: int = 1):
+    done = threading.Event()
+
+    def run():
+        gate.acquire(n)
+        done.set()
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    return done, t
+
+
+# ── Gate ─────────────────────────────────────────────────────────────
+def test_gate_blocks_at_the_limit_until_release():
+    gate = Gate(_pinned(0.0), capacity=8, floor=2)     # limit: floor
+    gate.acquire(2)
+    done, t = _acquire_in_thread(gate)
+    assert not done.wait(0.1)
+    gate.release(1)
+    assert done.wait(1)
+    t.join()
+    assert gate.inflight == 2 and gate.waited > 0
+
+
+def test_gate_limit_follows_the_scale():
+    gov = _pinned(0.5)
+    gate = Gate(gov, capacity=10, floor=2)             # 2 + 8 * 0.5 = 6
+    gate.acquire(6)
+    done, t = _acquire_in_thread(gate)
+    assert not done.wait(0.05)
+    gov.scale = 1.0                                    # re-checked per interval
+    assert done.wait(1)
+    t.join()
+
+
+def test_gate_admits_an_oversized_request_when_empty():
+    gate = Gate(_pinned(0.0), capacity=4, floor=1)
+    gate.acquire(100)
+    assert gate.inflight == 100
+
+
+def test_gate_admits_after_a_stall(caplog):
+    gate = Gate(_pinned(0.0), capacity=4, floor=1, stall=0.1)
+    gate.acquire()
+    with caplog.at_level(logging.WARNING):
+        done, t = _acquire_in_thread(gate, 3)
+        assert done.wait(2)
+        t.join()
+    assert gate.inflight == 4 and gate.waited >= 0.1
+    assert "admitting 3 over the limit" in caplog.text
+
+
+def test_close_releases_waiters_and_admits_everything():
+    gate = Gate(_pinned(0.0), capacity=4, floor=1)
+    gate.acquire()
+    done, t = _acquire_in_thread(gate)
+    assert not done.wait(0.05)
+    gate.close()
+    assert done.wait(1)
+    t.join()
+    gate.acquire(50)
+    assert gate.inflight == 52
+
+
+def test_gate_context_manager_closes():
+    with Gate(_pinned(0.0), capacity=2) as gate:
+        gate.acquire()
+    gate.acquire(10)                                   # does not block
+    assert gate.inflight == 11
+
+
+# ── Governor ─────────────────────────────────────────────────────────
+@pytest.fixture
+def readings(monkeypatch):
+    """Fake process RSS and system memory share, read by `sample`."""
+    state = {"rss": 0, "memory": 0.0}
+    monkeypatch.setattr(gov_mod, "rss", lambda: state["rss"])
+    monkeypatch.setattr(gov_mod, "memory_in_use", lambda: state["memory"])
+    return state
+
+
+def _governor(**kw) -> Governor:
+    gov = Governor(interval=0.0, **kw)
+    gov._cpu = lambda: 0.0
+    return gov
+
+
+def test_rss_over_budget_halves_then_recovers(readings):
+    gov = _governor(rss_budget=1000)
+    readings["rss"] = 1500
+    assert gov.sample() == 0.5 and gov.sample() == 0.25
+    assert gov.events == {"rss": 2} and gov.reason.startswith("rss")
+    readings["rss"] = 950                              # under budget, over hold
+    assert gov.sample() == 0.25
+    readings["rss"] = 500
+    scales = [gov.sample() for _ in range(8)]
+    assert scales[0] == pytest.approx(0.35) and scales[-1] == 1.0
+    assert not gov.throttled and gov.status() == ""
+    assert gov.seconds_throttled() > 0
+
+
+def test_memory_target_uses_the_system_reading(readings):
+    gov = _governor(memory_target=0.7)
+    readings["memory"] = 0.8
+    assert gov.sample() == 0.5 and "memory 80% > target 70%" in gov.status()
+    readings["memory"] = 0.65                          # above 90% of target
+    assert gov.sample() == 0.5
+    readings["memory"] = 0.3
+    assert gov.sample() == pytest.approx(0.6)
+
+
+def test_cpu_over_target_cuts_by_a_quarter(readings):
+    gov = _governor(cpu_target=0.5)
+    gov._cpu = lambda: 0.9
+    assert gov.sample() == 0.75 and gov.events == {"cpu": 1}
+
+
+def test_batch_size_and_limit(readings):
+    gov = _pinned(0.25)
+    assert gov.batch_size(16) == 4 and gov.batch_size(1) == 1
+    assert gov.limit(100, floor=20) == 40
+    assert gov.limit(10, floor=50) == 10
+    assert not gov.active
+
+
+# ── wiring ───────────────────────────────────────────────────────────
+def test_cli_memory_target_is_a_percentage():
+    import argparse
+
+    from abms.cli import _add_engine_args, _engine_kwargs
+
+    p = argparse.ArgumentParser()
+    _add_engine_args(p)
+    kw = _engine_kwargs(p.parse_args(["--memory-target", "70",
+                                      "--cpu-target", "85"]))
+    assert kw["memory_target"] == 0.7 and kw["cpu_target"] == 0.85
+    assert _engine_kwargs(p.parse_args([]))["memory_target"] is None
+
+
+def test_encode_throttles_on_the_memory_target(tmp_path, readings, caplog):
+    import json
+
+    from abms.encoder import encode_file
+
+    readings["memory"] = 0.95
+    src, prom = tmp_path / "in.jsonl", tmp_path / "abms.prom"
+    src.write_text("".join(json.dumps({"text": f"{i} apples"}) + "\n"
+                           for i in range(20)))
+    encode_file(src, tmp_path / "out.jsonl", aspects=["quantitative_analysis"],
+                memory_target=0.7, metrics_file=prom)
+    assert "Throttling (memory 95% > target 70%)" in caplog.text
+    assert 'abms_governor_throttle_events_total{cause="memory"}' in \
+        prom.read_text()
+    assert (tmp_path / "out.jsonl").read_text().count("\n") == 20
@@ -0,0 +1,101 @@
+"""abms.line_index: offsets, id lookup and staleness."""
+import json
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from abms import line_index  # noqa: E402
+from abms.line_index import LineIndex, build, ensure, open_index  # noqa: E402
+
+
+def _jsonl(tmp_path, records, trailing_newline=True):
+    fp = tmp_path / "data.jsonl"
+    text = "\n".join(json.dumps(r) for r in records)
+    fp.write_text(text + ("\n" if trailing_newline else ""))
+    return fp
+
+
+@pytest.mark.parametrize("trailing_newline", [True, False])
+def test_lines_and_offsets(tmp_path, trailing_newline):
+    fp = _jsonl(tmp_path, [{"id": i} for i in range(3)], trailing_newline)
+    build(fp)
+    with LineIndex(fp) as idx:
+        assert len(idx) == 3
+        assert idx[0] == b'{"id": 0}\n'
+        assert idx[-1] == b'{"id": 2}' + (b"\n" if trailing_newline else b"")
+        assert list(idx) == fp.read_bytes().splitlines(keepends=True)
+        assert idx.line_at(idx.span(1)[0]) == 1
+        with pytest.raises(IndexError):
+            idx[3]
+
+
+def test_empty_file(tmp_path):
+    fp = tmp_path / "data.jsonl"
+    fp.write_bytes(b"")
+    build(fp, ids=True)
+    with LineIndex(fp) as idx:
+        assert len(idx) == 0 and idx.find_id("x") is None
+        assert idx.byte_ranges(0, 4) == []
+
+
+def test_find_id_types_and_duplicates(tmp_path):
+    fp = _jsonl(tmp_path, [{"id": 7}, {"id": "7"}, {"text": "no id"},
+                           {"id": "dup"}, {"id": "dup"}])
+    build(fp, ids=True)
+    with LineIndex(fp) as idx:
+        assert idx.find_id(7) == 0
+        assert idx.find_id("7") == 1
+        assert idx.find_id("dup") == 3          # first occurrence
+        assert idx.find_id("missing") is None
+
+
+def test_colliding_hashes_are_resolved_by_reading(tmp_path, monkeypatch):
+    monkeypatch.setattr(line_index, "id_key", lambda value: 42)
+    fp = _jsonl(tmp_path, [{"id": f"doc-{i}"} for i in range(5)])
+    build(fp, ids=True)
+    with LineIndex(fp) as idx:
+        assert [idx.find_id(f"doc-{i}") for i in range(5)] == list(range(5))
+        assert idx.find_id("doc-9") is None
+
+
+def test_find_id_needs_an_id_index(tmp_path):
+    fp = _jsonl(tmp_path, [{"id": 1}])
+    build(fp)
+    with LineIndex(fp) as idx, pytest.raises(ValueError):
+        idx.find_id(1)
+
+
+def test_stale_index_is_refused_and_rebuilt(tmp_path):
+    fp = _jsonl(tmp_path, [{"id": 1}, {"id": 2}])
+    build(fp, ids=True)
+    with fp.open("a") as fh:
+        fh.write('{"id": 3}\n')
+    with pytest.raises(ValueError, match="stale"):
+        LineIndex(fp)
+    assert open_index(fp) is None
+    with ensure(fp, ids=True) as idx:
+        assert len(idx) == 3 and idx.find_id(3) == 2
+
+
+def test_same_size_rewrite_is_stale(tmp_path):
+    fp = _jsonl(tmp_path, [{"id": 1}])
+    build(fp)
+    st = fp.stat()
+    fp.write_text('{"id": 2}\n')
+    os.utime(fp, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert open_index(fp) is None
+
+
+def test_byte_ranges_split_on_line_boundaries(tmp_path):
+    fp = _jsonl(tmp_path, [{"id": i, "text": "x" * (i % 7)}
+                           for i in range(100)])
+    build(fp)
+    with LineIndex(fp) as idx:
+        ranges = idx.byte_ranges(0, 4)
+        starts = set(idx.offsets)
+        assert ranges[0][0] == 0 and ranges[-1][1] == fp.stat().st_size
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        assert all(start in starts for start, _ in ranges)
+        assert 3 <= len(ranges) <= 5
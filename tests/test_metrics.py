@@ -0,0 +1,96 @@
+"""Live metrics in the Prometheus text format (abms.metrics)."""
+import json
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from abms.encoder import encode_file
+from abms.metrics import Exporter, MetricSet, Rate
+
+
+def _counter(n):
+    calls = []
+
+    def collect(m, final):
+        calls.append(final)
+        m.add("docs_total", n[0], kind="counter", help="documents encoded")
+        m.add("running", 0 if final else 1)
+
+    return collect, calls
+
+
+def test_render_text_format():
+    m = MetricSet()
+    m.add("queue_depth", 3, {"queue": "read"}, help="items in a queue")
+    m.add("queue_depth", 0.5, {"queue": 'a "b"\\c\n'})
+    m.add("ratio", 0.25)
+    assert m.render() == (
+        "# HELP abms_queue_depth items in a queue\n"
+        "# TYPE abms_queue_depth gauge\n"
+        'abms_queue_depth{queue="read"} 3\n'
+        'abms_queue_depth{queue="a \\"b\\"\\\\c\\n"} 0.5\n'
+        "# TYPE abms_ratio gauge\n"
+        "abms_ratio 0.25\n")
+
+
+def test_textfile_is_written_at_start_interval_and_end(tmp_path):
+    path, n = tmp_path / "abms.prom", [0]
+    collect, calls = _counter(n)
+    with Exporter(collect, path, interval=0.1):
+        assert "abms_docs_total 0" in path.read_text()
+        n[0] = 7
+        time.sleep(0.35)
+        assert "abms_docs_total 7" in path.read_text()
+    text = path.read_text()
+    assert "abms_running 0" in text and "# TYPE abms_docs_total counter" in text
+    assert calls[0] is False and calls[-1] is True
+    assert [p.name for p in tmp_path.iterdir()] == ["abms.prom"]
+
+
+def test_a_failing_collect_keeps_the_last_snapshot(tmp_path, caplog):
+    path, state = tmp_path / "abms.prom", {"fail": False}
+
+    def collect(m, final):
+        if state["fail"]:
+            raise RuntimeError("boom")
+        m.add("docs_total", 1, kind="counter")
+
+    exporter = Exporter(collect, path, interval=60)
+    state["fail"] = True
+    exporter.close()
+    assert "abms_docs_total 1" in path.read_text()
+    assert "Collecting metrics failed" in caplog.text
+
+
+def test_http_endpoint():
+    collect, _ = _counter([3])
+    with Exporter(collect, port=0, interval=60) as exporter:
+        url = f"http://127.0.0.1:{exporter.port}"
+        with urllib.request.urlopen(url + "/metrics") as resp:
+            assert resp.headers["Content-Type"].startswith("text/plain")
+            assert "abms_docs_total 3" in resp.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + "/other")
+
+
+def test_rate():
+    rate = Rate()
+    assert rate(10, now=1.0) == 0.0
+    assert rate(30, now=3.0) == 10.0
+    assert rate(30, now=3.0) == 0.0
+
+
+def test_encode_publishes_run_metrics(tmp_path):
+    src, prom = tmp_path / "in.jsonl", tmp_path / "abms.prom"
+    src.write_text("".join(json.dumps({"text": f"{i} apples"}) + "\n"
+                           for i in range(12)))
+    encode_file(src, tmp_path / "out.jsonl", aspects=["quantitative_analysis"],
+                metrics_file=prom)
+    text = prom.read_text()
+    for line in ("abms_running 0", "abms_docs_total 12",
+                 'abms_aspect_docs_total{aspect="quantitative_analysis"} 12',
+                 'abms_rss_bytes{process="main"}'):
+        assert line in text
+    assert "abms_governor_scale" not in text      # admission control off
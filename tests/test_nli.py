@@ -0,0 +1,112 @@
+"""Fused zero-shot NLI (abms.nli) against the transformers pipeline it
+replaces, on a tiny randomly initialised MNLI-style model built offline."""
+import json
+import types
+
+import pytest
+
+from abms import nli
+from abms.publisher.analysis_modules.ethical_considerations_analysis import (
+    EthicalConsiderationsAnalysis)
+from abms.publisher.analysis_modules.genre_analysis import GenreAnalysis
+from abms.publisher.analysis_modules.intentionality_analysis import (
+    IntentionalityAnalysis)
+from abms.publisher.analysis_modules.reliability_analysis import (
+    ReliabilityAnalysis)
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+HSETS = [GenreAnalysis.nli, ReliabilityAnalysis.nli,
+         EthicalConsiderationsAnalysis.nli, IntentionalityAnalysis.nli]
+PREMISES = ["The committee approved the budget after a long debate.",
+            "Buy now! Limited offer, only today.",
+            "Once upon a time a fox lived in the woods. " * 20]   # truncated
+
+
+@pytest.fixture(scope="module")
+def tiny(tmp_path_factory):
+    """(handle, zero-shot pipeline) sharing one tiny RoBERTa NLI model."""
+    from transformers.convert_slow_tokenizer import bytes_to_unicode
+
+    path = tmp_path_factory.mktemp("tiny-nli")
+    specials = ["<s>", "<pad>", "</s>", "<unk>", "<mask>"]
+    vocab = {t: i for i, t in enumerate(specials
+                                        + list(bytes_to_unicode().values()))}
+    (path / "vocab.json").write_text(json.dumps(vocab))
+    (path / "merges.txt").write_text("#version: 0.2\n")
+    tok = transformers.RobertaTokenizer(str(path / "vocab.json"),
+                                        str(path / "merges.txt"),
+                                        model_max_length=512)
+    torch.manual_seed(0)
+    config = transformers.RobertaConfig(
+        vocab_size=len(vocab), hidden_size=16, num_hidden_layers=1,
+        num_attention_heads=2, intermediate_size=32,
+        max_position_embeddings=520, pad_token_id=1, num_labels=3,
+        id2label={0: "contradiction", 1: "neutral", 2: "entailment"},
+        label2id={"contradiction": 0, "neutral": 1, "entailment": 2})
+    model = transformers.RobertaForSequenceClassification(config).eval()
+    handle = types.SimpleNamespace(model=model, tokenizer=tok, cache={})
+    pipe = transformers.pipeline("zero-shot-classification", model=model,
+                                 tokenizer=tok, device=-1)
+    return handle, pipe
+
+
+def _pipeline_scores(pipe, text, hs):
+    out = pipe(nli.premise(text), candidate_labels=list(hs.labels),
+               hypothesis_template=hs.template, multi_label=hs.multi_label)
+    return dict(zip(out["labels"], out["scores"]))
+
+
+def test_pair_layout_matches_the_tokenizer(tiny):
+    handle, _ = tiny
+    prefix, middle, suffix = nli._pair_layout(handle)
+    tok = handle.tokenizer
+    assert (prefix, middle, suffix) == (
+        [tok.bos_token_id], [tok.eos_token_id] * 2, [tok.eos_token_id])
+
+
+def test_fused_scores_match_the_pipeline(tiny):
+    handle, pipe = tiny
+    fused = nli.classify(handle, [nli.premise(t) for t in PREMISES], HSETS)
+    for text, per_doc in zip(PREMISES, fused):
+        for hs, scores in zip(HSETS, per_doc):
+            expect = _pipeline_scores(pipe, text, hs)
+            assert scores.keys() == expect.keys()
+            for label, score in expect.items():
+                assert scores[label] == pytest.approx(score, abs=1e-5)
+
+
+def test_single_and_multi_label_splits(tiny):
+    handle, pipe = tiny
+    hsets = [nli.HypothesisSet(("calm",)),
+             nli.HypothesisSet(("calm", "angry"), multi_label=True)]
+    (single, multi), = nli.classify(handle, [PREMISES[0]], hsets)
+    for hs, scores in zip(hsets, (single, multi)):
+        expect = _pipeline_scores(pipe, PREMISES[0], hs)
+        for label, score in expect.items():
+            assert scores[label] == pytest.approx(score, abs=1e-5)
+    # single-label mode sums to one across labels, multi-label does not have to
+    (across,), = nli.classify(handle, [PREMISES[0]],
+                              [nli.HypothesisSet(("calm", "angry"))])
+    assert sum(across.values()) == pytest.approx(1.0)
+
+
+def test_chunking_does_not_change_scores(tiny):
+    handle, _ = tiny
+    premises = [nli.premise(t) for t in PREMISES]
+    whole = nli.classify(handle, premises, HSETS)
+    chunked = nli.classify(handle, premises, HSETS, max_pairs=7)
+    for a, b in zip(whole, chunked):
+        for x, y in zip(a, b):
+            assert x == pytest.approx(y, abs=1e-5)
+
+
+def test_hypotheses_are_tokenised_once(tiny):
+    handle, _ = tiny
+    handle.cache.pop("nli_hypotheses", None)
+    nli.classify(handle, PREMISES[:1], HSETS)
+    cached = dict(handle.cache["nli_hypotheses"])
+    assert len(cached) == sum(len(hs.labels) for hs in HSETS)
+    nli.classify(handle, PREMISES[1:2], HSETS)
+    assert handle.cache["nli_hypotheses"] == cached
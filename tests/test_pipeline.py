@@ -0,0 +1,72 @@
+"""Threaded stages over bounded queues (abms.pipeline)."""
+import itertools
+import time
+
+import pytest
+
+from abms.pipeline import Pipeline, QueueStats
+
+
+def test_stages_run_in_order():
+    stats = {}
+    with Pipeline(stats) as pipe:
+        read = pipe.stage("read", range(50), capacity=4)
+        double = pipe.stage("double", pipe.drain(read), lambda x: 2 * x)
+        assert list(pipe.drain(double)) == [2 * i for i in range(50)]
+    assert set(stats) == {"read", "double"}
+    assert stats["read"].puts == 51               # 50 items and the end mark
+    assert stats["read"].gets == 51
+    assert 1 <= stats["read"].peak <= 4
+
+
+def test_a_stage_error_reaches_the_consumer():
+    def boom(x):
+        if x == 3:
+            raise ValueError("bad window")
+        return x
+
+    with Pipeline() as pipe:
+        failing = pipe.stage("nli", range(10), boom)
+        after = pipe.stage("json", pipe.drain(failing))
+        seen = []
+        with pytest.raises(ValueError, match="bad window"):
+            for item in pipe.drain(after):
+                seen.append(item)
+    assert seen == [0, 1, 2]
+
+
+def test_closing_stops_blocked_stages():
+    with Pipeline() as pipe:
+        read = pipe.stage("read", itertools.count(), capacity=2)
+        assert next(pipe.drain(read)) == 0
+        threads = list(pipe._threads)
+    # the producer was blocked on a full queue; it notices the stop
+    deadline = time.monotonic() + 2
+    while any(t.is_alive() for t in threads) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not any(t.is_alive() for t in threads)
+    assert pipe.stats["read"].put_wait > 0
+
+
+def test_slow_consumer_blocks_the_producer():
+    stats = {}
+    with Pipeline(stats) as pipe:
+        read = pipe.stage("read", range(6), capacity=1)
+        for _ in pipe.drain(read):
+            time.sleep(0.02)
+        assert pipe.depths() == "read 0/1"
+    assert stats["read"].put_wait > 0.05
+
+
+def test_stats_accumulate_and_merge():
+    stats = {}
+    for _ in range(2):
+        with Pipeline(stats) as pipe:
+            list(pipe.drain(pipe.stage("read", range(3), capacity=2)))
+    assert stats["read"].puts == 8
+    total = QueueStats("read", 2)
+    total.merge(stats["read"])
+    total.merge(stats["read"])
+    assert (total.puts, total.gets) == (16, 16)
+    assert total.peak == stats["read"].peak
+
@@ -0,0 +1,73 @@
+"""Module versions and re-encoding of existing tags files."""
+import json
+
+import pytest
+
+from abms import encoder
+from abms.aspect_cache import fingerprint
+from abms.encoder import (encode_file, load_versions, reencode_file,
+                          stale_aspects)
+from abms.publisher.analysis_modules.quantitative_analysis import (
+    QuantitativeAnalysis)
+
+QUANT = "quantitative_analysis"
+
+
+@pytest.fixture
+def tags(tmp_path, monkeypatch):
+    """A tags file of quantitative_analysis, the only aspect around."""
+    monkeypatch.setattr(encoder, "available_aspects", lambda: [QUANT])
+    src, out = tmp_path / "in.jsonl", tmp_path / "in.tags.jsonl"
+    src.write_text("".join(json.dumps({"id": i, "text": f"{i} apples, 3 pears"})
+                           + "\n" for i in range(20)))
+    encode_file(src, out, aspects=[QUANT])
+    return out
+
+
+def _rows(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_versions_are_recorded(tags):
+    assert load_versions(tags) == {QUANT: fingerprint(QuantitativeAnalysis)}
+    assert stale_aspects(tags) == []
+
+
+def test_changed_or_missing_versions_are_stale(tags, caplog):
+    encoder._save_versions(tags, {QUANT: "0ld"})
+    assert stale_aspects(tags) == [QUANT]
+    encoder._versions_path(tags).unlink()
+    assert stale_aspects(tags) == [QUANT]
+    assert "No module versions recorded" in caplog.text
+
+
+def test_reencode_in_place_recomputes_stale_aspects(tags):
+    expect = _rows(tags)
+    rows = _rows(tags)
+    for row in rows:
+        row["aspects"][QUANT] = -1.0              # an old module's numbers
+        row["aspects"]["kept"] = "untouched"
+    tags.write_text("".join(json.dumps(r) + "\n" for r in rows))
+    encoder._save_versions(tags, {QUANT: "0ld", "kept": "v1"})
+
+    assert reencode_file(tags) == [QUANT]
+    for row, want in zip(_rows(tags), expect):
+        assert row["aspects"].pop("kept") == "untouched"
+        assert row == want
+    assert load_versions(tags) == {QUANT: fingerprint(QuantitativeAnalysis),
+                                   "kept": "v1"}
+    assert not list(tags.parent.glob("*.reencode*"))
+    assert reencode_file(tags) == []              # now up to date
+
+
+def test_reencode_to_another_file(tags, tmp_path):
+    before = tags.read_bytes()
+    out = tmp_path / "again.tags.jsonl"
+    assert reencode_file(tags, out, aspects=[QUANT]) == [QUANT]
+    assert tags.read_bytes() == before
+    assert _rows(out) == _rows(tags)
+
+
+def test_reencoding_stdin_needs_an_output():
+    with pytest.raises(ValueError):
+        reencode_file("-")
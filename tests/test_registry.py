@@ -0,0 +1,68 @@
+"""Shared, reference-counted model handles (abms.registry)."""
+import torch
+
+from abms import registry
+from abms.publisher.analysis_modules.ethical_considerations_analysis import (
+    EthicalConsiderationsAnalysis)
+from abms.publisher.analysis_modules.genre_analysis import GenreAnalysis
+from abms.publisher.analysis_modules.intentionality_analysis import (
+    IntentionalityAnalysis)
+from abms.publisher.analysis_modules.reliability_analysis import (
+    ReliabilityAnalysis)
+
+MNLI = ("facebook/bart-large-mnli", "zero-shot-classification")
+
+
+def test_acquire_is_lazy_and_shared(stub_models):
+    a = registry.acquire(*MNLI)
+    b = registry.acquire(*MNLI)
+    assert a is b and a.refs == 2
+    assert stub_models == [] and not a.loaded
+    assert a.pipeline is b.pipeline
+    assert stub_models == [MNLI]
+
+
+def test_same_checkpoint_other_task_is_another_handle(stub_models):
+    a = registry.acquire("m", "text-classification")
+    b = registry.acquire("m", "sentiment-analysis")
+    assert a is not b
+    a.pipeline, b.pipeline
+    assert len(stub_models) == 2
+
+
+def test_last_release_unloads(stub_models):
+    a = registry.acquire(*MNLI)
+    b = registry.acquire(*MNLI)
+    a.pipeline
+    a.cache["x"] = 1
+    a.release()
+    assert registry.stats() == [{"checkpoint": MNLI[0], "task": MNLI[1],
+                                 "refs": 1, "loaded": True, "bytes": 0}]
+    b.release()
+    assert registry.stats() == [] and not b.loaded and b.cache == {}
+    b.release()                           # extra releases are no-ops
+    assert b.refs == 0
+    # a fresh acquire loads again
+    registry.acquire(*MNLI).pipeline
+    assert stub_models == [MNLI, MNLI]
+
+
+def test_nbytes_counts_parameters_and_buffers(stub_models):
+    h = registry.acquire("m", "text-classification")
+    assert h.nbytes == 0
+    h._model = torch.nn.BatchNorm1d(4)    # 8 parameters + 9 buffer values
+    assert h.nbytes == 8 * 4 + 8 * 4 + 8
+    h.release()
+
+
+def test_nli_aspects_share_one_copy(stub_models):
+    analysers = [GenreAnalysis(), ReliabilityAnalysis(),
+                 EthicalConsiderationsAnalysis(), IntentionalityAnalysis()]
+    for an in analysers:
+        an.setup()
+    checkpoints = {an.models[0] for an in analysers}
+    assert len(stub_models) == len(checkpoints)
+    assert sum(s["refs"] for s in registry.stats()) == len(analysers)
+    for an in analysers:
+        an.close()
+    assert registry.stats() == []
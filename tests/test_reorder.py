@@ -0,0 +1,86 @@
+"""Ordering and backpressure of abms.reorder.ReorderBuffer."""
+import random
+import threading
+import time
+
+import pytest
+
+from abms.reorder import ReorderBuffer
+
+
+def test_out_of_order_puts_drain_in_sequence():
+    buf = ReorderBuffer(capacity=8)
+    for seq in (3, 0, 2, 1):
+        buf.put(seq, f"r{seq}")
+    assert list(buf.drain(4)) == ["r0", "r1", "r2", "r3"]
+    assert buf.next_seq == 4 and buf.max_held == 4
+
+
+def test_first_seq_offsets_the_head():
+    buf = ReorderBuffer(capacity=4, first_seq=10)
+    buf.put(11, "b")
+    buf.put(10, "a")
+    assert list(buf.drain(2)) == ["a", "b"]
+
+
+def test_duplicate_or_delivered_seq_is_rejected():
+    buf = ReorderBuffer(capacity=4)
+    buf.put(0, "a")
+    with pytest.raises(ValueError):
+        buf.put(0, "again")
+    assert list(buf.drain(1)) == ["a"]
+    with pytest.raises(ValueError):
+        buf.put(0, "late")
+
+
+def test_concurrent_producers_keep_input_order():
+    n, buf = 200, ReorderBuffer(capacity=16)
+    work = iter(range(n))
+    lock = threading.Lock()
+
+    def produce():
+        rng = random.Random(threading.get_ident())
+        while True:
+            with lock:
+                seq = next(work, None)
+            if seq is None:
+                return
+            buf.reserve(seq)
+            time.sleep(rng.random() / 2000)
+            buf.put(seq, seq)
+
+    threads = [threading.Thread(target=produce) for _ in range(4)]
+    for t in threads:
+        t.start()
+    assert list(buf.drain(n)) == list(range(n))
+    for t in threads:
+        t.join()
+    assert buf.max_held <= 16
+
+
+def test_reserve_blocks_beyond_capacity():
+    buf = ReorderBuffer(capacity=2)
+    reserved = threading.Event()
+
+    def producer():
+        buf.reserve(2)                   # head is 0: 2 does not fit yet
+        reserved.set()
+
+    t = threading.Thread(target=producer)
+    t.start()
+    assert not reserved.wait(0.05)
+    buf.put(0, "a")
+    assert list(buf.drain(1)) == ["a"]
+    assert reserved.wait(1)
+    t.join()
+
+
+def test_fail_wakes_reserve_and_raises_in_drain():
+    buf = ReorderBuffer(capacity=1)
+    t = threading.Thread(target=buf.reserve, args=(5,))
+    t.start()
+    buf.fail(RuntimeError("worker died"))
+    t.join(1)
+    assert not t.is_alive() and buf.failed
+    with pytest.raises(RuntimeError, match="worker died"):
+        list(buf.drain(1))
@@ -0,0 +1,76 @@
+"""Frame recovery of compressed outputs (abms.streams)."""
+import pathlib
+
+import pytest
+
+from abms import streams
+from abms.encoder import _resume_point
+from abms.writer import Checkpoint, JsonlWriter
+
+LINES = [f'{{"id": {i}, "text": "doc {i}"}}\n' for i in range(6)]
+
+
+@pytest.fixture(params=[".gz", ".zst"])
+def suffix(request):
+    if request.param == ".zst":
+        pytest.importorskip("zstandard")
+    return request.param
+
+
+def _encoded(tmp_path: pathlib.Path, suffix: str, n: int):
+    """Input of LINES and an output holding the first `n`, one frame per
+    two records, plus its checkpoint sidecar."""
+    src = tmp_path / "in.jsonl"
+    src.write_text("".join(LINES))
+    out = tmp_path / f"out.jsonl{suffix}"
+    with JsonlWriter(out, "every-2", Checkpoint(input=src.name)) as w:
+        for i in range(n):
+            w.write([LINES[i]], in_offset=len("".join(LINES[:i + 1])))
+    return src, out
+
+
+def test_frames_split_on_commits(tmp_path, suffix):
+    _, out = _encoded(tmp_path, suffix, 6)
+    kind = streams.compression_of(out)
+    frames = list(streams.complete_frames(out, kind))
+    assert [data for _, _, data in frames] == [
+        "".join(LINES[i:i + 2]).encode() for i in (0, 2, 4)]
+    assert frames[0][0] == 0 and frames[-1][1] == out.stat().st_size
+    assert all(a[1] == b[0] for a, b in zip(frames, frames[1:]))
+    assert streams.read_frame(out, kind, frames[1][0], frames[2][1]) == \
+        "".join(LINES[2:]).encode()
+
+
+def test_torn_frame_is_not_yielded(tmp_path, suffix):
+    _, out = _encoded(tmp_path, suffix, 6)
+    kind = streams.compression_of(out)
+    ends = [end for _, end, _ in streams.complete_frames(out, kind)]
+    with out.open("r+b") as fh:
+        fh.truncate(ends[1] + (ends[2] - ends[1]) // 2)
+    frames = list(streams.complete_frames(out, kind))
+    assert [end for _, end, _ in frames] == ends[:2]
+    with pytest.raises(ValueError):
+        streams.read_frame(out, kind, ends[1], out.stat().st_size)
+
+
+def test_resume_cuts_a_torn_frame_without_checkpoint(tmp_path, suffix):
+    src, out = _encoded(tmp_path, suffix, 6)
+    kind = streams.compression_of(out)
+    ends = [end for _, end, _ in streams.complete_frames(out, kind)]
+    with out.open("r+b") as fh:
+        fh.truncate(ends[2] - 3)
+    Checkpoint.path_for(out).unlink()
+    point = _resume_point(src, out)
+    assert point.records == 4
+    assert point.in_offset == len("".join(LINES[:4]))
+    assert out.stat().st_size == ends[1]
+
+
+def test_resume_from_checkpoint_drops_trailing_bytes(tmp_path, suffix):
+    src, out = _encoded(tmp_path, suffix, 4)
+    size = out.stat().st_size
+    with out.open("ab") as fh:           # part of a frame never synced
+        fh.write(b"\x1f\x8b\x08garbage")
+    point = _resume_point(src, out)
+    assert (point.records, point.out_offset) == (4, size)
+    assert out.stat().st_size == size
@@ -0,0 +1,90 @@
+"""Timing spans and `abms trace summarize` (abms.trace)."""
+import json
+
+import pytest
+
+from abms import trace
+from abms.encoder import encode_file
+
+MS = 1_000_000
+
+
+def _span(tracer, stage, name, wall_ms, docs=1, batch=1, cpu_ms=0):
+    """A span that took `wall_ms` (and `cpu_ms` of CPU) until now."""
+    t0 = (trace.clock_ns() - int(wall_ms * MS),
+          trace.cpu_ns() - int(cpu_ms * MS))
+    tracer.add(stage, name, t0, docs=docs, batch=batch)
+
+
+@pytest.fixture
+def spans(tmp_path):
+    path = tmp_path / "run.trace"
+    tracer = trace.Tracer(path)
+    for i in range(1, 101):
+        _span(tracer, trace.MODULE, "readability_analysis", i, cpu_ms=i / 2)
+    tracer.flush()                              # two chunks, shared names
+    _span(tracer, trace.NLI, "genre_analysis+ethical_considerations_analysis",
+          80, docs=8, batch=8)
+    _span(tracer, trace.WRITE, "JsonlWriter", 1, docs=0)
+    tracer.close()
+    return path
+
+
+def _rows(path):
+    return {(r["stage"], r["name"]): r for r in trace.summarize(path)}
+
+
+def test_percentiles_per_document(spans):
+    row = _rows(spans)["module", "readability_analysis"]
+    assert (row["docs"], row["spans"], row["batch"]) == (100, 100, 1.0)
+    assert row["p50_ms"] == pytest.approx(50, abs=0.5)
+    assert row["p95_ms"] == pytest.approx(95, abs=0.5)
+    assert row["p99_ms"] == pytest.approx(99, abs=0.5)
+    assert row["wall_s"] == pytest.approx(5.05, abs=0.01)
+    assert row["cpu_s"] == pytest.approx(2.525, abs=0.01)
+
+
+def test_batch_spans_are_split_over_their_documents(spans):
+    row = _rows(spans)["nli", "genre_analysis+ethical_considerations_analysis"]
+    assert (row["docs"], row["batch"]) == (8, 8.0)
+    assert row["p50_ms"] == pytest.approx(10, abs=0.1)
+
+
+def test_rows_by_share(spans):
+    rows = trace.summarize(spans)
+    assert [r["stage"] for r in rows] == ["module", "nli", "write"]
+    assert sum(r["share"] for r in rows) == pytest.approx(1.0)
+    table = trace.format_summary(rows)
+    assert table.splitlines()[1].startswith("module  readability_analysis")
+
+
+def test_torn_tail_is_ignored(spans):
+    before = trace.summarize(spans)
+    whole = spans.read_bytes()
+    spans.write_bytes(whole + whole[:40])       # a chunk cut by a crash
+    assert len(trace.summarize(spans)) == len(before)
+    spans.write_bytes(whole + b"junk" * 10)
+    with pytest.raises(ValueError, match="not an abms trace"):
+        trace.summarize(spans)
+
+
+def test_cli_json(spans, capsys):
+    from abms.cli import _cmd_trace
+
+    _cmd_trace(["summarize", str(spans), "--json"])
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert rows[0]["name"] == "readability_analysis"
+
+
+def test_encode_traces_every_stage(tmp_path):
+    src, path = tmp_path / "in.jsonl", tmp_path / "run.trace"
+    src.write_text("".join(json.dumps({"text": f"{i} apples"}) + "\n"
+                           for i in range(20)))
+    encode_file(src, tmp_path / "out.jsonl", aspects=["quantitative_analysis"],
+                trace_file=path)
+    assert trace.current() is None
+    rows = _rows(path)
+    assert rows["module", "quantitative_analysis"]["docs"] == 20
+    assert rows["decode", "json"]["docs"] == 20
+    assert {"decode", "module", "json", "write"} <= {
+        stage for stage, _ in rows}
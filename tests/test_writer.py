@@ -0,0 +1,117 @@
+"""Crash recovery of JSONL outputs (abms.writer, abms.encoder resume)."""
+import pathlib
+
+from abms import writer
+from abms.encoder import _resume_point
+from abms.writer import Checkpoint, JsonlWriter, truncate_torn_tail
+
+LINES = [f'{{"id": {i}, "text": "doc {i}"}}\n' for i in range(5)]
+
+
+def _input(tmp_path: pathlib.Path) -> pathlib.Path:
+    fp = tmp_path / "in.jsonl"
+    fp.write_text("".join(LINES))
+    return fp
+
+
+# ── torn tail ────────────────────────────────────────────────────────
+def test_torn_tail_is_dropped(tmp_path):
+    fp = tmp_path / "out.jsonl"
+    fp.write_bytes(b'{"a": 1}\n{"a": 2}\n{"a": ')
+    assert truncate_torn_tail(fp) == 6
+    assert fp.read_bytes() == b'{"a": 1}\n{"a": 2}\n'
+
+
+def test_complete_file_is_untouched(tmp_path):
+    fp = tmp_path / "out.jsonl"
+    fp.write_bytes(b'{"a": 1}\n')
+    assert truncate_torn_tail(fp) == 0
+    assert fp.read_bytes() == b'{"a": 1}\n'
+
+
+def test_single_torn_line_empties_the_file(tmp_path):
+    fp = tmp_path / "out.jsonl"
+    fp.write_bytes(b'{"a": 1')
+    assert truncate_torn_tail(fp) == 7
+    assert fp.read_bytes() == b""
+
+
+def test_torn_line_longer_than_the_read_chunk(tmp_path):
+    fp = tmp_path / "out.jsonl"
+    torn = b"x" * (2 * writer._TAIL_CHUNK + 3)
+    fp.write_bytes(b'{"a": 1}\n' + torn)
+    assert truncate_torn_tail(fp) == len(torn)
+    assert fp.read_bytes() == b'{"a": 1}\n'
+
+
+def test_missing_file(tmp_path):
+    assert truncate_torn_tail(tmp_path / "nope.jsonl") == 0
+
+
+def test_resume_after_torn_tail_without_checkpoint(tmp_path):
+    src = _input(tmp_path)
+    out = tmp_path / "out.jsonl"
+    out.write_text("".join(LINES[:3]) + LINES[3][:7])
+    point = _resume_point(src, out)
+    assert point.records == 3
+    assert point.in_offset == len("".join(LINES[:3]).encode())
+    assert out.read_text() == "".join(LINES[:3])
+
+
+# ── checkpoint ───────────────────────────────────────────────────────
+def _offset(n: int) -> int:
+    return len("".join(LINES[:n]).encode())
+
+
+def _write(src, out, n, policy="every-2"):
+    with JsonlWriter(out, policy, Checkpoint(input=src.name)) as w:
+        for i in range(n):
+            w.write([LINES[i]], in_offset=_offset(i + 1))
+
+
+def test_checkpoint_tracks_each_commit(tmp_path):
+    src, out = _input(tmp_path), tmp_path / "out.jsonl"
+    _write(src, out, 4)
+    ckpt = Checkpoint.load(Checkpoint.path_for(out))
+    assert (ckpt.records, ckpt.in_offset, ckpt.out_offset) == (
+        4, _offset(4), out.stat().st_size)
+    assert ckpt.verify(src, out)
+
+
+def test_checkpoint_rejects_a_rewritten_record(tmp_path):
+    src, out = _input(tmp_path), tmp_path / "out.jsonl"
+    _write(src, out, 2)
+    out.write_text(LINES[0] + LINES[1].replace("doc", "DOC"))
+    assert not Checkpoint.load(Checkpoint.path_for(out)).verify(src, out)
+
+
+def test_checkpoint_rejects_another_input(tmp_path):
+    src, out = _input(tmp_path), tmp_path / "out.jsonl"
+    _write(src, out, 2)
+    other = tmp_path / "other.jsonl"
+    other.write_text("".join(LINES))
+    assert not Checkpoint.load(Checkpoint.path_for(out)).verify(other, out)
+
+
+def test_unreadable_checkpoint_loads_as_none(tmp_path):
+    ckpt = tmp_path / "out.jsonl.ckpt"
+    ckpt.write_text('{"records": 3, "in_off')
+    assert Checkpoint.load(ckpt) is None
+
+
+def test_resume_counts_records_after_the_checkpoint(tmp_path):
+    src, out = _input(tmp_path), tmp_path / "out.jsonl"
+    _write(src, out, 2)
+    with out.open("a") as fh:            # written, crash before the commit
+        fh.write(LINES[2] + LINES[3][:5])
+    point = _resume_point(src, out)
+    assert (point.records, point.in_offset) == (3, _offset(3))
+    assert out.read_text() == "".join(LINES[:3])
+
+
+def test_resume_ignores_a_stale_checkpoint(tmp_path):
+    src, out = _input(tmp_path), tmp_path / "out.jsonl"
+    _write(src, out, 4)
+    out.write_text("".join(LINES[:1]))   # output replaced, sidecar left
+    point = _resume_point(src, out)
+    assert (point.records, point.in_offset) == (1, _offset(1))